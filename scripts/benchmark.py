@@ -0,0 +1,56 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import sys
+import argparse
+
+from compas_rbe.benchmark import DATASETS
+from compas_rbe.benchmark import CONFIGURATIONS
+from compas_rbe.benchmark import run_benchmark
+from compas_rbe.benchmark import compare_benchmarks
+
+
+# benchmark the analysis of the data sets of the package
+# and compare with the results of a previous run
+# for example
+# python scripts/benchmark.py temp/benchmark_new.json --compare temp/benchmark_old.json
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark interface detection and equilibrium.')
+    parser.add_argument('outfile', help='JSON file of the results')
+    parser.add_argument('--datasets', nargs='+', default=DATASETS, help='names of the data sets')
+    parser.add_argument('--configurations', nargs='+', default=None,
+                        choices=[configuration['name'] for configuration in CONFIGURATIONS],
+                        help='names of the solver configurations')
+    parser.add_argument('--processes', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--compare', default=None, help='JSON file of the results of a previous run')
+    parser.add_argument('--no-regression', action='store_true', help='skip the checks against the reference results')
+
+    args = parser.parse_args()
+
+    configurations = None
+    if args.configurations:
+        configurations = [configuration for configuration in CONFIGURATIONS if configuration['name'] in args.configurations]
+
+    benchmark = run_benchmark(args.datasets, configurations, args.outfile, processes=args.processes,
+                              regression=not args.no_regression)
+
+    if args.compare:
+        print('')
+        print('{0:40} {1:12} {2:>10} {3:>10} {4:>8}'.format('case', 'config', 'old', 'new', 'ratio'))
+
+        for row in compare_benchmarks(args.compare, benchmark):
+            old, new, ratio = row['time_solve']
+            print('{0:40} {1:12} {2:>10} {3:>10} {4:>8}'.format(
+                '{dataset}/{name}'.format(**row),
+                row['configuration'],
+                '-' if old is None else '{0:.4f}'.format(old),
+                '-' if new is None else '{0:.4f}'.format(new),
+                '-' if ratio is None else '{0:.2f}'.format(ratio)))
+
+    if benchmark['regression'] and not benchmark['regression']['passed']:
+        print('')
+        print('regression checks FAILED')
+        sys.exit(1)
@@ -0,0 +1,65 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+
+from compas_rbe.generators import KINDS
+from compas_rbe.benchmark import SIZES
+from compas_rbe.benchmark import CONFIGURATIONS
+from compas_rbe.benchmark import run_scaling
+
+
+# benchmark the analysis of generated assemblies of increasing size
+# and plot the time of the solve and the peak memory against the number of blocks
+# for example
+# python scripts/benchmark_scaling.py temp/scaling.json --kinds wall dome --sizes 100 1000 10000 --memory 8000 --plot
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark equilibrium on generated assemblies of increasing size.')
+    parser.add_argument('outfile', help='JSON file of the results')
+    parser.add_argument('--kinds', nargs='+', default=KINDS, choices=KINDS, help='types of assemblies')
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES, help='numbers of blocks')
+    parser.add_argument('--configurations', nargs='+', default=None,
+                        choices=[configuration['name'] for configuration in CONFIGURATIONS],
+                        help='names of the solver configurations')
+    parser.add_argument('--processes', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--memory', type=int, default=None, help='maximum memory per worker process in MB')
+    parser.add_argument('--plot', action='store_true', help='plot the results')
+
+    args = parser.parse_args()
+
+    configurations = None
+    if args.configurations:
+        configurations = [configuration for configuration in CONFIGURATIONS if configuration['name'] in args.configurations]
+
+    benchmark = run_scaling(args.kinds, args.sizes, configurations, args.outfile,
+                            processes=args.processes,
+                            memory=args.memory)
+
+    if args.plot:
+        import matplotlib.pyplot as plt
+
+        fig, axes = plt.subplots(len(args.kinds), 2, figsize=(12, 4 * len(args.kinds)), squeeze=False)
+
+        for row, kind in zip(axes, args.kinds):
+            names = sorted(set(result['configuration'] for result in benchmark['results']))
+
+            for name in names:
+                results = [result for result in benchmark['results']
+                           if result['dataset'] == kind and result['configuration'] == name and result['status'] != 'error']
+                blocks = [result['blocks'] for result in results]
+                row[0].loglog(blocks, [result['time_solve'] for result in results], 'o-', label=name)
+                row[1].loglog(blocks, [result['peak_memory'] for result in results], 'o-', label=name)
+
+            row[0].set_title('{}: solve time [s]'.format(kind))
+            row[1].set_title('{}: peak memory [MB]'.format(kind))
+
+            for ax in row:
+                ax.set_xlabel('blocks')
+                ax.grid(True, which='both', alpha=0.3)
+                ax.legend()
+
+        plt.tight_layout()
+        plt.show()
@@ -0,0 +1,44 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import sys
+
+from numpy import array
+from numpy import zeros
+
+from compas_assembly.datastructures import Assembly
+
+from compas_rbe.equilibrium import make_Aeq
+from compas_rbe.equilibrium import make_Aiq
+from compas_rbe.equilibrium import equilibrate
+from compas_rbe.equilibrium import condition_estimate
+from compas_rbe.equilibrium import compute_interface_forces_cvx
+
+
+# compare the condition of the equilibrium matrix
+# and the number of solver iterations
+# with and without equilibration
+
+filepath = sys.argv[1]
+solver = sys.argv[2] if len(sys.argv) > 2 else 'ECOS'
+
+assembly = Assembly.from_json(filepath)
+
+key_index = {key: index for index, key in enumerate(assembly.vertices())}
+free = [key_index[key] for key in assembly.vertices_where({'is_support': False})]
+
+A, vcount = make_Aeq(assembly)
+A = A.tocsr()[[index * 6 + i for index in free for i in range(6)], :]
+b = zeros(A.shape[0])
+G = make_Aiq(vcount)
+p = array([1.0, 1e+5, 1e+2, 1e+2] * vcount)
+
+As, bs, Gs, ps, scaling = equilibrate(A, b, G, p)
+
+print('cond A (original)    : {0:.3e}'.format(condition_estimate(A)))
+print('cond A (equilibrated): {0:.3e}'.format(condition_estimate(As)))
+
+for scale in (False, True):
+    info = compute_interface_forces_cvx(Assembly.from_json(filepath), solver=solver, scale=scale)
+    print('scale={0}: {1} after {2} iterations'.format(scale, info['status'], info['iterations']))
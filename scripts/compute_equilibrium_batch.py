@@ -0,0 +1,43 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+
+from compas_rbe.batch import run_batch
+
+
+# compute the interface forces of all assemblies matching a glob pattern
+# for example
+# python scripts/compute_equilibrium_batch.py "data/simple_pile/*.json" temp/simple_pile --processes 4
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Compute the interface forces of a batch of assemblies.')
+    parser.add_argument('pattern', help='glob pattern of the JSON files of the assemblies')
+    parser.add_argument('outdir', help='directory of the results and the summary')
+    parser.add_argument('--backend', default='cvx', choices=['cvx', 'cvxopt', 'newton', 'pgs', 'dd'])
+    parser.add_argument('--solver', default=None, help='solver of the cvx backend')
+    parser.add_argument('--processes', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--interfaces', default='auto', choices=['auto', 'yes', 'no'],
+                        help='identify the interfaces before computing the forces')
+    parser.add_argument('--mu', type=float, default=0.6)
+    parser.add_argument('--density', type=float, default=1.0)
+    parser.add_argument('--restart', action='store_true', help='recompute the files that are done')
+    parser.add_argument('--timeout', type=float, default=None, help='maximum time (in seconds) per file')
+
+    args = parser.parse_args()
+
+    kwargs = {'mu': args.mu, 'density': args.density}
+    if args.solver:
+        kwargs['solver'] = args.solver
+
+    interfaces = {'auto': 'auto', 'yes': True, 'no': False}[args.interfaces]
+
+    run_batch(args.pattern, args.outdir,
+              backend=args.backend,
+              processes=args.processes,
+              interfaces=interfaces,
+              resume=not args.restart,
+              timeout=args.timeout,
+              **kwargs)
@@ -0,0 +1,29 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+
+from compas_rbe.files import convert_legacy_directory
+
+
+# convert a directory of legacy JSON files
+# with the faces of the blocks stored as linked lists
+# for example
+# python scripts/convert_legacy.py archive/ converted/ --processes 8
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Convert a directory of legacy assembly files.')
+    parser.add_argument('source', help='directory of the legacy files')
+    parser.add_argument('destination', help='directory of the converted files and the manifest')
+    parser.add_argument('--pattern', default='**/*.json', help='glob pattern of the legacy files')
+    parser.add_argument('--binary', action='store_true', help='write the compact binary format')
+    parser.add_argument('--processes', type=int, default=None, help='number of worker processes')
+
+    args = parser.parse_args()
+
+    convert_legacy_directory(args.source, args.destination,
+                             pattern=args.pattern,
+                             binary=args.binary,
+                             processes=args.processes)
@@ -0,0 +1,38 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import sys
+import argparse
+
+from compas_rbe.benchmark import CONFIGURATIONS
+from compas_rbe.regression import DATASETS
+from compas_rbe.regression import run_regression
+
+
+# check the solver configurations against the reference results of the data sets
+# the exit status is 1 if any of the checks fails
+# for example
+# python scripts/regression.py temp/regression.json --configurations cvx-ECOS cvxopt
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Check equilibrium solvers against reference results.')
+    parser.add_argument('outfile', nargs='?', default=None, help='JSON file of the results')
+    parser.add_argument('--datasets', nargs='+', default=DATASETS, help='names of the data sets')
+    parser.add_argument('--configurations', nargs='+', default=None,
+                        choices=[configuration['name'] for configuration in CONFIGURATIONS],
+                        help='names of the solver configurations')
+
+    args = parser.parse_args()
+
+    configurations = None
+    if args.configurations:
+        configurations = [configuration for configuration in CONFIGURATIONS if configuration['name'] in args.configurations]
+
+    regression = run_regression(args.datasets, configurations, outfile=args.outfile)
+
+    if not regression['passed']:
+        print('')
+        print('regression checks FAILED')
+        sys.exit(1)
@@ -1,3 +1,9 @@
 from compas.rpc import Proxy
 
-proxy = Proxy()
+# start (or connect to) the persistent solver server
+# and import the numerical packages before the first request
+
+rbe = Proxy('compas_rbe.rpc')
+
+print(rbe.ping())
+print(rbe.warmup())
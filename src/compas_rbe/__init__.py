@@ -10,6 +10,14 @@ compas_rbe
     :maxdepth: 1
 
     compas_rbe.equilibrium
+    compas_rbe.cache
+    compas_rbe.rpc
+    compas_rbe.files
+    compas_rbe.batch
+    compas_rbe.benchmark
+    compas_rbe.regression
+    compas_rbe.generators
+    compas_rbe.tracing
 
 """
 
@@ -0,0 +1,387 @@
+"""
+********************************************************************************
+compas_rbe.batch
+********************************************************************************
+
+.. currentmodule:: compas_rbe.batch
+
+Analysis of entire directories of assemblies.
+
+.. code-block:: bash
+
+    python scripts/compute_equilibrium_batch.py "data/simple_pile/*.json" temp/simple_pile --processes 4
+
+
+Functions
+=========
+
+.. autosummary::
+    :toctree: generated/
+    :nosignatures:
+
+    run_batch
+    compute_equilibrium_file
+
+"""
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+import os
+import csv
+import sys
+import glob
+import json
+import time
+import tempfile
+import signal
+import traceback
+import multiprocessing
+
+from compas_rbe.cache import _jsonable
+from compas_rbe.cache import _replace
+from compas_rbe.equilibrium.timing import peak_rss
+from compas_rbe.tracing import trace
+from compas_rbe.tracing import traced
+
+__all__ = [
+    'run_batch',
+    'compute_equilibrium_file',
+]
+
+
+# the suffix of the result files
+# different from the suffix of the reference results in the data directories,
+# such that those are never overwritten or mistaken for the results of a batch
+
+SUFFIX = '_equilibrium'
+
+FIELDS = [
+    'name',
+    'status',
+    'objective',
+    'iterations',
+    'blocks',
+    'interfaces',
+    'time_load',
+    'time_interfaces',
+    'time_solve',
+    'time_total',
+    'peak_memory',
+    'error',
+]
+
+
+@traced(category='batch')
+def compute_equilibrium_file(path, outdir, backend='cvx', interfaces='auto', **kwargs):
+    """Compute the interface forces of the assembly in a file, and write the result to another file.
+
+    Parameters
+    ----------
+    path : str
+        The path of a JSON file with the ``'assembly'`` and its ``'blocks'``.
+    outdir : str
+        The directory of the result.
+        The result file has the same name as the input file, with the suffix :data:`SUFFIX`.
+    backend : {'cvx', 'cvxopt', 'newton', 'dd'}, optional
+        The equilibrium solver.
+        Default is ``'cvx'``.
+    interfaces : {'auto', True, False}, optional
+        Identify the interfaces between the blocks before computing the forces.
+        With ``'auto'``, the interfaces are only identified if the assembly doesn't have any.
+        Default is ``'auto'``.
+    kwargs : dict, optional
+        Additional keyword arguments of the solver.
+
+    Returns
+    -------
+    dict
+        A summary of the analysis, with the fields of :data:`FIELDS`.
+        The times are in seconds, and the peak memory of the process is in MB.
+
+    """
+    from compas_assembly.datastructures import Assembly
+    from compas_assembly.datastructures import Block
+
+    from compas_rbe.equilibrium.caching import BACKENDS
+
+    name = _name(path)
+
+    summary = {field: None for field in FIELDS}
+    summary['name'] = name
+
+    t0 = time.time()
+
+    try:
+        with trace('load', category='batch', file=name):
+            with open(path, 'r') as f:
+                data = json.load(f)
+
+            assembly = Assembly.from_data(data['assembly'])
+            assembly.blocks = {int(key): Block.from_data(data['blocks'][key]) for key in data['blocks']}
+
+        t1 = time.time()
+
+        if interfaces is True or (interfaces == 'auto' and not assembly.number_of_edges()):
+            from compas_assembly.datastructures import assembly_interfaces
+            with trace('assembly_interfaces', category='interfaces'):
+                assembly_interfaces(assembly)
+
+        t2 = time.time()
+
+        info = BACKENDS[backend](assembly, **kwargs) or {}
+
+        t3 = time.time()
+
+        with trace('write', category='batch', file=name):
+            result = {
+                'assembly': assembly.to_data(),
+                'blocks': {str(key): assembly.blocks[key].to_data() for key in assembly.blocks},
+            }
+
+            _write_json(_result_path(outdir, name), result)
+
+        summary['status'] = info.get('status')
+        summary['objective'] = info.get('objective')
+        summary['iterations'] = info.get('iterations')
+        summary['blocks'] = assembly.number_of_vertices()
+        summary['interfaces'] = assembly.number_of_edges()
+        summary['time_load'] = t1 - t0
+        summary['time_interfaces'] = t2 - t1
+        summary['time_solve'] = t3 - t2
+
+    except Exception:
+        summary['status'] = 'error'
+        summary['error'] = traceback.format_exc().strip().splitlines()[-1]
+
+    summary['time_total'] = time.time() - t0
+    summary['peak_memory'] = peak_rss()
+
+    return summary
+
+
+def run_batch(pattern, outdir, backend='cvx', processes=None, interfaces='auto', resume=True, timeout=None, verbose=True, **kwargs):
+    """Compute the interface forces of all assemblies matching a glob pattern in a pool of processes.
+
+    Parameters
+    ----------
+    pattern : str
+        A glob pattern for the JSON files of the assemblies, for example ``'data/simple_pile/*.json'``.
+    outdir : str
+        The directory of the results and of the summary files.
+    backend : {'cvx', 'cvxopt', 'newton', 'dd'}, optional
+        The equilibrium solver.
+        Default is ``'cvx'``.
+    processes : int, optional
+        The number of worker processes.
+        Default is the number of CPUs.
+    interfaces : {'auto', True, False}, optional
+        Identify the interfaces between the blocks before computing the forces.
+        Default is ``'auto'``.
+    resume : bool, optional
+        Skip the files for which a result exists already.
+        Default is ``True``.
+    timeout : float, optional
+        The maximum time (in seconds) of the analysis of a file.
+        Default is no limit.
+    verbose : bool, optional
+        Print the summary of every file when it is done.
+        Default is ``True``.
+    kwargs : dict, optional
+        Additional keyword arguments of the solver.
+
+    Returns
+    -------
+    list
+        The summaries of all files, including the ones from previous runs.
+        The summaries are also written to ``summary.csv`` and ``summary.json`` in the output directory,
+        after every file, such that an interrupted batch can be resumed.
+
+    Notes
+    -----
+    Every worker process analyses a single file, such that the peak memory is measured per file.
+    A worker that dies (for example, killed by the operating system when it runs out of memory)
+    or that exceeds the timeout is recorded as an ``'error'`` of its file.
+    Failed analyses don't produce a result file, and are therefore retried when the batch is resumed.
+    Input files with the suffix of reference results (``_result``) or of batch results are skipped,
+    and so is the summary of the batch.
+
+    """
+    if not os.path.isdir(outdir):
+        os.makedirs(outdir)
+
+    summaries = {}
+
+    if resume:
+        for item in _read_summary(outdir):
+            if os.path.exists(_result_path(outdir, item['name'])):
+                summaries[item['name']] = item
+
+    paths = []
+
+    summary = os.path.abspath(os.path.join(outdir, 'summary.json'))
+
+    for path in sorted(glob.glob(pattern)):
+        name = _name(path)
+        if name.endswith('_result') or name.endswith(SUFFIX) or os.path.abspath(path) == summary:
+            continue
+        if resume and os.path.exists(_result_path(outdir, name)):
+            if name not in summaries:
+                summaries[name] = dict({field: None for field in FIELDS}, name=name, status='done')
+            continue
+        paths.append(path)
+
+    if verbose:
+        print('{} files, {} done, {} to do'.format(len(paths) + len(summaries), len(summaries), len(paths)))
+
+    # a pool of processes can't be used
+    # the task of a worker that is killed is lost, and waiting for its result blocks forever
+
+    pending = list(reversed(paths))
+    running = []
+
+    processes = processes or multiprocessing.cpu_count()
+
+    try:
+        while pending or running:
+            while pending and len(running) < processes:
+                path = pending.pop()
+                parent, child = multiprocessing.Pipe(False)
+                process = multiprocessing.Process(target=_worker, args=(child, path, outdir, backend, interfaces, kwargs))
+                process.start()
+                # the end of the worker is closed in this process
+                # such that the pipe is closed if the worker dies
+                child.close()
+                running.append((path, process, parent, time.time()))
+
+            for job in running[:]:
+                summary = _collect(job, timeout)
+
+                if summary is None:
+                    continue
+
+                running.remove(job)
+                summaries[summary['name']] = summary
+
+                if verbose:
+                    print('{name}: {status} ({time_total:.2f}s)'.format(**summary))
+
+                _write_summary(outdir, [summaries[name] for name in sorted(summaries)])
+
+    finally:
+        for path, process, conn, t0 in running:
+            _stop(process)
+
+    summaries = [summaries[name] for name in sorted(summaries)]
+
+    _write_summary(outdir, summaries)
+
+    return summaries
+
+
+# ==============================================================================
+# Helpers
+# ==============================================================================
+
+
+def _name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _result_path(outdir, name):
+    return os.path.join(outdir, '{}{}.json'.format(name, SUFFIX))
+
+
+def _worker(conn, path, outdir, backend, interfaces, kwargs):
+    # a terminated worker exits through the cleanup code of the solver,
+    # such that the worker processes of the decomposition backend are stopped as well
+    signal.signal(signal.SIGTERM, _terminate)
+    conn.send(compute_equilibrium_file(path, outdir, backend, interfaces, **kwargs))
+    conn.close()
+
+
+def _terminate(signum, frame):
+    sys.exit(-signum)
+
+
+def _stop(process, grace=5.0):
+    """Terminate a worker, and kill it if it doesn't exit within the grace period.
+
+    The signal handler of the worker only runs between Python instructions,
+    not during a long call of a solver library.
+    """
+    process.terminate()
+    process.join(grace)
+    if process.is_alive():
+        os.kill(process.pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+        process.join()
+
+
+def _collect(job, timeout, wait=0.05):
+    """Get the summary of a worker if it is done, died or timed out, otherwise ``None``."""
+    path, process, conn, t0 = job
+
+    # the summary is checked again after the worker has stopped
+    # since it may have been sent in the meantime
+
+    if conn.poll(wait) or (not process.is_alive() and conn.poll()):
+        try:
+            summary = conn.recv()
+        except EOFError:
+            summary = None
+        else:
+            process.join()
+            return summary
+
+    if process.is_alive() and (timeout is None or time.time() - t0 < timeout):
+        return None
+
+    if process.is_alive():
+        _stop(process)
+        error = 'Timeout after {}s'.format(timeout)
+    else:
+        process.join()
+        error = 'Worker process died with exit code {}'.format(process.exitcode)
+
+    summary = {field: None for field in FIELDS}
+    summary['name'] = _name(path)
+    summary['status'] = 'error'
+    summary['error'] = error
+    summary['time_total'] = time.time() - t0
+
+    return summary
+
+
+def _write_json(path, data):
+    """Write a JSON file to a temporary file first, such that an interruption doesn't leave a partial result."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(_jsonable(data), f)
+    _replace(tmp, path)
+
+
+def _read_summary(outdir):
+    path = os.path.join(outdir, 'summary.json')
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _write_summary(outdir, summaries):
+    _write_json(os.path.join(outdir, 'summary.json'), summaries)
+
+    path = os.path.join(outdir, 'summary.csv')
+    with open(path, 'w') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, lineterminator='\n')
+        writer.writeheader()
+        for summary in summaries:
+            writer.writerow(summary)
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+    pass
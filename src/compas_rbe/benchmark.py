@@ -0,0 +1,586 @@
+"""
+********************************************************************************
+compas_rbe.benchmark
+********************************************************************************
+
+.. currentmodule:: compas_rbe.benchmark
+
+Performance benchmarks over the data sets of the package.
+
+.. code-block:: bash
+
+    python scripts/benchmark.py temp/benchmark_abc1234.json
+    python scripts/benchmark.py temp/benchmark_def5678.json --compare temp/benchmark_abc1234.json
+    python scripts/benchmark_scaling.py temp/scaling.json --kinds wall dome --sizes 100 1000 10000 --plot
+
+
+Functions
+=========
+
+.. autosummary::
+    :toctree: generated/
+    :nosignatures:
+
+    run_benchmark
+    run_scaling
+    benchmark_file
+    benchmark_generated
+    compare_benchmarks
+
+"""
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+import os
+import sys
+import glob
+import json
+import time
+import platform
+import traceback
+import subprocess
+
+from multiprocessing import Pool
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import compas_rbe
+
+from compas_rbe.batch import SUFFIX
+from compas_rbe.batch import _write_json
+from compas_rbe.equilibrium.timing import peak_rss
+from compas_rbe.tracing import trace
+
+__all__ = [
+    'run_benchmark',
+    'run_scaling',
+    'benchmark_file',
+    'benchmark_generated',
+    'compare_benchmarks',
+]
+
+
+DATASETS = [
+    'simple_stack',
+    'simple_pile',
+    'simple_arch',
+    'simple_corbelarch',
+    'simple_slide',
+    'complex',
+]
+
+# the solver configurations of a benchmark run
+# every configuration has a name, a backend and the keyword arguments of the backend
+
+CONFIGURATIONS = [
+    {'name': 'cvx-ECOS', 'backend': 'cvx', 'kwargs': {'solver': 'ECOS'}},
+    {'name': 'cvx-OSQP', 'backend': 'cvx', 'kwargs': {'solver': 'OSQP'}},
+    {'name': 'cvx-CVXOPT', 'backend': 'cvx', 'kwargs': {'solver': 'CVXOPT'}},
+    {'name': 'cvxopt', 'backend': 'cvxopt', 'kwargs': {}},
+    {'name': 'newton', 'backend': 'newton', 'kwargs': {}},
+    {'name': 'dd', 'backend': 'dd', 'kwargs': {'nparts': 2, 'processes': 0}},
+]
+
+SIZES = [100, 300, 1000, 3000, 10000]
+
+FIELDS = [
+    'dataset',
+    'name',
+    'configuration',
+    'status',
+    'iterations',
+    'objective',
+    'blocks',
+    'interfaces',
+    'rows',
+    'columns',
+    'nonzeros',
+    'rows_iq',
+    'nonzeros_iq',
+    'time_load',
+    'time_interfaces',
+    'time_matrices',
+    'time_solve',
+    'time_total',
+    'peak_memory',
+    'error',
+]
+
+
+def benchmark_file(path, backend='cvx', interfaces='auto', **kwargs):
+    """Benchmark the analysis of the assembly in a file.
+
+    Parameters
+    ----------
+    path : str
+        The path of a JSON file with the ``'assembly'`` and its ``'blocks'``.
+    backend : {'cvx', 'cvxopt', 'newton', 'dd'}, optional
+        The equilibrium solver.
+        Default is ``'cvx'``.
+    interfaces : {'auto', True, False}, optional
+        Identify the interfaces between the blocks before computing the forces.
+        With ``'auto'``, the interfaces are only identified if the assembly doesn't have any.
+        Default is ``'auto'``.
+    kwargs : dict, optional
+        Additional keyword arguments of the solver.
+
+    Returns
+    -------
+    dict
+        The measurements, with the fields of :data:`FIELDS`.
+        The problem size is the size of the equilibrium matrix of the free blocks
+        (``'rows'``, ``'columns'``, ``'nonzeros'``)
+        and of the matrix of the friction constraints (``'rows_iq'``, ``'nonzeros_iq'``).
+        The times are in seconds, and the peak memory of the process is in MB.
+
+    Notes
+    -----
+    The matrices are built once more, separately from the solve,
+    to measure the time of the construction and the size of the problem.
+    The time of the solve therefore also includes the construction of the matrices by the solver.
+
+    """
+    def load():
+        from compas_assembly.datastructures import Assembly
+        from compas_assembly.datastructures import Block
+
+        with open(path, 'r') as f:
+            data = json.load(f)
+
+        assembly = Assembly.from_data(data['assembly'])
+        assembly.blocks = {int(key): Block.from_data(data['blocks'][key]) for key in data['blocks']}
+
+        return assembly
+
+    result = _measure(load, backend, interfaces, kwargs)
+    result['name'] = os.path.splitext(os.path.basename(path))[0]
+
+    return result
+
+
+def benchmark_generated(kind, n, backend='cvx', **kwargs):
+    """Benchmark the analysis of a generated assembly.
+
+    Parameters
+    ----------
+    kind : {'wall', 'barrel', 'dome', 'pile'}
+        The type of assembly.
+    n : int
+        The (approximate) number of blocks.
+    backend : {'cvx', 'cvxopt', 'newton', 'dd'}, optional
+        The equilibrium solver.
+        Default is ``'cvx'``.
+    kwargs : dict, optional
+        Additional keyword arguments of the solver.
+
+    Returns
+    -------
+    dict
+        The measurements, as for :func:`benchmark_file`,
+        with the time of the generation of the assembly as ``'time_load'``.
+
+    See Also
+    --------
+    :func:`compas_rbe.generators.generate_assembly`
+
+    """
+    from compas_rbe.generators import generate_assembly
+
+    result = _measure(lambda: generate_assembly(kind, n), backend, False, kwargs)
+    result['dataset'] = kind
+    result['name'] = str(n)
+
+    return result
+
+
+def run_benchmark(datasets=None, configurations=None, outfile=None, interfaces='auto', processes=1, regression=True,
+                  verbose=True):
+    """Benchmark the analysis of the data sets of the package with a number of solver configurations.
+
+    Parameters
+    ----------
+    datasets : list, optional
+        The names of the data sets, as the directories in :data:`compas_rbe.DATA`,
+        or the paths of other directories with JSON files of assemblies.
+        Default is :data:`DATASETS`.
+    configurations : list, optional
+        The solver configurations,
+        as dicts with a ``'name'``, a ``'backend'`` and the keyword arguments (``'kwargs'``) of the backend.
+        Default is :data:`CONFIGURATIONS`.
+    outfile : str, optional
+        The path of a JSON file for the results.
+    interfaces : {'auto', True, False}, optional
+        Identify the interfaces between the blocks before computing the forces.
+        Default is ``'auto'``.
+    processes : int, optional
+        The number of worker processes.
+        Default is ``1``, such that the measurements are not influenced by other cases.
+    regression : bool, optional
+        Also check the configurations against the reference results of the data sets
+        with :func:`compas_rbe.regression.run_regression`.
+        Default is ``True``.
+    verbose : bool, optional
+        Print the results of every case when it is done.
+        Default is ``True``.
+
+    Returns
+    -------
+    dict
+        The ``'meta'`` data of the run (commit, versions, platform, date),
+        the ``'results'`` of all combinations of files and configurations,
+        with the fields of :data:`FIELDS`,
+        and the results of the ``'regression'`` checks, if any.
+
+    Notes
+    -----
+    Every case is run in a fresh worker process,
+    such that the peak memory is measured per case,
+    and the import of the solvers is not part of the measurements.
+    Results files of other runs (reference results ending with ``_result.json``,
+    and results of :func:`compas_rbe.batch.run_batch`) are skipped.
+
+    """
+    datasets = datasets or DATASETS
+    configurations = configurations or CONFIGURATIONS
+
+    cases = []
+
+    for dataset in datasets:
+        directory = dataset if os.path.isdir(dataset) else os.path.join(compas_rbe.DATA, dataset)
+        for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+            if path.endswith('_result.json') or path.endswith(SUFFIX + '.json'):
+                continue
+            for configuration in configurations:
+                cases.append((os.path.basename(os.path.normpath(directory)), path, configuration))
+
+    if verbose:
+        print('{} cases'.format(len(cases)))
+
+    results = []
+
+    pool = Pool(processes, maxtasksperchild=1)
+
+    try:
+        jobs = []
+        for dataset, path, configuration in cases:
+            kwargs = dict(configuration.get('kwargs') or {})
+            jobs.append(pool.apply_async(benchmark_file, (path, configuration['backend'], interfaces), kwargs))
+
+        for (dataset, path, configuration), job in zip(cases, jobs):
+            result = job.get()
+            result['dataset'] = dataset
+            result['configuration'] = configuration['name']
+            results.append(result)
+
+            if verbose:
+                print('{dataset}/{name} {configuration}: {status} ({time_total:.2f}s)'.format(**result))
+
+        pool.close()
+    except KeyboardInterrupt:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    benchmark = {'meta': _meta(configurations), 'results': results, 'regression': None}
+
+    if regression:
+        from compas_rbe.regression import run_regression
+
+        if verbose:
+            print('')
+        benchmark['regression'] = run_regression(configurations=configurations, verbose=verbose)
+
+    if outfile:
+        directory = os.path.dirname(os.path.abspath(outfile))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        _write_json(outfile, benchmark)
+
+    return benchmark
+
+
+def run_scaling(kinds=None, sizes=None, configurations=None, outfile=None, processes=1, memory=None, verbose=True):
+    """Benchmark the analysis of generated assemblies of increasing size.
+
+    Parameters
+    ----------
+    kinds : list, optional
+        The types of assemblies.
+        Default is :data:`compas_rbe.generators.KINDS`.
+    sizes : list, optional
+        The (approximate) numbers of blocks.
+        Default is :data:`SIZES`.
+    configurations : list, optional
+        The solver configurations.
+        Default is :data:`CONFIGURATIONS`.
+    outfile : str, optional
+        The path of a JSON file for the results.
+    processes : int, optional
+        The number of worker processes.
+        Default is ``1``.
+    memory : int, optional
+        The maximum memory of a worker process in MB.
+        Cases that need more memory fail with a :class:`MemoryError`,
+        instead of exhausting the memory of the machine.
+        Only available on Unix.
+    verbose : bool, optional
+        Print the results of every case when it is done.
+        Default is ``True``.
+
+    Returns
+    -------
+    dict
+        The ``'meta'`` data of the run and the ``'results'``,
+        with the type of assembly as ``'dataset'`` and the requested size as ``'name'``.
+        The actual number of blocks is ``'blocks'``.
+
+    Notes
+    -----
+    The assemblies are generated in the worker processes,
+    such that large assemblies don't have to be transferred or stored.
+    Once a configuration fails for a type of assembly,
+    for example because it runs out of memory (see ``memory``),
+    the larger sizes are skipped for that combination.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        benchmark = run_scaling(['wall'], [100, 1000], outfile='temp/scaling.json')
+
+        for result in benchmark['results']:
+            print(result['configuration'], result['blocks'], result['time_solve'], result['peak_memory'])
+
+    """
+    from compas_rbe.generators import KINDS
+
+    kinds = kinds or KINDS
+    sizes = sorted(sizes or SIZES)
+    configurations = configurations or CONFIGURATIONS
+
+    if verbose:
+        print('{} cases'.format(len(kinds) * len(sizes) * len(configurations)))
+
+    results = []
+
+    pool = Pool(processes, _limit_memory, (memory, ), maxtasksperchild=1)
+
+    try:
+        # the sizes are run in increasing order
+        # such that the larger cases of a failing combination can be skipped
+
+        for n in sizes:
+            failed = set((result['dataset'], result['configuration']) for result in results if result['status'] == 'error')
+            cases = []
+            for kind in kinds:
+                for configuration in configurations:
+                    if (kind, configuration['name']) in failed:
+                        continue
+                    kwargs = dict(configuration.get('kwargs') or {})
+                    job = pool.apply_async(benchmark_generated, (kind, n, configuration['backend']), kwargs)
+                    cases.append((configuration, job))
+
+            for configuration, job in cases:
+                result = job.get()
+                result['configuration'] = configuration['name']
+                results.append(result)
+
+                if verbose:
+                    print('{dataset}/{name} ({blocks} blocks) {configuration}: {status} ({time_total:.2f}s)'.format(**result))
+
+        pool.close()
+    except KeyboardInterrupt:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    benchmark = {'meta': _meta(configurations), 'results': results}
+
+    if outfile:
+        directory = os.path.dirname(os.path.abspath(outfile))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        _write_json(outfile, benchmark)
+
+    return benchmark
+
+
+def compare_benchmarks(old, new, fields=('time_solve', 'time_total', 'peak_memory', 'iterations')):
+    """Compare the results of two benchmark runs.
+
+    Parameters
+    ----------
+    old : dict or str
+        The reference benchmark, or the path of its JSON file.
+    new : dict or str
+        The new benchmark, or the path of its JSON file.
+    fields : tuple, optional
+        The fields to compare.
+
+    Returns
+    -------
+    list
+        Per case that is in both runs,
+        the ``'dataset'``, the ``'name'`` and the ``'configuration'``,
+        and per field a tuple with the old value, the new value,
+        and the ratio of the new and the old value (or ``None``).
+
+    Examples
+    --------
+    .. code-block:: python
+
+        for row in compare_benchmarks('temp/benchmark_abc1234.json', 'temp/benchmark_def5678.json'):
+            print(row['name'], row['configuration'], row['time_solve'][2])
+
+    """
+    old = _load(old)
+    new = _load(new)
+
+    def case(result):
+        return result['dataset'], result['name'], result['configuration']
+
+    reference = {case(result): result for result in old['results']}
+
+    rows = []
+
+    for result in new['results']:
+        key = case(result)
+        if key not in reference:
+            continue
+
+        row = dict(zip(('dataset', 'name', 'configuration'), key))
+
+        for field in fields:
+            a = reference[key].get(field)
+            b = result.get(field)
+            ratio = b / a if a and b is not None else None
+            row[field] = a, b, ratio
+
+        rows.append(row)
+
+    return rows
+
+
+# ==============================================================================
+# Helpers
+# ==============================================================================
+
+
+def _measure(load, backend, interfaces, kwargs):
+    from compas_rbe.equilibrium import make_Aeq
+    from compas_rbe.equilibrium import make_Aiq
+    from compas_rbe.equilibrium.caching import BACKENDS
+
+    result = {field: None for field in FIELDS}
+
+    kwargs.setdefault('verbose', False)
+
+    t0 = time.time()
+
+    try:
+        with trace('load', category='benchmark'):
+            assembly = load()
+
+        t1 = time.time()
+
+        if interfaces is True or (interfaces == 'auto' and not assembly.number_of_edges()):
+            from compas_assembly.datastructures import assembly_interfaces
+            with trace('assembly_interfaces', category='interfaces'):
+                assembly_interfaces(assembly)
+
+        t2 = time.time()
+
+        result['blocks'] = assembly.number_of_vertices()
+        result['interfaces'] = assembly.number_of_edges()
+
+        key_index = {key: index for index, key in enumerate(assembly.vertices())}
+        free = [key_index[key] for key in assembly.vertices_where({'is_support': False})]
+
+        A, vcount = make_Aeq(assembly)
+        A = A.tocsr()[[index * 6 + i for index in free for i in range(6)], :]
+        G = make_Aiq(vcount, kwargs.get('friction8', False), kwargs.get('mu', 0.6))
+
+        t3 = time.time()
+
+        info = BACKENDS[backend](assembly, **kwargs) or {}
+
+        t4 = time.time()
+
+        result['status'] = info.get('status')
+        result['iterations'] = info.get('iterations')
+        result['objective'] = info.get('objective')
+        result['rows'], result['columns'] = A.shape
+        result['nonzeros'] = A.nnz
+        result['rows_iq'] = G.shape[0]
+        result['nonzeros_iq'] = G.nnz
+        result['time_load'] = t1 - t0
+        result['time_interfaces'] = t2 - t1
+        result['time_matrices'] = t3 - t2
+        result['time_solve'] = t4 - t3
+
+    except Exception:
+        result['status'] = 'error'
+        result['error'] = traceback.format_exc().strip().splitlines()[-1]
+
+    result['time_total'] = time.time() - t0
+    result['peak_memory'] = peak_rss()
+
+    return result
+
+
+def _limit_memory(megabytes):
+    """Limit the address space of a worker process."""
+    if megabytes and resource is not None:
+        limit = int(megabytes * 2 ** 20)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _load(benchmark):
+    if isinstance(benchmark, dict):
+        return benchmark
+    with open(benchmark, 'r') as f:
+        return json.load(f)
+
+
+def _meta(configurations):
+    versions = {}
+    for name in ('numpy', 'scipy', 'cvxpy', 'cvxopt', 'compas', 'compas_assembly'):
+        try:
+            versions[name] = getattr(__import__(name), '__version__', None)
+        except ImportError:
+            versions[name] = None
+
+    return {
+        'commit': _commit(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'versions': versions,
+        'configurations': configurations,
+    }
+
+
+def _commit():
+    """The current commit of the package, if it is a git repository."""
+    try:
+        output = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                         cwd=compas_rbe.HOME,
+                                         stderr=subprocess.STDOUT)
+    except Exception:
+        return None
+    return output.decode('ascii').strip()
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,437 @@
+"""
+********************************************************************************
+compas_rbe.cache
+********************************************************************************
+
+.. currentmodule:: compas_rbe.cache
+
+
+Classes
+=======
+
+.. autosummary::
+    :toctree: generated/
+    :nosignatures:
+
+    LRUCache
+    DiskCache
+
+
+Functions
+=========
+
+.. autosummary::
+    :toctree: generated/
+    :nosignatures:
+
+    digest
+
+"""
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+import os
+import json
+import time
+import errno
+import hashlib
+import tempfile
+import threading
+
+from collections import OrderedDict
+
+
+__all__ = [
+    'LRUCache',
+    'DiskCache',
+    'digest',
+]
+
+
+def digest(*items):
+    """Compute a hexadecimal digest of JSON serialisable data.
+
+    Parameters
+    ----------
+    items : list
+        The data items.
+
+    Returns
+    -------
+    str
+        The SHA-1 digest of the canonical (sorted keys, compact) JSON representation of the items.
+
+    Examples
+    --------
+    >>> digest({'a': 1, 'b': 2}) == digest({'b': 2, 'a': 1})
+    True
+
+    """
+    data = json.dumps(items, sort_keys=True, separators=(',', ':'), default=_default)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def _default(o):
+    if hasattr(o, 'tolist'):
+        return o.tolist()
+    if isinstance(o, (set, frozenset)):
+        return sorted(o)
+    raise TypeError('Object of type {} is not JSON serialisable.'.format(type(o).__name__))
+
+
+def _jsonable(o):
+    """Convert numpy scalars and arrays to plain Python objects."""
+    if isinstance(o, dict):
+        return {key: _jsonable(value) for key, value in o.items()}
+    if isinstance(o, (list, tuple)):
+        return [_jsonable(value) for value in o]
+    if hasattr(o, 'tolist'):
+        return o.tolist()
+    return o
+
+
+class LRUCache(object):
+    """A thread-safe, in-memory cache with a least-recently-used eviction policy.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        The maximum number of items in the cache.
+        Default is ``32``.
+
+    Attributes
+    ----------
+    hits : int
+        The number of successful lookups.
+    misses : int
+        The number of failed lookups.
+
+    Examples
+    --------
+    >>> cache = LRUCache(maxsize=2)
+    >>> cache.set('a', 1)
+    >>> cache.set('b', 2)
+    >>> cache.get('a')
+    1
+    >>> cache.set('c', 3)
+    >>> cache.get('b') is None
+    True
+
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        """Get an item from the cache, and mark it as most recently used."""
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                return default
+            self.hits += 1
+            value = self._items.pop(key)
+            self._items[key] = value
+            return value
+
+    def set(self, key, value):
+        """Add an item to the cache, evicting the least recently used item if necessary."""
+        with self._lock:
+            if key in self._items:
+                self._items.pop(key)
+            self._items[key] = value
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        """Remove an item from the cache, if it exists."""
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        """Remove all items from the cache and reset the statistics."""
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """Get the statistics of the cache.
+
+        Returns
+        -------
+        dict
+            The number of ``'hits'`` and ``'misses'``,
+            the current ``'size'`` and the ``'maxsize'``.
+
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._items),
+            'maxsize': self.maxsize,
+        }
+
+
+class DiskCache(object):
+    """A content-addressed cache of JSON serialisable results on disk,
+    with a least-recently-used eviction policy.
+
+    Parameters
+    ----------
+    path : str, optional
+        The cache directory.
+        Default is a ``cache`` directory in :data:`compas_rbe.TEMP`.
+    maxsize : int, optional
+        The maximum number of items in the cache.
+        Default is ``1000``.
+    maxbytes : int, optional
+        The maximum total size of the items in the cache, in bytes.
+        Default is ``2 ** 30`` (1 GB).
+
+    Notes
+    -----
+    Every item is stored in a separate file, named after its key.
+    The files are written to a temporary file first and then renamed,
+    such that other processes never see partially written items.
+    The modification time of a file is updated on every hit,
+    and the least recently used files are removed when the cache is full.
+    Eviction is protected by a lock file, such that several processes can share a cache.
+
+    The number and the total size of the items are tracked in memory,
+    and the directory is only scanned when these exceed the limits,
+    and after every ``maxsize // 10 + 1`` writes,
+    to account for the items added by other processes.
+    The scan also removes temporary files older than an hour,
+    which are left behind by processes that crashed while writing.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        cache = DiskCache()
+
+        key = digest(data, parameters)
+        result = cache.get(key)
+
+        if result is None:
+            result = solve(data, parameters)
+            cache.set(key, result)
+
+    """
+
+    def __init__(self, path=None, maxsize=1000, maxbytes=2 ** 30):
+        if not path:
+            import compas_rbe
+            path = os.path.join(compas_rbe.TEMP, 'cache')
+        self.path = path
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self._size = None
+        self._bytes = None
+        self._writes = 0
+        _makedirs(path)
+
+    def _filepath(self, key):
+        return os.path.join(self.path, '{}.json'.format(key))
+
+    def __contains__(self, key):
+        return os.path.exists(self._filepath(key))
+
+    def get(self, key, default=None):
+        """Get an item from the cache, and mark it as most recently used."""
+        filepath = self._filepath(key)
+        try:
+            with open(filepath, 'r') as f:
+                value = json.load(f)
+        except (IOError, OSError, ValueError):
+            return default
+        try:
+            os.utime(filepath, None)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key, value):
+        """Add an item to the cache, evicting the least recently used items if necessary."""
+        filepath = self._filepath(key)
+        try:
+            old = os.path.getsize(filepath)
+        except OSError:
+            old = None
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(value, f)
+            size = os.path.getsize(tmp)
+            _replace(tmp, filepath)
+        except Exception:
+            _remove(tmp)
+            raise
+        if self._size is None:
+            self.evict()
+            return
+        self._size += 1 if old is None else 0
+        self._bytes += size - (old or 0)
+        self._writes += 1
+        if self._size > self.maxsize or self._bytes > self.maxbytes or self._writes > self.maxsize // 10:
+            self.evict()
+
+    def delete(self, key):
+        """Remove an item from the cache, if it exists."""
+        _remove(self._filepath(key))
+
+    def items(self):
+        """Get the file path, size and access time of all items, from least to most recently used."""
+        items = []
+        for name in os.listdir(self.path):
+            if not name.endswith('.json'):
+                continue
+            filepath = os.path.join(self.path, name)
+            try:
+                stat = os.stat(filepath)
+            except OSError:
+                continue
+            items.append((stat.st_mtime, stat.st_size, filepath))
+        items.sort()
+        return [(filepath, size, mtime) for mtime, size, filepath in items]
+
+    def evict(self):
+        """Remove the least recently used items until the cache is within its limits."""
+        with _FileLock(os.path.join(self.path, '.lock')):
+            self._remove_orphans()
+            items = self.items()
+            total = sum(size for _, size, _ in items)
+            while items and (len(items) > self.maxsize or total > self.maxbytes):
+                filepath, size, _ = items.pop(0)
+                _remove(filepath)
+                total -= size
+        self._size = len(items)
+        self._bytes = total
+        self._writes = 0
+
+    def clear(self):
+        """Remove all items from the cache."""
+        with _FileLock(os.path.join(self.path, '.lock')):
+            self._remove_orphans()
+            for filepath, _, _ in self.items():
+                _remove(filepath)
+        self._size = 0
+        self._bytes = 0
+        self._writes = 0
+
+    def _remove_orphans(self, age=3600.0):
+        """Remove the temporary files of writes that were interrupted."""
+        now = time.time()
+        for name in os.listdir(self.path):
+            if not name.endswith('.tmp'):
+                continue
+            filepath = os.path.join(self.path, name)
+            try:
+                if now - os.stat(filepath).st_mtime > age:
+                    _remove(filepath)
+            except OSError:
+                continue
+
+    def info(self):
+        """Get the statistics of the cache.
+
+        Returns
+        -------
+        dict
+            The current number of items (``'size'``) and their total size in bytes (``'bytes'``),
+            the ``'maxsize'`` and ``'maxbytes'``, and the ``'path'`` of the cache.
+
+        """
+        items = self.items()
+        return {
+            'size': len(items),
+            'bytes': sum(size for _, size, _ in items),
+            'maxsize': self.maxsize,
+            'maxbytes': self.maxbytes,
+            'path': self.path,
+        }
+
+
+# ==============================================================================
+# Helpers
+# ==============================================================================
+
+
+class _FileLock(object):
+    """An inter-process lock based on the exclusive creation of a file.
+
+    Locks older than ``stale`` seconds are assumed to be left behind by a crashed process.
+    """
+
+    def __init__(self, path, timeout=10.0, stale=60.0):
+        self.path = path
+        self.timeout = timeout
+        self.stale = stale
+
+    def __enter__(self):
+        t0 = time.time()
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.close(fd)
+                return self
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+            try:
+                if time.time() - os.stat(self.path).st_mtime > self.stale:
+                    _remove(self.path)
+                    continue
+            except OSError:
+                continue
+            if time.time() - t0 > self.timeout:
+                raise RuntimeError('Could not acquire the cache lock: {}'.format(self.path))
+            time.sleep(0.01)
+
+    def __exit__(self, *args):
+        _remove(self.path)
+
+
+def _makedirs(path):
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _replace(src, dst):
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+    else:
+        # on Windows, rename fails if the destination exists
+        _remove(dst)
+        os.rename(src, dst)
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+
+    import doctest
+    doctest.testmod()
@@ -15,9 +15,46 @@ Functions
 
     compute_interface_forces_cvx
     compute_interface_forces_cvxopt
+    compute_interface_forces_newton
+    compute_interface_forces_dd
+    compute_interface_forces_stacked
     compute_interface_forces_xfunc
+    compute_interface_forces_xfunc_batch
     make_Aeq
     make_Aiq
+    set_interface_forces
+    equilibrate
+    unscale_solution
+    condition_estimate
+    diagnose_infeasibility
+    canonical_frame
+    equilibrium_key
+    compute_interface_forces_cached
+    estimate_memory
+    select_representation
+    peak_rss
+
+
+Classes
+=======
+
+.. autosummary::
+    :toctree: generated/
+    :nosignatures:
+
+    PhaseTimer
+    SolverMonitor
+    EquilibriumProblem
+
+
+Exceptions
+==========
+
+.. autosummary::
+    :toctree: generated/
+    :nosignatures:
+
+    MemoryBudgetError
 
 
 """
@@ -26,7 +63,15 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+from .timing import *
+from .memory import *
+from .telemetry import *
 from .helpers import *
+from .scaling import *
+from .problem import *
+from .diagnosis import *
 from .interfaceforces import *
+from .stacked import *
+from .caching import *
 
 __all__ = [name for name in dir() if not name.startswith('_')]
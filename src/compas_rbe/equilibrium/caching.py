@@ -0,0 +1,314 @@
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+import inspect
+
+import compas
+
+try:
+    from numpy import array
+    from numpy import cross
+    from numpy import sqrt
+    from numpy.linalg import eigh
+except ImportError:
+    compas.raise_if_not_ironpython()
+
+from compas_rbe.cache import DiskCache
+from compas_rbe.cache import digest
+from compas_rbe.cache import _jsonable
+
+from compas_rbe.equilibrium.interfaceforces import compute_interface_forces_cvx
+from compas_rbe.equilibrium.interfaceforces import compute_interface_forces_cvxopt
+from compas_rbe.equilibrium.interfaceforces import compute_interface_forces_newton
+from compas_rbe.equilibrium.interfaceforces import compute_interface_forces_dd
+from compas_rbe.equilibrium.telemetry import SOLVED
+
+
+__all__ = [
+    'canonical_frame',
+    'equilibrium_key',
+    'compute_interface_forces_cached',
+]
+
+
+BACKENDS = {
+    'cvx': compute_interface_forces_cvx,
+    'cvxopt': compute_interface_forces_cvxopt,
+    'newton': compute_interface_forces_newton,
+    # the name of the backend in earlier versions
+    'pgs': compute_interface_forces_newton,
+    'dd': compute_interface_forces_dd,
+}
+
+# parameters that don't influence the result
+
+IGNORED = ('assembly', 'verbose', 'processes', 'callback', 'problem')
+
+# increase the version if a change of the formulation (e.g. of the weights) invalidates stored results
+
+VERSION = 3
+
+
+def canonical_frame(assembly):
+    """Compute a frame of an assembly that moves with the assembly.
+
+    Parameters
+    ----------
+    assembly : compas_assembly.datastructures.Assembly
+        The assembly.
+
+    Returns
+    -------
+    tuple
+        The origin, the axes (as the rows of a rotation matrix)
+        and the size of the frame.
+
+    Notes
+    -----
+    The origin is the centroid of the centers of the blocks and the points of the interfaces.
+    The axes are the principal axes of these points,
+    with the direction of the first two axes chosen such that the third moment is positive,
+    and the third axis the cross product of the first two.
+    The frame is therefore the same for all copies of an assembly
+    that are related by a rigid motion (a rotation and a translation),
+    except if the principal axes or the directions are not unique,
+    for example for symmetric assemblies.
+
+    """
+    points = [assembly.blocks[key].center() for key in assembly.vertices()]
+    for u, v, attr in assembly.edges(True):
+        points += attr['interface_points']
+
+    points = array(points, dtype=float)
+
+    origin = points.mean(axis=0)
+    points = points - origin
+
+    values, vectors = eigh(points.T.dot(points))
+    axes = vectors[:, ::-1].T
+
+    for i in range(2):
+        if (points.dot(axes[i]) ** 3).sum() < 0:
+            axes[i] *= -1
+
+    axes[2] = cross(axes[0], axes[1])
+
+    size = max(sqrt(values.max() / len(points)), 1e-12)
+
+    return origin, axes, size
+
+
+def equilibrium_key(assembly, backend='cvx', **kwargs):
+    """Compute the key of an equilibrium problem in a result cache.
+
+    Parameters
+    ----------
+    assembly : compas_assembly.datastructures.Assembly
+        The assembly.
+    backend : {'cvx', 'cvxopt', 'newton', 'dd'}, optional
+        The equilibrium solver.
+        Default is ``'cvx'``.
+    kwargs : dict, optional
+        The keyword arguments of the solver.
+
+    Returns
+    -------
+    str
+        A digest of the centers and volumes of the blocks, the supports,
+        the points and frames of the interfaces,
+        the direction of gravity,
+        the solver and all its parameters, including the defaults.
+
+    Notes
+    -----
+    All geometry is expressed in the :func:`canonical_frame` of the assembly,
+    rounded to ``1e-6`` of its size,
+    and the blocks and interfaces are ordered by their canonical coordinates
+    instead of by their keys.
+    Of the (up to four) frames with the same principal axes,
+    the one with the smallest representation is used,
+    such that symmetric assemblies are handled consistently.
+    Copies of an assembly that are translated, or rotated about the vertical axis,
+    have the same key.
+    Other rotations change the direction of gravity in the canonical frame, and therefore the key.
+
+    The objective weights are fixed per backend
+    and are identified by the backend and the version of the formulation.
+    The interface forces of a previous solution are not part of the key.
+
+    """
+    return _canonical_problem(assembly, backend, **kwargs)[0]
+
+
+def compute_interface_forces_cached(assembly, backend='cvx', cache=None, **kwargs):
+    """Compute the interface forces of an assembly, or retrieve them from a result cache.
+
+    Parameters
+    ----------
+    assembly : compas_assembly.datastructures.Assembly
+        The assembly.
+    backend : {'cvx', 'cvxopt', 'newton', 'dd'}, optional
+        The equilibrium solver.
+        Default is ``'cvx'``.
+    cache : DiskCache or str, optional
+        The cache, or the path of the cache directory.
+        Default is a cache in :data:`compas_rbe.TEMP`.
+    kwargs : dict, optional
+        The keyword arguments of the solver.
+
+    Returns
+    -------
+    dict
+        The information returned by the solver,
+        with ``info['cached']`` indicating if the result was retrieved from the cache.
+        The interface forces of the assembly are updated in place.
+
+    Notes
+    -----
+    Only solutions are stored.
+    If the solver fails, for example because the problem is infeasible,
+    the result is not stored, and the problem is solved again the next time.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        cache = DiskCache(maxsize=100)
+
+        info = compute_interface_forces_cached(assembly, cache=cache, solver='ECOS')
+
+    """
+    if not isinstance(cache, DiskCache):
+        cache = DiskCache(cache)
+
+    key, edges = _canonical_problem(assembly, backend, **kwargs)
+
+    result = cache.get(key)
+
+    # the forces are stored in the canonical order of the interfaces
+    # the components are expressed in the local frames of the interfaces
+    # which move with the assembly
+
+    if result is not None:
+        for (u, v), forces in zip(edges, result['forces']):
+            assembly.edge[u][v]['interface_forces'] = forces
+
+        info = result['info']
+        info['cached'] = True
+        return info
+
+    info = BACKENDS[backend](assembly, **kwargs) or {}
+    info = _jsonable(info)
+
+    info['cached'] = False
+
+    # the forces of a failed solve are those of a previous solve, if any
+
+    if info.get('status') not in SOLVED:
+        return info
+
+    forces = [assembly.edge[u][v].get('interface_forces') for u, v in edges]
+
+    # the timings only apply to the computation that produced them
+
+    stored = dict(info)
+    stored.pop('timings', None)
+    stored.pop('cached')
+
+    cache.set(key, {'forces': forces, 'info': stored})
+
+    return info
+
+
+# ==============================================================================
+# Helpers
+# ==============================================================================
+
+
+def _canonical_problem(assembly, backend='cvx', precision=1e-6, **kwargs):
+    """Compute the key of an equilibrium problem,
+    and the edges of the assembly in canonical order."""
+    if backend not in BACKENDS:
+        raise ValueError('Unknown backend: {}'.format(backend))
+
+    # the defaults are included
+    # such that explicit and implicit default values result in the same key
+
+    func = BACKENDS[backend]
+    params = inspect.getcallargs(getattr(func, '__wrapped__', func), assembly, **kwargs)
+    params = {name: value for name, value in params.items() if name not in IGNORED}
+
+    origin, axes, size = canonical_frame(assembly)
+
+    # the directions of the principal axes are ambiguous if the assembly is (nearly) symmetric
+    # therefore all proper rotations with the same axes are tried
+    # and the smallest canonical representation is used
+
+    candidates = []
+
+    for s1, s2 in ((1, 1), (1, -1), (-1, 1), (-1, -1)):
+        frame = array([s1 * axes[0], s2 * axes[1], s1 * s2 * axes[2]])
+        blocks, interfaces, gravity = _canonical_geometry(assembly, origin, frame, size, precision)
+        geometry = [
+            gravity,
+            [block[:-1] for block in blocks],
+            [interface[1:-1] for interface in interfaces],
+        ]
+        candidates.append((digest(geometry), geometry, [interface[-1] for interface in interfaces]))
+
+    _, geometry, edges = min(candidates, key=lambda candidate: candidate[0])
+
+    key = digest(VERSION, backend, params, float('{0:.6e}'.format(size)), geometry)
+
+    return key, edges
+
+
+def _canonical_geometry(assembly, origin, axes, size, precision):
+    """Express the blocks, interfaces and gravity in a frame, ordered by their coordinates."""
+
+    def point(xyz):
+        xyz = axes.dot(array(xyz, dtype=float) - origin) / size
+        return [int(round(c / precision)) for c in xyz]
+
+    def vector(xyz):
+        xyz = axes.dot(array(xyz, dtype=float))
+        return [int(round(c / precision)) for c in xyz]
+
+    blocks = []
+    for key in assembly.vertices():
+        block = assembly.blocks[key]
+        blocks.append((
+            point(block.center()),
+            float('{0:.6e}'.format(block.volume())),
+            bool(assembly.vertex[key].get('is_support')),
+            key,
+        ))
+    blocks.sort(key=lambda block: block[:-1])
+
+    index = {block[-1]: i for i, block in enumerate(blocks)}
+
+    interfaces = []
+    for u, v, attr in assembly.edges(True):
+        points = [point(xyz) for xyz in attr['interface_points']]
+        interfaces.append((
+            sorted(points),
+            points,
+            [vector(xyz) for xyz in attr['interface_uvw']],
+            index[u],
+            index[v],
+            (u, v),
+        ))
+    interfaces.sort(key=lambda interface: interface[:-1])
+
+    gravity = vector([0.0, 0.0, -1.0])
+
+    return blocks, interfaces, gravity
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,206 @@
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+import compas
+
+try:
+    from numpy import array
+    from numpy import ones
+    from numpy.linalg import norm
+except ImportError:
+    compas.raise_if_not_ironpython()
+
+try:
+    import cvxpy
+except ImportError:
+    compas.raise_if_not_ironpython()
+
+from compas_rbe.equilibrium.helpers import make_Aeq
+from compas_rbe.equilibrium.helpers import make_Aiq
+from compas_rbe.equilibrium.scaling import equilibrate
+from compas_rbe.tracing import traced
+
+
+__all__ = ['diagnose_infeasibility']
+
+
+@traced()
+def diagnose_infeasibility(assembly,
+                           friction8=False,
+                           mu=0.6,
+                           density=1.0,
+                           tension=True,
+                           tol=1e-6,
+                           solver=None,
+                           verbose=False):
+    r"""Identify the blocks of an assembly of which the equilibrium can't be satisfied.
+
+    Solve the elastic relaxation of the equilibrium problem
+
+    .. math::
+
+        \begin{aligned}
+            & \underset{x, s^{+}, s^{-}}{\text{minimise}} & \quad \mathbf{1}^{T} (\mathbf{s}^{+} + \mathbf{s}^{-}) \\
+            & \text{such that} & \quad \mathbf{A} \mathbf{x} + \mathbf{s}^{+} - \mathbf{s}^{-} = \mathbf{b} \\
+            &                  & \quad \mathbf{G} \mathbf{x} \leq \mathbf{0} \\
+            &                  & \quad \mathbf{s}^{+}, \mathbf{s}^{-} \geq \mathbf{0} \\
+        \end{aligned}
+
+    The problem is always feasible, and the (sparse) slacks are the loads that can't be
+    carried by the interfaces.
+    The multipliers of the equilibrium constraints form a Farkas certificate of the infeasibility
+    of the original problem, which can be interpreted as a virtual motion (a collapse mechanism)
+    of the blocks.
+
+    Parameters
+    ----------
+    assembly : Assembly
+        The rigid block assembly.
+    friction8 : bool, optional
+        Use an eight-sided friction pyramid.
+        Default is ``False``.
+    mu : float, optional
+        The friction coefficient.
+        Default is ``0.6``.
+    density : float, optional
+        Density of the block material.
+        Default is ``1.0``
+    tension : bool, optional
+        Allow tension at the interfaces.
+        Default is ``True``.
+    tol : float, optional
+        Blocks with a relative out-of-balance load smaller than this value are not reported.
+        Default is ``1e-6``.
+    solver : {'ECOS', 'CVXOPT', 'MOSEK', 'CPLEX'}, optional
+        The solver to be used internally.
+        Default is ``'ECOS'``.
+    verbose : bool, optional
+        Print information during the execution of the algorithm.
+        Default is ``False``.
+
+    Returns
+    -------
+    list
+        One dict per failing block, ordered from the largest to the smallest violation,
+        with the ``'key'`` of the block,
+        its relative out-of-balance load (``'violation'``),
+        the out-of-balance ``'force'`` and ``'moment'`` vectors,
+        the virtual ``'motion'`` of the block from the Farkas certificate,
+        and the ``'edges'`` of its interfaces.
+        The violations are also stored in the vertex attribute ``'infeasibility'``.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        info = compute_interface_forces_cvx(assembly)
+
+        if info['status'] == 'infeasible':
+            for item in diagnose_infeasibility(assembly)[:10]:
+                print(item['key'], item['violation'])
+
+    """
+    if not solver:
+        solver = 'ECOS'
+
+    key_index = {key: index for index, key in enumerate(assembly.vertices())}
+
+    fixed = [key for key in assembly.vertices_where({'is_support': True})]
+    free  = [key for key in assembly.vertices() if key not in fixed]
+
+    # ==========================================================================
+    # constraints
+    # ==========================================================================
+
+    A, vcount = make_Aeq(assembly, tension=tension)
+    A = A.tocsr()[[key_index[key] * 6 + i for key in free for i in range(6)], :]
+
+    b = [[0, 0, -1 * assembly.blocks[key].volume() * density, 0, 0, 0] for key in free]
+    b = array(b, dtype=float).flatten()
+
+    G = make_Aiq(vcount, friction8, mu, tension=tension).tocsr()
+
+    # the rows are equilibrated to make the slacks of the force and moment rows comparable
+
+    A, b, G, _, scaling = equilibrate(A, b, G, ones(A.shape[1]), columns=False)
+
+    # ==========================================================================
+    # elastic relaxation
+    # ==========================================================================
+
+    m, n = A.shape
+
+    x = cvxpy.Variable(n)
+    sp = cvxpy.Variable(m, nonneg=True)
+    sn = cvxpy.Variable(m, nonneg=True)
+
+    objective = cvxpy.Minimize(cvxpy.sum(sp + sn))
+
+    constraints = [
+        A * x + sp - sn == b,
+        G * x <= 0
+    ]
+
+    problem = cvxpy.Problem(objective, constraints)
+    problem.solve(solver=getattr(cvxpy, solver), verbose=verbose)
+
+    if problem.status not in (cvxpy.OPTIMAL, cvxpy.OPTIMAL_INACCURATE):
+        raise Exception('The elastic relaxation could not be solved: {}'.format(problem.status))
+
+    # ==========================================================================
+    # map the slacks to the blocks
+    # ==========================================================================
+
+    s = array(sp.value - sn.value).flatten()
+    y = array(constraints[0].dual_value).flatten() * scaling['rows']
+
+    # slacks in the original units
+
+    r = s * scaling['force'] / scaling['rows']
+
+    total = max(norm(b), 1e-12)
+
+    edges = {key: [] for key in free}
+    for u, v in assembly.edges():
+        if u in edges:
+            edges[u].append((u, v))
+        if v in edges:
+            edges[v].append((u, v))
+
+    failing = []
+
+    for index, key in enumerate(free):
+        violation = norm(s[6 * index: 6 * index + 6]) / total
+
+        assembly.vertex[key]['infeasibility'] = violation
+
+        if violation < tol:
+            continue
+
+        failing.append({
+            'key': key,
+            'violation': violation,
+            'force': r[6 * index: 6 * index + 3].tolist(),
+            'moment': r[6 * index + 3: 6 * index + 6].tolist(),
+            'motion': y[6 * index: 6 * index + 6].tolist(),
+            'edges': edges[key],
+        })
+
+    failing.sort(key=lambda item: item['violation'], reverse=True)
+
+    if verbose:
+        print('')
+        print('failing blocks', len(failing))
+        for item in failing[:10]:
+            print('{0:>10}  {1:.3e}'.format(item['key'], item['violation']))
+
+    return failing
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+    pass
@@ -13,14 +13,18 @@ except ImportError:
 
 from compas.geometry import cross_vectors
 
+from compas_rbe.tracing import traced
+
 
 __all__ = [
     'make_Aeq',
     'make_Aiq',
+    'set_interface_forces',
 ]
 
 
-def make_Aeq(assembly, return_vcount=True):
+@traced(category='matrix')
+def make_Aeq(assembly, return_vcount=True, tension=True):
     """Create the equilibrium matrix.
 
     Parameters
@@ -30,6 +34,10 @@ def make_Aeq(assembly, return_vcount=True):
     return_vcount : bool, optional
         Include the total number of interface vertices in the return value.
         Default is `True`.
+    tension : bool, optional
+        Include the tension component of the contact forces.
+        If `False`, there are 3 instead of 4 unknowns per interface vertex.
+        Default is `True`.
 
     Returns
     =======
@@ -49,6 +57,8 @@ def make_Aeq(assembly, return_vcount=True):
 
     vcount = 0
 
+    nv = 4 if tension else 3
+
     key_index = {key: index for index, key in enumerate(assembly.vertices())}
 
     for u, v, attr in assembly.edges(True):
@@ -67,22 +77,22 @@ def make_Aeq(assembly, return_vcount=True):
         center = assembly.blocks[u].center()
 
         # B1
-        block_rows, block_cols, block_data = _make_Aeq_block(interface, center, False)
+        block_rows, block_cols, block_data = _make_Aeq_block(interface, center, False, tension)
 
         # shift rows and cols
         rows += [row + 6 * i for row in block_rows]
-        cols += [col + 4 * vcount for col in block_cols]
+        cols += [col + nv * vcount for col in block_cols]
         data += block_data
 
         # process the v block
         center = assembly.blocks[v].center()
 
         # B2
-        block_rows, block_cols, block_data = _make_Aeq_block(interface, center, True)
+        block_rows, block_cols, block_data = _make_Aeq_block(interface, center, True, tension)
 
         # shift rows and cols
         rows += [row + 6 * j for row in block_rows]
-        cols += [col + 4 * vcount for col in block_cols]
+        cols += [col + nv * vcount for col in block_cols]
         data += block_data
 
         # B1 and B2 have the same size
@@ -97,7 +107,7 @@ def make_Aeq(assembly, return_vcount=True):
     return coo_matrix((data, (rows, cols)))
 
 
-def _make_Aeq_block(interface, center, reverse):
+def _make_Aeq_block(interface, center, reverse, tension=True):
     """Create the sub matrix block of Aeq for interface k and block j."""
 
     rows = []
@@ -111,9 +121,16 @@ def _make_Aeq_block(interface, center, reverse):
         v = [-1.0 * axis for axis in v]
         w = [-1.0 * axis for axis in w]
 
-    fx = [w[0], - w[0], u[0], v[0]]
-    fy = [w[1], - w[1], u[1], v[1]]
-    fz = [w[2], - w[2], u[2], v[2]]
+    if tension:
+        fx = [w[0], - w[0], u[0], v[0]]
+        fy = [w[1], - w[1], u[1], v[1]]
+        fz = [w[2], - w[2], u[2], v[2]]
+    else:
+        fx = [w[0], u[0], v[0]]
+        fy = [w[1], u[1], v[1]]
+        fz = [w[2], u[2], v[2]]
+
+    nv = len(fx)
 
     for i in range(len(interface['points'])):
 
@@ -128,12 +145,17 @@ def _make_Aeq_block(interface, center, reverse):
         mv = cross_vectors(v, rxyz)
         mw = cross_vectors(w, rxyz)
 
-        mx = [mw[0], - mw[0], mu[0], mv[0]]
-        my = [mw[1], - mw[1], mu[1], mv[1]]
-        mz = [mw[2], - mw[2], mu[2], mv[2]]
+        if tension:
+            mx = [mw[0], - mw[0], mu[0], mv[0]]
+            my = [mw[1], - mw[1], mu[1], mv[1]]
+            mz = [mw[2], - mw[2], mu[2], mv[2]]
+        else:
+            mx = [mw[0], mu[0], mv[0]]
+            my = [mw[1], mu[1], mv[1]]
+            mz = [mw[2], mu[2], mv[2]]
 
-        for j in range(4):
-            col = j + (i * 4)
+        for j in range(nv):
+            col = j + (i * nv)
             # ?
             if fx[j]:
                 rows.append(0)
@@ -168,7 +190,8 @@ def _make_Aeq_block(interface, center, reverse):
     return rows, cols, data
 
 
-def make_Aiq(total_vcount, friction8=False, mu=0.6):
+@traced(category='matrix')
+def make_Aiq(total_vcount, friction8=False, mu=0.6, tension=True):
     r"""Construct the matrix of inequality constraints of a quadratic program.
 
     Parameters
@@ -180,6 +203,9 @@ def make_Aiq(total_vcount, friction8=False, mu=0.6):
         Default is `False`.
     mu : float, optional
         The friction coefficient of the interface surfaces.
+    tension : bool, optional
+        Include the tension component of the contact forces.
+        Default is `True`.
 
     Returns
     =======
@@ -266,6 +292,11 @@ def make_Aiq(total_vcount, friction8=False, mu=0.6):
         and the opposite/negative value of the friction components to be smaller than
         :math:`\mu c^{n+}_{i}`, which is postive.
 
+    Without the tension components (``tension=False``),
+    there are 3 unknowns per vertex, :math:`[c^{n+}_{i}, c^{u}_{i}, c^{v}_{i}]`,
+    and the second row and column of :math:`\mathbf{G}[i:i+6, j:j+4]` are removed.
+    Tension at the interfaces is then simply not possible.
+
     References
     ==========
 
@@ -281,46 +312,108 @@ def make_Aiq(total_vcount, friction8=False, mu=0.6):
     i = 0
     j = 0
 
+    # number of normal rows and columns per vertex
+
+    t = 2 if tension else 1
+
     for n in range(total_vcount):
 
         # negative (?) normal forces
 
-        rows += [i, i + 1]
-        cols += [j, j + 1]
-        data += [-1, -1]
+        if tension:
+            rows += [i, i + 1]
+            cols += [j, j + 1]
+            data += [-1, -1]
+        else:
+            rows += [i]
+            cols += [j]
+            data += [-1]
 
         # friction4
 
-        rows += [i + 2, i + 2, i + 3, i + 3, i + 4, i + 4, i + 5, i + 5]
-        cols += [j    , j + 2, j    , j + 2, j    , j + 3, j    , j + 3]
-        data += [-mu  , 1    , -mu  , -1   , -mu  , 1    , -mu  ,    -1]
+        ju = j + t
+        jv = j + t + 1
+
+        rows += [i + t, i + t, i + t + 1, i + t + 1, i + t + 2, i + t + 2, i + t + 3, i + t + 3]
+        cols += [j    , ju   , j        , ju       , j        , jv       , j        , jv]
+        data += [-mu  , 1    , -mu      , -1       , -mu      , 1        , -mu      , -1]
 
         if not friction8:
-            i += 6
+            i += t + 4
         else:
-            rows += [i + 6, i + 6, i + 6]
-            cols += [j, j + 2, j + 3]
+            rows += [i + t + 4, i + t + 4, i + t + 4]
+            cols += [j, ju, jv]
             data += [-mu, c_8, c_8]
 
-            rows += [i + 7, i + 7, i + 7]
-            cols += [j, j + 2, j + 3]
+            rows += [i + t + 5, i + t + 5, i + t + 5]
+            cols += [j, ju, jv]
             data += [-mu, -c_8, -c_8]
 
-            rows += [i + 8, i + 8, i + 8]
-            cols += [j, j + 2, j + 3]
+            rows += [i + t + 6, i + t + 6, i + t + 6]
+            cols += [j, ju, jv]
             data += [-mu, c_8, -c_8]
 
-            rows += [i + 9, i + 9, i + 9]
-            cols += [j, j + 2, j + 3]
+            rows += [i + t + 7, i + t + 7, i + t + 7]
+            cols += [j, ju, jv]
             data += [-mu, -c_8, c_8]
 
-            i += 10
+            i += t + 8
 
-        j += 4
+        j += t + 2
 
     return coo_matrix((data, (rows, cols)))
 
 
+@traced()
+def set_interface_forces(assembly, x, tension=True):
+    """Write a solution vector back to the interfaces of an assembly.
+
+    Parameters
+    ----------
+    assembly : compas_assembly.datastructures.Assembly
+        The assembly the solution was computed for.
+    x : list
+        The *4n* vector of contact force components,
+        ordered per interface vertex as ``[c_np, c_nn, c_u, c_v]``
+        and per interface in the order of ``assembly.edges()``.
+    tension : bool, optional
+        If `False`, the vector has *3n* components ``[c_np, c_u, c_v]``,
+        and the tension components are set to zero.
+        Default is `True`.
+
+    Returns
+    -------
+    None
+        The ``interface_forces`` attribute of the edges is updated in place.
+
+    """
+    offset = 0
+
+    for u, v, attr in assembly.edges(True):
+
+        n = len(attr['interface_points'])
+
+        attr['interface_forces'] = []
+
+        for i in range(n):
+            if tension:
+                attr['interface_forces'].append({
+                    'c_np': x[offset + 4 * i + 0],
+                    'c_nn': x[offset + 4 * i + 1],
+                    'c_u' : x[offset + 4 * i + 2],
+                    'c_v' : x[offset + 4 * i + 3]
+                })
+            else:
+                attr['interface_forces'].append({
+                    'c_np': x[offset + 3 * i + 0],
+                    'c_nn': 0.0,
+                    'c_u' : x[offset + 3 * i + 1],
+                    'c_v' : x[offset + 3 * i + 2]
+                })
+
+        offset += (4 if tension else 3) * n
+
+
 # ==============================================================================
 # Debugging
 # ==============================================================================
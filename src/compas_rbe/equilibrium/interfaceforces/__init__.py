@@ -4,25 +4,216 @@ from __future__ import print_function
 
 from .interfaceforces_cvx import *
 from .interfaceforces_cvxopt import *
+from .interfaceforces_newton import *
+from .interfaceforces_dd import *
 
+from compas_rbe.cache import LRUCache as _LRUCache
+from compas_rbe.cache import _jsonable
+from compas_rbe.tracing import trace as _span
+from compas_rbe.tracing import _recording
 
-def compute_interface_forces_xfunc(data, backend='cvx', **kwargs):
+
+# results of the batch jobs of this process
+
+_JOBS = _LRUCache(maxsize=64)
+
+
+def compute_interface_forces_xfunc(data, backend='cvx', cache=None, trace=None, **kwargs):
+    """Compute the interface forces of an assembly in a separate process.
+
+    Parameters
+    ----------
+    data : dict
+        The ``'assembly'`` data and the data of its ``'blocks'``.
+    backend : {'cvx', 'cvxopt', 'newton', 'dd'}, optional
+        The equilibrium solver.
+        Default is ``'cvx'``.
+    cache : bool or str, optional
+        Reuse the result of an equivalent problem from a cache,
+        with ``True`` for the default cache, or the path of a cache.
+        See :func:`compute_interface_forces_cached`.
+        Default is ``None``.
+    trace : str, optional
+        The path of a trace file of the calling process,
+        to which the spans of this call are added.
+        See :mod:`compas_rbe.tracing`.
+        Default is ``None``.
+
+    Returns
+    -------
+    dict
+        The updated ``'assembly'`` and ``'blocks'`` data, and the solver ``'info'``.
+
+    """
+    with _recording(trace, 'xfunc'):
+        with _span('compute_interface_forces_xfunc', category='xfunc', backend=backend):
+            return _compute_interface_forces_xfunc(data, backend, cache, **kwargs)
+
+
+def _compute_interface_forces_xfunc(data, backend='cvx', cache=None, **kwargs):
     from compas_assembly.datastructures import Assembly
     from compas_assembly.datastructures import Block
 
-    assembly = Assembly.from_data(data['assembly'])
-    assembly.blocks = {int(key): Block.from_data(data['blocks'][key]) for key in data['blocks']}
+    with _span('from_data', category='xfunc'):
+        assembly = Assembly.from_data(data['assembly'])
+        assembly.blocks = {int(key): Block.from_data(data['blocks'][key]) for key in data['blocks']}
+
+    info = None
+
+    if cache:
+        from compas_rbe.equilibrium.caching import compute_interface_forces_cached
+
+        info = compute_interface_forces_cached(assembly, backend, None if cache is True else cache, **kwargs)
+
+    elif backend == 'cvx':
+        info = compute_interface_forces_cvx(assembly, **kwargs)
+
+    elif backend == 'cvxopt':
+        info = compute_interface_forces_cvxopt(assembly, **kwargs)
+
+    elif backend in ('newton', 'pgs'):
+        info = compute_interface_forces_newton(assembly, **kwargs)
+
+    elif backend == 'dd':
+        info = compute_interface_forces_dd(assembly, **kwargs)
+
+    with _span('to_data', category='xfunc'):
+        return {
+            'assembly': assembly.to_data(),
+            'blocks': {str(key): assembly.blocks[key].to_data() for key in assembly.blocks},
+            'info': _jsonable(info),
+        }
+
+
+def compute_interface_forces_xfunc_batch(jobs, processes=None, cache=True, trace=None):
+    """Compute the interface forces of a list of assemblies in a single call.
+
+    Parameters
+    ----------
+    jobs : list
+        The jobs, as dicts with the ``'assembly'`` and ``'blocks'`` data
+        (as for :func:`compute_interface_forces_xfunc`),
+        and optionally the ``'backend'`` and the keyword arguments of the solver (``'kwargs'``).
+    processes : int, optional
+        The number of worker processes.
+        By default, all jobs are run in the current process.
+    cache : bool, optional
+        Reuse the result of an identical job in the same process.
+        Default is ``True``.
+    trace : str, optional
+        The path of a trace file of the calling process,
+        to which the spans of this call and of its workers are added.
+        See :mod:`compas_rbe.tracing`.
+        Default is ``None``.
+
+    Returns
+    -------
+    list
+        Per job, in the order of the jobs,
+        the updated ``'assembly'`` and ``'blocks'`` data,
+        the ``'status'``, which is the status of the solver, or ``'error'`` if the job failed,
+        the solver ``'info'``, the ``'time'`` in seconds,
+        and the ``'error'`` message, if any.
+
+    Notes
+    -----
+    The jobs share the imports and the result cache of the process(es) in which they run.
+    Only the results of jobs that were solved are cached.
+    With a pool, the jobs are distributed in chunks over the workers.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        f = XFunc('compas_rbe.equilibrium.compute_interface_forces_xfunc_batch')
+
+        jobs = [{'assembly': a.to_data(), 'blocks': blocks_data(a), 'kwargs': {'solver': 'ECOS'}} for a in assemblies]
+        results = f(jobs)
+
+    """
+    with _recording(trace, 'xfunc'):
+        with _span('compute_interface_forces_xfunc_batch', category='xfunc', jobs=len(jobs)):
+            return _run_jobs(jobs, processes, cache)
+
+
+def _run_jobs(jobs, processes=None, cache=True):
+    if not processes or processes == 1 or len(jobs) < 2:
+        return [_run_job(job, cache) for job in jobs]
+
+    from multiprocessing import Pool
+    from functools import partial
+
+    pool = Pool(processes)
+    try:
+        chunksize = max(1, len(jobs) // (4 * processes))
+        results = pool.map(partial(_run_job, cache=cache), jobs, chunksize)
+        pool.close()
+    except Exception:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    return results
+
+
+def _run_job(job, cache=True):
+    import time
+    import traceback
+
+    from copy import deepcopy
+
+    from compas_rbe.cache import digest
+    from compas_rbe.equilibrium.telemetry import SOLVED
+
+    backend = job.get('backend', 'cvx')
+    kwargs = job.get('kwargs') or {}
+
+    data = {'assembly': job['assembly'], 'blocks': job['blocks']}
+
+    key = digest(data, backend, kwargs) if cache else None
+
+    if key:
+        result = _JOBS.get(key)
+        if result is not None:
+            result = deepcopy(result)
+            result['info']['cached'] = True
+            result['time'] = 0.0
+            return result
+
+    t0 = time.time()
+
+    result = {'assembly': None, 'blocks': None, 'status': None, 'info': None, 'time': None, 'error': None}
+
+    try:
+        from compas_assembly.datastructures import Assembly
+        from compas_assembly.datastructures import Block
+
+        from compas_rbe.equilibrium.caching import BACKENDS
+
+        with _span('from_data', category='xfunc'):
+            assembly = Assembly.from_data(deepcopy(data['assembly']))
+            assembly.blocks = {int(key): Block.from_data(data['blocks'][key]) for key in data['blocks']}
+
+        info = BACKENDS[backend](assembly, **kwargs) or {}
+
+        with _span('to_data', category='xfunc'):
+            result['assembly'] = assembly.to_data()
+            result['blocks'] = {str(key): assembly.blocks[key].to_data() for key in assembly.blocks}
+        result['status'] = info.get('status')
+        result['info'] = _jsonable(info)
+        result['info']['cached'] = False
+
+    except Exception:
+        result['status'] = 'error'
+        result['error'] = traceback.format_exc().strip().splitlines()[-1]
 
-    if backend == 'cvx':
-        compute_interface_forces_cvx(assembly, **kwargs)
+    result['time'] = time.time() - t0
 
-    if backend == 'cvxopt':
-        compute_interface_forces_cvxopt(assembly, **kwargs)
+    if key and result['status'] in SOLVED:
+        _JOBS.set(key, deepcopy(result))
 
-    return {
-        'assembly': assembly.to_data(),
-        'blocks': {str(key): assembly.blocks[key].to_data() for key in assembly.blocks}
-    }
+    return result
 
 
 __all__ = [name for name in dir() if not name.startswith('_')]
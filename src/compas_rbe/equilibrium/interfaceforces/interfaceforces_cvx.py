@@ -6,9 +6,8 @@ import compas
 
 try:
     from numpy import array
-    from numpy import zeros
-    from numpy import diagflat
     from numpy import absolute
+    from numpy import sqrt
 except ImportError:
     compas.raise_if_not_ironpython()
 
@@ -17,8 +16,17 @@ try:
 except ImportError:
     compas.raise_if_not_ironpython()
 
-from compas_rbe.equilibrium.helpers import make_Aeq
-from compas_rbe.equilibrium.helpers import make_Aiq
+from compas_rbe.equilibrium.helpers import set_interface_forces
+from compas_rbe.equilibrium.scaling import unscale_solution
+from compas_rbe.equilibrium.scaling import condition_estimate
+from compas_rbe.equilibrium.diagnosis import diagnose_infeasibility
+from compas_rbe.equilibrium.timing import PhaseTimer
+from compas_rbe.equilibrium.memory import estimate_memory
+from compas_rbe.equilibrium.memory import select_representation
+from compas_rbe.equilibrium.telemetry import SolverMonitor
+from compas_rbe.equilibrium.problem import EquilibriumProblem
+from compas_rbe.equilibrium.problem import WEIGHTS
+from compas_rbe.tracing import traced
 
 from numpy import set_printoptions
 set_printoptions(linewidth=1000)
@@ -27,13 +35,21 @@ set_printoptions(linewidth=1000)
 __all__ = ['compute_interface_forces_cvx']
 
 
+@traced(category='backend')
 def compute_interface_forces_cvx(assembly,
                                  friction8=False,
                                  mu=0.6,
                                  density=1.0,
                                  verbose=False,
                                  maxiters=1000,
-                                 solver=None):
+                                 solver=None,
+                                 scale=True,
+                                 tension=True,
+                                 diagnose=False,
+                                 sparse='auto',
+                                 budget=None,
+                                 callback=None,
+                                 problem=None):
     r"""Compute the forces at the interfaces between the blocks of an assembly.
 
     Solve the following optimisation problem:
@@ -70,11 +86,52 @@ def compute_interface_forces_cvx(assembly,
     solver : {'OSQP', 'ECOS', 'CVXOPT', 'MOSEK', 'CPLEX'}, optional
         The solver to be used internally.
         Default is ``'ECOS'``.
+    scale : bool, optional
+        Equilibrate the problem before solving it.
+        Default is ``True``.
+    tension : {True, False, 'auto'}, optional
+        Allow tension at the interfaces.
+        If ``True``, tension is allowed but penalised with a large weight.
+        If ``False``, the tension components of the contact forces are removed from the problem.
+        With ``'auto'``, the problem is solved without tension first,
+        and with tension only if that problem can't be solved.
+        Default is ``True``.
+    diagnose : bool, optional
+        If the problem is infeasible, identify the blocks that can't be in equilibrium
+        with :func:`diagnose_infeasibility`.
+        Default is ``False``.
+    sparse : {'auto', True, False}, optional
+        Use sparse matrices.
+        With ``'auto'``, sparse matrices are only used if the dense ones would exceed the ``budget``.
+        Default is ``'auto'``.
+    budget : float, optional
+        The memory budget for the matrices of the problem, in MB.
+        See :func:`estimate_memory`.
+        Default is no budget.
+    callback : callable, optional
+        A function that is called with the final report of the solver.
+        The iterations of the solver can't be reported (see the notes).
+        See :class:`SolverMonitor`.
+        Default is ``None``.
+    problem : EquilibriumProblem, optional
+        The problem of the assembly, with the matrices of previous solves.
+        Its parameters are set to the parameters of this solve.
+        Default is a new problem.
 
     Returns
     -------
-    None
-        The assembly is updated in place.
+    dict
+        Information about the solution process,
+        with the solver ``'status'``, the value of the ``'objective'`` function,
+        the number of ``'iterations'`` of the solver,
+        the force and cost factors of the ``'scaling'``, if any,
+        whether ``'tension'`` was allowed,
+        the failing blocks of the ``'diagnosis'`` of an infeasible problem, if requested,
+        the representation of the matrices and the estimate of their ``'memory'``,
+        the wall and CPU ``'timings'`` and the memory of the phases of the computation
+        (see :meth:`PhaseTimer.to_data`),
+        and the ``'progress'`` of the solver, which is always empty.
+        The interface forces of the assembly are updated in place.
 
     References
     ----------
@@ -93,6 +150,11 @@ def compute_interface_forces_cvx(assembly,
     * OSQP solver settings: https://osqp.org/docs/interfaces/solver_settings.html#solver-settings
     * CVXPY background: http://www.cvxpy.org/short_course/index.html
 
+    The final report of the solver is logged to ``'compas_rbe.equilibrium'``.
+    The progress of the iterations can't be reported to the ``callback`` or to the log.
+    The solvers behind CVXPY print it from compiled code directly to the console of the process,
+    bypassing ``sys.stdout``, and only if ``verbose`` is ``True``.
+    Use the CVXOPT backend to follow the iterations of an interior point solver.
 
     Examples
     --------
@@ -104,59 +166,96 @@ def compute_interface_forces_cvx(assembly,
     if not solver:
         solver = 'ECOS'
 
-    n = assembly.number_of_vertices()
+    if tension == 'auto':
+        options = dict(friction8=friction8, mu=mu, density=density, verbose=verbose,
+                       maxiters=maxiters, solver=solver, scale=scale, sparse=sparse, budget=budget,
+                       callback=callback, problem=problem)
+
+        try:
+            info = compute_interface_forces_cvx(assembly, tension=False, **options)
+        except cvxpy.error.SolverError:
+            info = None
+
+        if info and info['status'] in (cvxpy.OPTIMAL, cvxpy.OPTIMAL_INACCURATE):
+            return info
 
-    key_index = {key: index for index, key in enumerate(assembly.vertices())}
+        return compute_interface_forces_cvx(assembly, tension=True, diagnose=diagnose, **options)
 
-    fixed = [key for key in assembly.vertices_where({'is_support': True})]
-    fixed = [key_index[key] for key in fixed]
-    free  = list(set(range(n)) - set(fixed))
+    timer = PhaseTimer()
+    monitor = SolverMonitor('cvx', callback)
 
     # ==========================================================================
-    # equality constraints
+    # memory
     # ==========================================================================
 
-    A, vcount = make_Aeq(assembly)
-    A = A.toarray()
-    A = A[[index * 6 + i for index in free for i in range(6)], :]
+    timer.phase('estimate')
+
+    estimate = estimate_memory(assembly, tension=tension, friction8=friction8)
+    sparse = select_representation(estimate, budget, sparse)
+
+    if problem is None:
+        problem = EquilibriumProblem(assembly)
 
-    b = [[0, 0, -1 * assembly.blocks[key].volume() * density, 0, 0, 0] for key in assembly.vertices()]
-    b = array(b, dtype=float)
-    b = b[free, :].reshape((-1, 1), order='C')
+    elif problem.assembly is not assembly:
+        raise ValueError('The problem is not the problem of the assembly.')
 
-    # print(A)
-    # print(b)
+    problem.update(friction8=friction8, mu=mu, density=density, tension=tension, sparse=sparse, weights=WEIGHTS['cvx'])
 
-    # print(A[:, :4])
-    # print(A[:, 4:8])
-    # print(A[:, 8:12])
-    # print(A[:, 12:16])
+    # the matrices are only built if they are not cached by the problem
 
-    # row-major ordering => fx, fy, fz, mx, my, mz, fx, fy, fz, mx, my, mz, ...
+    timer.phase('supports')
+
+    b = problem.b
 
     # ==========================================================================
-    # inequality constraints
+    # equality constraints
     # ==========================================================================
 
-    G = make_Aiq(vcount, False)
-    G = G.toarray()
+    timer.phase('Aeq')
 
-    # print(G.shape)
+    A = problem.A
 
-    h = zeros((G.shape[0], 1))
+    # ==========================================================================
+    # inequality constraints
+    # ==========================================================================
+
+    timer.phase('Aiq')
+
+    G = problem.G
+    h = problem.h
 
     # ==========================================================================
     # variables for the objective function
     # ==========================================================================
 
-    a1 = 1.0   # weights on the compression forces
-    a2 = 1e+5  # weights on the tension forces
-    a3 = 1e+2  # weights on the friction forces (same as compression weights in Whiting)
+    p = problem.p
+
+    # ==========================================================================
+    # scaling
+    # ==========================================================================
+
+    timer.phase('scaling')
+
+    scaling = None
+    cond = None
+
+    if scale:
+        if verbose:
+            cond = [condition_estimate(A)]
+
+        equilibrated = problem.equilibrated
 
-    p = array([a1, a2, a3, a3] * vcount)
-    P = diagflat(p)
+        A, b, G, p = equilibrated['A'], equilibrated['b'], equilibrated['G'], equilibrated['p']
+        scaling = equilibrated['scaling']
 
-    q = zeros((4 * vcount, 1))
+        if verbose:
+            cond.append(condition_estimate(A))
+
+    timer.phase('setup')
+
+    P = equilibrated['P'] if scale else problem.P
+
+    q = problem.q
 
     # ==========================================================================
     # sanity check
@@ -175,6 +274,10 @@ def compute_interface_forces_cvx(assembly,
         print('      A', A.shape)
         print('      b', b.shape)
 
+        if cond:
+            print('')
+            print('cond  A', '{0:.3e} => {1:.3e}'.format(*cond))
+
     # ==========================================================================
     # solve
     # ==========================================================================
@@ -214,19 +317,32 @@ def compute_interface_forces_cvx(assembly,
     else:
         x = cvxpy.Variable(P.shape[0])
 
-    objective = cvxpy.Minimize(0.5 * cvxpy.quad_form(x, P))
+    if sparse:
+        objective = cvxpy.Minimize(0.5 * cvxpy.sum_squares(cvxpy.multiply(sqrt(p).reshape(x.shape), x)))
+    else:
+        objective = cvxpy.Minimize(0.5 * cvxpy.quad_form(x, P))
 
     constraints = [
         A * x == b,
         G * x <= h
     ]
 
-    problem = cvxpy.Problem(objective, constraints)
+    program = cvxpy.Problem(objective, constraints)
 
-    problem.solve(solver=solver, verbose=verbose)
+    timer.phase('solve')
 
-    if not verbose:
-        print(problem.status)
+    program.solve(solver=solver, verbose=verbose)
+
+    timer.phase('update')
+
+    # the canonicalization of the program by CVXPY is part of the setup
+    # the CPU time is not split
+
+    compilation = getattr(program, 'compilation_time', None)
+
+    if compilation:
+        timer.add('solve', -compilation)
+        timer.add('setup', compilation)
 
     # OPTIMAL
     # INFEASIBLE
@@ -235,46 +351,79 @@ def compute_interface_forces_cvx(assembly,
     # INFEASIBLE_INACCURATE
     # UNBOUNDED_INACCURATE
 
-    if problem.status == cvxpy.OPTIMAL:
-        x = array(x.value).reshape((-1, 1))
+    objective = program.value
 
-        print(problem.value)
+    if scaling and objective is not None:
+        objective /= scaling['cost']
 
-    elif problem.status == cvxpy.OPTIMAL_INACCURATE:
+    if program.status == cvxpy.OPTIMAL:
         x = array(x.value).reshape((-1, 1))
 
-        print(problem.value)
+    elif program.status == cvxpy.OPTIMAL_INACCURATE:
+        x = array(x.value).reshape((-1, 1))
 
     else:
         x = None
 
+    stats = program.solver_stats
+
+    monitor.done(program.status,
+                 objective=objective,
+                 iterations=stats.num_iters,
+                 solver=stats.solver_name,
+                 solve_time=stats.solve_time,
+                 setup_time=stats.setup_time)
+
     # ==========================================================================
     # update
     # ==========================================================================
 
     if x is not None:
 
-        x[absolute(x) < 1e-6] = 0.0
-
-        x = x.flatten().tolist()
+        if scaling:
+            x = unscale_solution(x, scaling)
 
-        offset = 0
-
-        for u, v, attr in assembly.edges(True):
-
-            n = len(attr['interface_points'])
-
-            attr['interface_forces'] = []
-
-            for i in range(n):
-                attr['interface_forces'].append({
-                    'c_np': x[offset + 4 * i + 0],
-                    'c_nn': x[offset + 4 * i + 1],
-                    'c_u' : x[offset + 4 * i + 2],
-                    'c_v' : x[offset + 4 * i + 3]
-                })
+        x[absolute(x) < 1e-6] = 0.0
 
-            offset += 4 * n
+        set_interface_forces(assembly, x.flatten().tolist(), tension=tension)
+
+    info = {
+        'memory': {
+            'sparse': sparse,
+            'estimate': (estimate['sparse'] if sparse else estimate['dense']) / 2 ** 20,
+            'budget': budget,
+        },
+        'status': program.status,
+        'objective': objective,
+        'iterations': stats.num_iters,
+        'scaling': None,
+        'tension': tension,
+        'diagnosis': None,
+        'progress': monitor.history,
+    }
+
+    if scaling:
+        info['scaling'] = {
+            'force': scaling['force'],
+            'cost': scaling['cost'],
+            'cond': cond,
+        }
+
+    if diagnose and program.status in (cvxpy.INFEASIBLE, cvxpy.INFEASIBLE_INACCURATE):
+        timer.phase('diagnosis')
+        info['diagnosis'] = diagnose_infeasibility(assembly,
+                                                   friction8=friction8,
+                                                   mu=mu,
+                                                   density=density,
+                                                   tension=tension,
+                                                   solver=solver,
+                                                   verbose=verbose)
+
+    timer.stop()
+
+    info['timings'] = timer.to_data()
+
+    return info
 
 
 # ==============================================================================
@@ -6,8 +6,6 @@ import compas
 
 try:
     from numpy import array
-    from numpy import zeros
-    from numpy import diagflat
     from numpy import absolute
 except ImportError:
     compas.raise_if_not_ironpython()
@@ -17,8 +15,16 @@ try:
 except ImportError:
     compas.raise_if_not_ironpython()
 
-from compas_rbe.equilibrium.helpers import make_Aeq
-from compas_rbe.equilibrium.helpers import make_Aiq
+from compas_rbe.equilibrium.helpers import set_interface_forces
+from compas_rbe.equilibrium.scaling import unscale_solution
+from compas_rbe.equilibrium.scaling import condition_estimate
+from compas_rbe.equilibrium.timing import PhaseTimer
+from compas_rbe.equilibrium.memory import estimate_memory
+from compas_rbe.equilibrium.memory import select_representation
+from compas_rbe.equilibrium.telemetry import SolverMonitor
+from compas_rbe.equilibrium.problem import EquilibriumProblem
+from compas_rbe.equilibrium.problem import WEIGHTS
+from compas_rbe.tracing import traced
 
 
 __all__ = [
@@ -26,12 +32,20 @@ __all__ = [
 ]
 
 
+@traced(category='backend')
 def compute_interface_forces_cvxopt(assembly,
                                     friction8=False,
                                     mu=0.6,
                                     density=1.0,
-                                    verbose=True,
-                                    maxiters=1000):
+                                    verbose=False,
+                                    maxiters=1000,
+                                    scale=True,
+                                    tension=True,
+                                    sparse='auto',
+                                    budget=None,
+                                    callback=None,
+                                    options=None,
+                                    problem=None):
     r"""Compute the forces at the interfaces between the blocks of an assembly.
 
     Solve the following optimisation problem:
@@ -64,17 +78,70 @@ def compute_interface_forces_cvxopt(assembly,
     maxiters : int, optional
         Maximum number of iterations used by the solver.
         Default is ``100``.
+    scale : bool, optional
+        Equilibrate the problem before solving it.
+        Default is ``True``.
+    tension : {True, False, 'auto'}, optional
+        Allow tension at the interfaces.
+        If ``True``, tension is allowed but penalised with a large weight.
+        If ``False``, the tension components of the contact forces are removed from the problem.
+        With ``'auto'``, the problem is solved without tension first,
+        and with tension only if that problem can't be solved,
+        or if the solver fails on it.
+        Default is ``True``.
+    sparse : {'auto', True, False}, optional
+        Use sparse matrices.
+        With ``'auto'``, sparse matrices are only used if the dense ones would exceed the ``budget``.
+        Default is ``'auto'``.
+    budget : float, optional
+        The memory budget for the matrices of the problem, in MB.
+        See :func:`estimate_memory`.
+        Default is no budget.
+    callback : callable, optional
+        A function that is called with the progress of every iteration of the solver,
+        and with its final report.
+        See :class:`SolverMonitor`.
+        Default is ``None``.
+    options : dict, optional
+        Additional options of the CVXOPT solver for this call,
+        such as ``'abstol'``, ``'reltol'``, ``'feastol'`` or ``'refinement'``.
+        Default is ``None``.
+    problem : EquilibriumProblem, optional
+        The problem of the assembly, with the matrices of previous solves.
+        Its parameters are set to the parameters of this solve.
+        Default is a new problem.
 
     Returns
     -------
-    None
-        The assembly is updated in place.
+    dict
+        Information about the solution process,
+        with the solver ``'status'``, the value of the ``'objective'`` function,
+        the number of ``'iterations'`` of the solver,
+        the force and cost factors of the ``'scaling'``, if any,
+        whether ``'tension'`` was allowed,
+        the representation of the matrices and the estimate of their ``'memory'``,
+        the wall and CPU ``'timings'`` and the memory of the phases of the computation
+        (see :meth:`PhaseTimer.to_data`),
+        and the ``'progress'`` of the solver,
+        with per iteration the primal and dual objective (``'pcost'``, ``'dcost'``),
+        the duality ``'gap'`` and the primal and dual residuals (``'pres'``, ``'dres'``).
+        The interface forces of the assembly are updated in place.
 
     References
     ----------
     The computational procedure for calculating the interface forces is described
     in detail in [Frick2015]_
 
+    Notes
+    -----
+    The progress of the solver is parsed from the output of CVXOPT,
+    which is only printed if ``verbose`` is ``True``,
+    and logged to ``'compas_rbe.equilibrium'``.
+
+    The options of the solver are passed with every call.
+    The global ``cvxopt.solvers.options`` are neither used nor modified,
+    such that problems can be solved concurrently in multiple threads.
+
     Examples
     --------
     .. code-block:: python
@@ -82,50 +149,99 @@ def compute_interface_forces_cvxopt(assembly,
         pass
 
     """
+    if tension == 'auto':
+        kwargs = dict(friction8=friction8, mu=mu, density=density, verbose=verbose,
+                      maxiters=maxiters, scale=scale, sparse=sparse, budget=budget,
+                      callback=callback, options=options, problem=problem)
+
+        # CVXOPT doesn't always report an infeasible problem with a status
+        # but may fail with an arithmetic error in the update of the scaling
 
-    n = assembly.number_of_vertices()
+        try:
+            info = compute_interface_forces_cvxopt(assembly, tension=False, **kwargs)
+        except (ValueError, ArithmeticError):
+            info = None
 
-    key_index = {key: index for index, key in enumerate(assembly.vertices())}
+        if info and info['status'] == 'optimal':
+            return info
 
-    fixed = [key for key in assembly.vertices_where({'is_support': True})]
-    fixed = [key_index[key] for key in fixed]
-    free  = [index for index in range(n) if index not in fixed]
+        return compute_interface_forces_cvxopt(assembly, tension=True, **kwargs)
+
+    timer = PhaseTimer()
+    monitor = SolverMonitor('cvxopt', callback)
 
     # ==========================================================================
-    # equality constraints
+    # memory
     # ==========================================================================
 
-    A, vcount = make_Aeq(assembly)
-    A = A.toarray()
-    A = A[[index * 6 + i for index in free for i in range(6)], :]
+    timer.phase('estimate')
+
+    estimate = estimate_memory(assembly, tension=tension, friction8=friction8)
+    sparse = select_representation(estimate, budget, sparse)
 
-    b = [[0, 0, -1 * assembly.blocks[key].volume() * density, 0, 0, 0] for key in assembly.vertices()]
-    b = array(b, dtype=float)
-    b = b[free, :].reshape((-1, 1), order='C')
+    if problem is None:
+        problem = EquilibriumProblem(assembly)
 
-    # row-major ordering => fx, fy, fz, mx, my, mz, fx, fy, fz, mx, my, mz, ...
+    elif problem.assembly is not assembly:
+        raise ValueError('The problem is not the problem of the assembly.')
+
+    problem.update(friction8=friction8, mu=mu, density=density, tension=tension, sparse=sparse, weights=WEIGHTS['cvxopt'])
+
+    # the matrices are only built if they are not cached by the problem
+
+    timer.phase('supports')
+
+    b = problem.b
+
+    # ==========================================================================
+    # equality constraints
+    # ==========================================================================
+
+    timer.phase('Aeq')
+
+    A = problem.A
 
     # ==========================================================================
     # inequality constraints
     # ==========================================================================
 
-    G = make_Aiq(vcount, False)
-    G = G.toarray()
+    timer.phase('Aiq')
 
-    h = zeros((G.shape[0], 1))
+    G = problem.G
+    h = problem.h
 
     # ==========================================================================
     # variables for the objective function
     # ==========================================================================
 
-    a1 = 1.0   # weights on the compression forces
-    a2 = 1e+5  # weights on the tension forces
-    a3 = 1.0   # weights on the friction forces (same as compression weights in Whiting)
+    p = problem.p
+
+    # ==========================================================================
+    # scaling
+    # ==========================================================================
+
+    timer.phase('scaling')
+
+    scaling = None
+    cond = None
+
+    if scale:
+        if verbose:
+            cond = [condition_estimate(A)]
+
+        equilibrated = problem.equilibrated
+
+        A, b, G, p = equilibrated['A'], equilibrated['b'], equilibrated['G'], equilibrated['p']
+        scaling = equilibrated['scaling']
+
+        if verbose:
+            cond.append(condition_estimate(A))
+
+    timer.phase('setup')
 
-    p = array([a1, a2, a3, a3] * vcount)
-    P = diagflat(p)
+    P = equilibrated['P'] if scale else problem.P
 
-    q = zeros((4 * vcount, 1))
+    q = problem.q
 
     # ==========================================================================
     # sanity check
@@ -144,38 +260,64 @@ def compute_interface_forces_cvxopt(assembly,
         print('      A', A.shape)
         print('      b', b.shape)
 
+        if cond:
+            print('')
+            print('cond  A', '{0:.3e} => {1:.3e}'.format(*cond))
+
     # ==========================================================================
     # solve
     # ==========================================================================
 
-    cvxopt.solvers.options['feastol'] = 1e-100
-    cvxopt.solvers.options['maxiters'] = maxiters
-    cvxopt.solvers.options['show_progress'] = verbose
+    if sparse:
+        args = (
+            cvxopt.spdiag(cvxopt.matrix(p)),
+            cvxopt.matrix(q),
+            _spmatrix(G),
+            cvxopt.matrix(h),
+            _spmatrix(A),
+            cvxopt.matrix(b)
+        )
+    else:
+        args = (
+            cvxopt.sparse(cvxopt.matrix(P), tc='d'),
+            cvxopt.matrix(q),
+            cvxopt.sparse(cvxopt.matrix(G), tc='d'),
+            cvxopt.matrix(h),
+            cvxopt.sparse(cvxopt.matrix(A), tc='d'),
+            cvxopt.matrix(b)
+        )
 
-    res = cvxopt.solvers.qp(
-        cvxopt.sparse(cvxopt.matrix(P), tc='d'),
-        cvxopt.matrix(q),
-        cvxopt.sparse(cvxopt.matrix(G), tc='d'),
-        cvxopt.matrix(h),
-        cvxopt.sparse(cvxopt.matrix(A), tc='d'),
-        cvxopt.matrix(b)
-    )
+    timer.phase('solve')
 
-    if res['status'] == 'optimal':
-        x = array(res['x']).reshape((-1, 1))
+    # the progress table is always requested and parsed,
+    # and only shown if verbose
 
-        if verbose:
-            print(res['primal objective'])
+    settings = {'feastol': 1e-7, 'maxiters': maxiters}
+    settings.update(options or {})
+    settings['show_progress'] = True
+
+    with monitor.capture(echo=verbose) as output:
+        res = cvxopt.solvers.qp(*args, options=settings)
+
+    timer.phase('update')
 
+    objective = res['primal objective']
+
+    if scaling:
+        objective /= scaling['cost']
+
+    if res['x']:
+        x = array(res['x']).reshape((-1, 1))
     else:
-        if res['x']:
-            x = array(res['x']).reshape((-1, 1))
-        else:
-            x = None
+        x = None
 
-        if verbose:
-            print('')
-            print(res['status'])
+    monitor.done(res['status'],
+                 objective=objective,
+                 iterations=res['iterations'],
+                 gap=res['gap'],
+                 pres=res['primal infeasibility'],
+                 dres=res['dual infeasibility'],
+                 message=' '.join(output.messages))
 
     # ==========================================================================
     # update
@@ -183,27 +325,50 @@ def compute_interface_forces_cvxopt(assembly,
 
     if x is not None:
 
+        if scaling:
+            x = unscale_solution(x, scaling)
+
         x[absolute(x) < 1e-6] = 0.0
 
-        x = x.flatten().tolist()
+        set_interface_forces(assembly, x.flatten().tolist(), tension=tension)
 
-        offset = 0
+    info = {
+        'memory': {
+            'sparse': sparse,
+            'estimate': (estimate['sparse'] if sparse else estimate['dense']) / 2 ** 20,
+            'budget': budget,
+        },
+        'status': res['status'],
+        'objective': objective,
+        'iterations': res['iterations'],
+        'scaling': None,
+        'tension': tension,
+        'progress': monitor.history,
+    }
 
-        for u, v, attr in assembly.edges(True):
+    if scaling:
+        info['scaling'] = {
+            'force': scaling['force'],
+            'cost': scaling['cost'],
+            'cond': cond,
+        }
 
-            n = len(attr['interface_points'])
+    timer.stop()
 
-            attr['interface_forces'] = []
+    info['timings'] = timer.to_data()
+
+    return info
+
+
+# ==============================================================================
+# Helpers
+# ==============================================================================
 
-            for i in range(n):
-                attr['interface_forces'].append({
-                    'c_np': x[offset + 4 * i + 0],
-                    'c_nn': x[offset + 4 * i + 1],
-                    'c_u' : x[offset + 4 * i + 2],
-                    'c_v' : x[offset + 4 * i + 3]
-                })
 
-            offset += 4 * n
+def _spmatrix(M):
+    """Convert a scipy sparse matrix to a cvxopt sparse matrix."""
+    M = M.tocoo()
+    return cvxopt.spmatrix(M.data.tolist(), M.row.tolist(), M.col.tolist(), size=M.shape, tc='d')
 
 
 # ==============================================================================
@@ -0,0 +1,546 @@
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+import multiprocessing
+
+import compas
+
+try:
+    from numpy import array
+    from numpy import zeros
+    from numpy import absolute
+    from numpy import arange
+    from numpy import concatenate
+    from numpy import sqrt
+    from numpy.linalg import norm
+    from scipy.sparse import coo_matrix
+except ImportError:
+    compas.raise_if_not_ironpython()
+
+try:
+    import cvxpy
+except ImportError:
+    compas.raise_if_not_ironpython()
+
+from compas_rbe.equilibrium.helpers import make_Aeq
+from compas_rbe.equilibrium.helpers import make_Aiq
+from compas_rbe.equilibrium.helpers import set_interface_forces
+from compas_rbe.equilibrium.scaling import equilibrate
+from compas_rbe.equilibrium.scaling import unscale_solution
+from compas_rbe.equilibrium.timing import PhaseTimer
+from compas_rbe.equilibrium.telemetry import SolverMonitor
+from compas_rbe.tracing import trace
+from compas_rbe.tracing import traced
+
+
+__all__ = ['compute_interface_forces_dd']
+
+
+# the solvers that are tried for subdomain problems that the selected solver can't solve
+
+FALLBACK = ['OSQP', 'ECOS']
+
+
+@traced(category='backend')
+def compute_interface_forces_dd(assembly,
+                                nparts=2,
+                                friction8=False,
+                                mu=0.6,
+                                density=1.0,
+                                verbose=False,
+                                maxiters=1000,
+                                tol=1e-4,
+                                rho=1.0,
+                                alpha=1.5,
+                                processes=None,
+                                solver=None,
+                                scale=True,
+                                callback=None):
+    r"""Compute the interface forces with a domain decomposition of the assembly.
+
+    The blocks of the assembly are partitioned into subdomains by recursive coordinate bisection.
+    Every subdomain is responsible for the equilibrium of its own blocks,
+    and has a local copy of the forces of all interfaces touching these blocks.
+    The copies of the interfaces shared between subdomains are brought into agreement
+    with the consensus form of the alternating direction method of multipliers (ADMM).
+
+    .. math::
+
+        \begin{aligned}
+            \mathbf{x}_{s}^{k+1} & = \underset{\mathbf{x}_{s} \in \mathcal{F}_{s}}{\text{argmin}}
+                \quad 0.5 \, \mathbf{x}_{s}^{T} \mathbf{P}_{s} \mathbf{x}_{s}
+                + 0.5 \, \rho \, \| \mathbf{x}_{s} - \mathbf{z}_{s}^{k} + \mathbf{u}_{s}^{k} \|^{2} \\
+            \mathbf{z}^{k+1} & = \text{average} ( \mathbf{x}_{s}^{k+1} + \mathbf{u}_{s}^{k} ) \\
+            \mathbf{u}_{s}^{k+1} & = \mathbf{u}_{s}^{k} + \mathbf{x}_{s}^{k+1} - \mathbf{z}_{s}^{k+1}
+        \end{aligned}
+
+    with :math:`\mathcal{F}_{s}` the equilibrium and friction constraints of subdomain *s*,
+    and :math:`\mathbf{P}_{s}` the objective weights,
+    divided by the number of subdomains sharing an interface.
+    Since the objective is strictly convex, the consensus solution is the solution of
+    :func:`compute_interface_forces_cvx`.
+
+    Parameters
+    ----------
+    assembly : Assembly
+        The rigid block assembly.
+    nparts : int, optional
+        The number of subdomains.
+        Default is ``2``.
+    friction8 : bool, optional
+        Use an eight-sided friction pyramid.
+        Default is ``False``.
+    mu : float, optional
+        The friction coefficient.
+        Default is ``0.6``.
+    density : float, optional
+        Density of the block material.
+        Default is ``1.0``
+    verbose : bool, optional
+        Print information during the execution of the algorithm.
+        Default is ``False``.
+    maxiters : int, optional
+        Maximum number of consensus iterations.
+        Default is ``1000``.
+    tol : float, optional
+        Relative tolerance on the primal and dual residuals of the consensus problem,
+        and on the equilibrium residual of the consensus solution.
+        Default is ``1e-4``.
+    rho : float, optional
+        Initial penalty parameter of the consensus iterations.
+        The penalty is adapted to balance the primal and dual residuals.
+        Default is ``1.0``.
+    alpha : float, optional
+        Relaxation parameter of the consensus iterations, between ``1.0`` and ``2.0``.
+        Default is ``1.5``.
+    processes : int, optional
+        The number of worker processes.
+        The subdomains are distributed over the workers.
+        Use ``0`` to solve all subdomains in the current process.
+        Default is one process per subdomain, up to the number of CPUs.
+    solver : {'ECOS', 'OSQP', 'CVXOPT', 'MOSEK', 'CPLEX'}, optional
+        The solver used for the subdomain problems.
+        Subdomain problems that are not solved are retried with :data:`FALLBACK`.
+        Default is ``'ECOS'``.
+    scale : bool, optional
+        Equilibrate the rows of the equilibrium matrix before solving.
+        The columns are not scaled, such that the shared variables
+        are the same in all subdomains.
+        Default is ``True``.
+    callback : callable, optional
+        A function that is called with the primal and dual residuals (``'primal'``, ``'dual'``)
+        and the penalty (``'rho'``) of every consensus iteration,
+        and with the final report.
+        See :class:`SolverMonitor`.
+        Default is ``None``.
+
+    Returns
+    -------
+    dict
+        Information about the solution process,
+        with the number of consensus iterations (``'iterations'``),
+        the final primal and dual residuals (``'residual'``, ``'dual_residual'``),
+        the relative equilibrium residual of the consensus solution (``'equilibrium'``),
+        computed with the equilibrated rows if ``scale=True``,
+        the value of the objective function (``'objective'``),
+        the number of shared interface vertices (``'shared'``),
+        ``'status'``, which is either ``'converged'``, ``'maxiters'``,
+        or the status of a subdomain problem that could not be solved,
+        the ``'progress'`` of the consensus iterations,
+        and the wall and CPU ``'timings'`` of the phases of the computation
+        (see :meth:`PhaseTimer.to_data`).
+        The CPU time of the worker processes is not included.
+        The interface forces of the assembly are updated in place,
+        unless a subdomain problem could not be solved.
+
+    Notes
+    -----
+    The workers only receive the data of their own subdomains,
+    and keep their subproblems alive between iterations.
+    Per iteration, only the consensus targets and the local solutions are exchanged.
+
+    The penalty of the consensus terms is weighted with the weights of the objective function,
+    and the residuals are measured in the same metric,
+    otherwise the tension components, with a weight of ``1e+5``, hardly converge.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        info = compute_interface_forces_dd(assembly, nparts=4)
+
+        print(info['status'], info['iterations'])
+
+    """
+    if not solver:
+        solver = 'ECOS'
+
+    timer = PhaseTimer()
+    monitor = SolverMonitor('dd', callback)
+    timer.phase('supports')
+
+    key_index = {key: index for index, key in enumerate(assembly.vertices())}
+
+    fixed = set(assembly.vertices_where({'is_support': True}))
+    free  = [key for key in assembly.vertices() if key not in fixed]
+
+    # ==========================================================================
+    # equality constraints
+    # ==========================================================================
+
+    timer.phase('Aeq')
+
+    A, vcount = make_Aeq(assembly)
+    A = A.tocsr()
+
+    timer.phase('setup')
+
+    b = [[0, 0, -1 * assembly.blocks[key].volume() * density, 0, 0, 0] for key in assembly.vertices()]
+    b = array(b, dtype=float).flatten()
+
+    # ==========================================================================
+    # weights of the objective function
+    # ==========================================================================
+
+    a1 = 1.0   # weights on the compression forces
+    a2 = 1e+5  # weights on the tension forces
+    a3 = 1e+2  # weights on the friction forces (same as compression weights in Whiting)
+
+    p = array([a1, a2, a3, a3] * vcount)
+
+    # ==========================================================================
+    # scaling
+    # ==========================================================================
+
+    timer.phase('scaling')
+
+    scaling = None
+
+    if scale:
+        # the (uniform) scaling of the objective is not applied
+        # to keep the meaning of the penalty parameter
+
+        A, b, G, _, scaling = equilibrate(A, b, None, p, columns=False)
+        A = A.tocsr()
+
+    # ==========================================================================
+    # subdomains
+    # ==========================================================================
+
+    timer.phase('setup')
+
+    offsets = {}
+    offset = 0
+    for u, v, attr in assembly.edges(True):
+        n = len(attr['interface_points'])
+        offsets[u, v] = offset, offset + 4 * n
+        offset += 4 * n
+
+    parts = _partition_blocks(assembly, free, nparts)
+
+    count = zeros(4 * vcount)
+    subdomains = []
+
+    for part in parts:
+        keys = set(part)
+        rows = [key_index[key] * 6 + i for key in part for i in range(6)]
+        cols = [arange(*offsets[u, v]) for u, v in assembly.edges() if u in keys or v in keys]
+        cols = concatenate(cols) if cols else array([], dtype=int)
+        cols.sort()
+        count[cols] += 1
+        subdomains.append((rows, cols))
+
+    payloads = []
+
+    for rows, cols in subdomains:
+        As = A[rows, :][:, cols].tocoo()
+        Gs = make_Aiq(len(cols) // 4, friction8, mu).tocoo()
+        payloads.append({
+            'A': (As.data, As.row, As.col, As.shape),
+            'b': b[rows],
+            'G': (Gs.data, Gs.row, Gs.col, Gs.shape),
+            'w': p[cols] / count[cols],
+        })
+
+    shared = int((count > 1).sum() // 4)
+
+    if verbose:
+        print('')
+        print('subdomains        ', [len(part) for part in parts])
+        print('interface vertices', vcount)
+        print('shared vertices   ', shared)
+        print('')
+
+    # ==========================================================================
+    # workers
+    # ==========================================================================
+
+    if processes is None:
+        processes = min(len(payloads), multiprocessing.cpu_count())
+
+    if processes:
+        workers = []
+        for i in range(processes):
+            indices = list(range(i, len(payloads), processes))
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_worker, args=(child, [payloads[j] for j in indices], solver))
+            process.daemon = True
+            process.start()
+            # the end of the worker is closed in this process
+            # such that receiving from a dead worker fails instead of blocking
+            child.close()
+            workers.append((process, parent, indices))
+
+        def solve(targets, rho):
+            try:
+                for process, conn, indices in workers:
+                    conn.send(([targets[j] for j in indices], rho))
+                results = [None] * len(targets)
+                for process, conn, indices in workers:
+                    for j, result in zip(indices, conn.recv()):
+                        results[j] = result
+            except (IOError, OSError, EOFError):
+                dead = [process for process, conn, indices in workers if not process.is_alive()]
+                if not dead:
+                    raise
+                raise RuntimeError('Worker process {} died with exit code {}.'.format(dead[0].pid, dead[0].exitcode))
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+            return results
+
+    else:
+        workers = []
+        local = [_Subproblem(payload, solver) for payload in payloads]
+
+        def solve(targets, rho):
+            return [subproblem.solve(target, rho) for subproblem, target in zip(local, targets)]
+
+    # ==========================================================================
+    # consensus iterations
+    # ==========================================================================
+
+    timer.phase('solve')
+
+    balance = [key_index[key] * 6 + i for key in free for i in range(6)]
+    bnorm = max(norm(b[balance]), 1e-12)
+
+    z = zeros(4 * vcount)
+    u = [zeros(len(cols)) for rows, cols in subdomains]
+
+    status = 'maxiters'
+    r_norm = s_norm = 0.0
+    iterations = 0
+
+    try:
+        for k in range(maxiters):
+
+            iterations = k + 1
+
+            results = solve([z[cols] - us for (rows, cols), us in zip(subdomains, u)], rho)
+
+            failed = [result for result, xi in results if xi is None]
+
+            if failed:
+                status = failed[0]
+                break
+
+            # over-relaxation with the previous consensus solution
+
+            zold = z
+            xs = [alpha * xi + (1.0 - alpha) * zold[cols] for (rows, cols), (result, xi) in zip(subdomains, results)]
+
+            z = zeros(4 * vcount)
+            for (rows, cols), xi, ui in zip(subdomains, xs, u):
+                z[cols] += xi + ui
+            z[count > 0] /= count[count > 0]
+
+            # the norms are weighted with the weights of the subdomain problems
+
+            r_norm = 0.0
+            x_norm = 0.0
+            u_norm = 0.0
+            for (rows, cols), xi, ui in zip(subdomains, xs, u):
+                wi = p[cols] / count[cols]
+                ri = xi - z[cols]
+                ui += ri
+                r_norm += (wi * ri).dot(ri)
+                x_norm += (wi * xi).dot(xi)
+                u_norm += (wi * ui).dot(ui)
+
+            r_norm = sqrt(r_norm)
+            s_norm = rho * sqrt((p * (z - zold) ** 2).sum())
+
+            equilibrium = norm(A[balance].dot(z) - b[balance]) / bnorm
+
+            monitor.iteration(k, primal=r_norm, dual=s_norm, rho=rho, equilibrium=equilibrium)
+
+            if verbose and k % 10 == 0:
+                print('{0:5d}  primal {1:.3e}  dual {2:.3e}  equilibrium {3:.3e}'.format(k, r_norm, s_norm, equilibrium))
+
+            size = max(sqrt(x_norm), sqrt((p * z * z).sum()), 1e-12)
+
+            if r_norm <= tol * size and s_norm <= tol * rho * max(sqrt(u_norm), size) and equilibrium <= tol:
+                status = 'converged'
+                break
+
+            # residual balancing
+            # u is the scaled dual variable and has to be rescaled with rho
+
+            if r_norm > 10 * s_norm:
+                rho *= 2.0
+                u = [ui / 2.0 for ui in u]
+            elif s_norm > 10 * r_norm:
+                rho /= 2.0
+                u = [ui * 2.0 for ui in u]
+
+    finally:
+        # a dead worker can't be stopped
+        # the error of the iterations is not replaced by the error of the shutdown
+
+        for process, conn, indices in workers:
+            try:
+                conn.send(None)
+            except (IOError, OSError):
+                pass
+            process.join()
+
+    timer.phase('update')
+
+    equilibrium = norm(A[balance].dot(z) - b[balance]) / bnorm
+
+    if scaling:
+        z = unscale_solution(z, scaling)
+
+    solved = status in ('converged', 'maxiters')
+
+    objective = 0.5 * p.dot(z * z) if solved else None
+
+    if verbose:
+        print('')
+        print(status, iterations, r_norm, s_norm)
+
+    monitor.done(status, objective=objective, iterations=iterations, primal=r_norm, dual=s_norm)
+
+    # ==========================================================================
+    # update
+    # ==========================================================================
+
+    if solved:
+        z[absolute(z) < 1e-6] = 0.0
+
+        set_interface_forces(assembly, z.tolist())
+
+    timer.stop()
+
+    return {
+        'status': status,
+        'iterations': iterations,
+        'residual': r_norm,
+        'dual_residual': s_norm,
+        'equilibrium': equilibrium,
+        'objective': objective,
+        'shared': shared,
+        'progress': monitor.history,
+        'timings': timer.to_data(),
+    }
+
+
+# ==============================================================================
+# Helpers
+# ==============================================================================
+
+
+def _partition_blocks(assembly, keys, nparts):
+    """Partition blocks by recursive bisection of their centers along the direction of largest extent."""
+    centers = {key: assembly.blocks[key].center() for key in keys}
+    parts = [list(keys)]
+
+    while len(parts) < nparts:
+        parts.sort(key=len)
+        if len(parts[-1]) < 2:
+            break
+        part = parts.pop()
+        xyz = [centers[key] for key in part]
+        axis = max(range(3), key=lambda i: max(c[i] for c in xyz) - min(c[i] for c in xyz))
+        part.sort(key=lambda key: centers[key][axis])
+        half = len(part) // 2
+        parts += [part[:half], part[half:]]
+
+    return [part for part in parts if part]
+
+
+class _Subproblem(object):
+    """The QP of one subdomain, with the consensus target as parameter."""
+
+    def __init__(self, payload, solver):
+        data, row, col, shape = payload['A']
+        A = coo_matrix((data, (row, col)), shape=shape).tocsc()
+        data, row, col, shape = payload['G']
+        G = coo_matrix((data, (row, col)), shape=shape).tocsc()
+        b = payload['b']
+        w = payload['w']
+
+        self.solvers = [solver] + [name for name in FALLBACK if name != solver]
+        self.x = cvxpy.Variable(A.shape[1])
+        self.v = cvxpy.Parameter(A.shape[1])
+        self.rho = cvxpy.Parameter(nonneg=True)
+
+        objective = cvxpy.Minimize(0.5 * cvxpy.sum_squares(cvxpy.multiply(sqrt(w), self.x)) +
+                                   0.5 * self.rho * cvxpy.sum_squares(cvxpy.multiply(sqrt(w), self.x - self.v)))
+
+        constraints = [
+            A * self.x == b,
+            G * self.x <= 0
+        ]
+
+        self.problem = cvxpy.Problem(objective, constraints)
+
+    @traced('subproblem', category='solver')
+    def solve(self, target, rho):
+        """Return the status and the solution, which is ``None`` if the problem is not solved."""
+        self.v.value = target
+        self.rho.value = rho
+
+        status = None
+
+        for solver in self.solvers:
+            try:
+                self.problem.solve(solver=getattr(cvxpy, solver), warm_start=True)
+            except cvxpy.error.SolverError:
+                status = 'solver_error'
+                continue
+
+            status = self.problem.status
+
+            if status in (cvxpy.OPTIMAL, cvxpy.OPTIMAL_INACCURATE):
+                return status, array(self.x.value).flatten()
+
+        return status, None
+
+
+def _worker(conn, payloads, solver):
+    with trace('subproblem setup', category='solver'):
+        subproblems = [_Subproblem(payload, solver) for payload in payloads]
+
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        targets, rho = message
+        try:
+            results = [subproblem.solve(target, rho) for subproblem, target in zip(subproblems, targets)]
+        except Exception as e:
+            results = [e] * len(targets)
+        conn.send(results)
+
+    conn.close()
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,498 @@
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+from math import cos
+from math import sin
+from math import pi
+
+import compas
+
+try:
+    from numpy import array
+    from numpy import zeros
+    from numpy import ones
+    from numpy import eye
+    from numpy import empty
+    from numpy import absolute
+    from numpy import arange
+    from numpy import concatenate
+    from numpy import diff
+    from numpy import einsum
+    from numpy import maximum
+    from numpy import repeat
+    from numpy import where
+    from numpy import sqrt
+    from numpy import inf
+    from numpy.linalg import norm
+    from numpy.linalg import inv
+    from scipy.sparse import bsr_matrix
+except ImportError:
+    compas.raise_if_not_ironpython()
+
+from compas_rbe.equilibrium.helpers import make_Aeq
+from compas_rbe.equilibrium.helpers import set_interface_forces
+from compas_rbe.equilibrium.scaling import equilibrate
+from compas_rbe.equilibrium.scaling import unscale_solution
+from compas_rbe.equilibrium.timing import PhaseTimer
+from compas_rbe.equilibrium.telemetry import SolverMonitor
+from compas_rbe.tracing import traced
+
+
+__all__ = [
+    'compute_interface_forces_newton',
+    'compute_interface_forces_pgs',
+]
+
+
+@traced(category='backend')
+def compute_interface_forces_newton(assembly,
+                                    friction8=False,
+                                    mu=0.6,
+                                    density=1.0,
+                                    verbose=False,
+                                    maxiters=100,
+                                    tol=1e-3,
+                                    inner=100,
+                                    scale=True,
+                                    callback=None):
+    r"""Compute interface forces with local projections per interface vertex
+    and semismooth Newton steps on the equilibrium of the blocks.
+
+    The same optimisation problem as in :func:`compute_interface_forces_cvx`
+    is solved through its dual, in the multipliers :math:`\mathbf{y}` of the equilibrium constraints,
+    six per free block.
+
+    .. math::
+
+        h(\mathbf{y}) = \min_{\mathbf{x} \in \mathcal{K}} \;
+            0.5 \, \mathbf{x}^{T} \mathbf{P} \mathbf{x}
+            - \mathbf{y}^{T} (\mathbf{A} \mathbf{x} - \mathbf{b})
+
+    For given multipliers, the local problem of every interface vertex is solved exactly:
+    its contact force components are the projection of :math:`\mathbf{P}^{-1} \mathbf{A}^{T} \mathbf{y}`
+    onto the friction pyramid of :func:`make_Aiq` (and onto the positive tension axis),
+    in the metric of the weights of the objective function.
+    All vertices are projected together in a single vectorised step.
+
+    The dual function is concave and continuously differentiable,
+    with gradient :math:`\mathbf{b} - \mathbf{A} \mathbf{x}`, the out-of-balance loads.
+    It is maximised with semismooth Newton steps and a backtracking line search.
+    The Newton systems are solved approximately with conjugate gradients,
+    preconditioned with the six by six systems of the individual blocks (block Jacobi).
+
+    Parameters
+    ----------
+    assembly : Assembly
+        The rigid block assembly.
+    friction8 : bool, optional
+        Use an eight-sided friction pyramid.
+        Default is ``False``.
+    mu : float, optional
+        The friction coefficient.
+        Default is ``0.6``.
+    density : float, optional
+        Density of the block material.
+        Default is ``1.0``
+    verbose : bool, optional
+        Print information during the execution of the algorithm.
+        Default is ``False``.
+    maxiters : int, optional
+        Maximum number of Newton iterations.
+        Default is ``100``.
+    tol : float, optional
+        Tolerance on the relative equilibrium residual ``|Ax - b| / |b|``,
+        with the equilibrium matrix and the loads of the assembly, also if ``scale=True``.
+        Default is ``1e-3``.
+    inner : int, optional
+        Maximum number of conjugate gradient iterations per Newton iteration.
+        Default is ``100``.
+    scale : bool, optional
+        Equilibrate the rows of the equilibrium matrix before solving.
+        The friction constraints are not affected by the row scaling.
+        Default is ``True``.
+    callback : callable, optional
+        A function that is called with the ``'residual'`` and ``'change'`` of every iteration,
+        and with the final report.
+        See :class:`SolverMonitor`.
+        Default is ``None``.
+
+    Returns
+    -------
+    dict
+        Information about the solution process,
+        with the number of Newton iterations (``'iterations'``),
+        the relative equilibrium residual of the solution (``'residual'``),
+        the out-of-balance load relative to the total applied load,
+        the value of the objective function (``'objective'``),
+        ``'status'``, which is either ``'converged'`` or ``'maxiters'``,
+        the wall and CPU ``'timings'`` of the phases of the computation
+        (see :meth:`PhaseTimer.to_data`),
+        and the ``'progress'`` of the iterations.
+        The interface forces of the assembly are updated in place.
+
+    Notes
+    -----
+    The forces always satisfy the friction constraints.
+    The residual is the out-of-balance load relative to the total applied load,
+    and, since the forces minimise the objective for the current multipliers,
+    the only measure of the distance to the optimal solution.
+
+    The cost of an iteration is linear in the number of interface vertices and blocks,
+    times the number of conjugate gradient iterations.
+
+    This backend replaces a projected block Gauss-Seidel method,
+    which swept the interfaces in colour groups but converged too slowly.
+    ``compute_interface_forces_pgs`` and the backend name ``'pgs'`` are aliases of
+    this function and of the backend ``'newton'``, for existing scripts and results.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        info = compute_interface_forces_newton(assembly, tol=1e-4)
+
+        print(info['status'], info['residual'])
+
+    """
+    timer = PhaseTimer()
+    monitor = SolverMonitor('newton', callback)
+
+    timer.phase('supports')
+
+    key_index = {key: index for index, key in enumerate(assembly.vertices())}
+
+    fixed = set(assembly.vertices_where({'is_support': True}))
+    free  = [key_index[key] for key in assembly.vertices() if key not in fixed]
+
+    # ==========================================================================
+    # equality constraints
+    # ==========================================================================
+
+    timer.phase('Aeq')
+
+    A, vcount = make_Aeq(assembly)
+
+    timer.phase('supports')
+
+    A = A.tocsr()[[index * 6 + i for index in free for i in range(6)], :].tocsc()
+
+    b = [[0, 0, -1 * assembly.blocks[key].volume() * density, 0, 0, 0] for key in assembly.vertices()]
+    b = array(b, dtype=float)
+    b = b[free, :].flatten()
+
+    # ==========================================================================
+    # weights of the objective function
+    # ==========================================================================
+
+    a1 = 1.0   # weights on the compression forces
+    a2 = 1e+5  # weights on the tension forces
+    a3 = 1e+2  # weights on the friction forces (same as compression weights in Whiting)
+
+    p = array([a1, a2, a3, a3] * vcount)
+
+    # ==========================================================================
+    # scaling
+    # ==========================================================================
+
+    timer.phase('scaling')
+
+    scaling = None
+
+    # the residual is the out-of-balance load of the assembly
+    # the rows of the scaled residual are divided by the row factors and multiplied by the force scale
+    # the columns are not scaled
+
+    unscale = ones(A.shape[0])
+    bnorm = max(norm(b), 1e-12)
+
+    if scale:
+        # the objective is not scaled
+        # such that the weights remain the metric of the projections
+
+        A, b, G, _, scaling = equilibrate(A, b, None, p, columns=False)
+
+        unscale = scaling['force'] / scaling['rows']
+
+    timer.phase('setup')
+
+    A = A.tocsr()
+    AT = A.T.tocsr()
+    w = p.reshape((-1, 4))
+    pyramid = _pyramid(friction8)
+
+    def forces(y, jacobian=False):
+        return _project_forces(AT.dot(y).reshape((-1, 4)) / w, w, mu, pyramid, jacobian)
+
+    def dual(y, x):
+        return b.dot(y) - 0.5 * (w * x * x).sum()
+
+    if verbose:
+        print('')
+        print('interface vertices', vcount)
+        print('free blocks       ', len(free))
+        print('')
+
+    # ==========================================================================
+    # Newton iterations
+    # ==========================================================================
+
+    timer.phase('solve')
+
+    y = zeros(A.shape[0])
+    x, Q = forces(y, True)
+    r = b - A.dot(x.flatten())
+
+    status = 'maxiters'
+    residual = norm(unscale * r) / bnorm
+    iterations = 0
+
+    while residual >= tol and iterations < maxiters:
+
+        # the Hessian of the dual function is -A Q A'
+        # with Q the block diagonal derivative of the projections
+
+        H = A.dot(bsr_matrix((Q, arange(vcount), arange(vcount + 1)), shape=(4 * vcount, 4 * vcount))).dot(AT)
+
+        d = _solve_cg(H, r, 0.1, inner)
+
+        # backtracking line search on the dual function
+
+        h = dual(y, x)
+        slope = r.dot(d)
+        t = 1.0
+
+        for _ in range(50):
+            x1 = forces(y + t * d)
+            if dual(y + t * d, x1) >= h + 1e-4 * t * slope:
+                break
+            t *= 0.5
+
+        x0 = x
+        y += t * d
+        x, Q = forces(y, True)
+        r = b - A.dot(x.flatten())
+
+        residual = norm(unscale * r) / bnorm
+        change = norm(x - x0) / max(norm(x), 1e-12)
+
+        monitor.iteration(iterations, residual=residual, change=change)
+
+        if verbose:
+            print('{0:5d}  residual {1:.3e}  change {2:.3e}  step {3:.3e}'.format(iterations, residual, change, t))
+
+        iterations += 1
+
+    if residual < tol:
+        status = 'converged'
+
+    timer.phase('update')
+
+    x = x.flatten()
+
+    if scaling:
+        x = unscale_solution(x, scaling)
+
+    objective = 0.5 * p.dot(x * x)
+
+    if verbose:
+        print('')
+        print(status, iterations, residual)
+
+    monitor.done(status, objective=objective, iterations=iterations, residual=residual)
+
+    # ==========================================================================
+    # update
+    # ==========================================================================
+
+    x[absolute(x) < 1e-6] = 0.0
+
+    set_interface_forces(assembly, x.tolist())
+
+    timer.stop()
+
+    return {
+        'status': status,
+        'iterations': iterations,
+        'residual': residual,
+        'objective': objective,
+        'progress': monitor.history,
+        'timings': timer.to_data(),
+    }
+
+
+# the name of the function in earlier versions
+
+compute_interface_forces_pgs = compute_interface_forces_newton
+
+
+# ==============================================================================
+# Helpers
+# ==============================================================================
+
+
+def _solve_cg(H, r, tol, maxiters):
+    """Solve ``H d = r`` approximately with conjugate gradients,
+    preconditioned with the inverses of the six by six diagonal blocks of ``H``.
+
+    A small multiple of the identity is added to ``H``,
+    which is singular if some blocks have no active contact forces.
+    """
+    n = H.shape[0] // 6
+
+    H = H.tobsr(blocksize=(6, 6))
+    rows = repeat(arange(n), diff(H.indptr))
+    diagonal = rows == H.indices
+
+    D = zeros((n, 6, 6))
+    D[rows[diagonal]] = H.data[diagonal]
+
+    eps = 1e-10 * max(absolute(D).max() if n else 0.0, 1e-12)
+    D = inv(D + eps * eye(6))
+
+    def precondition(r):
+        return einsum('nij,nj->ni', D, r.reshape((-1, 6))).flatten()
+
+    d = zeros(r.shape)
+    s = r.copy()
+    z = precondition(s)
+    q = z.copy()
+    sz = s.dot(z)
+    rnorm = norm(r)
+
+    for _ in range(maxiters):
+        Hq = H.dot(q) + eps * q
+        alpha = sz / q.dot(Hq)
+        d += alpha * q
+        s -= alpha * Hq
+        if norm(s) <= tol * rnorm:
+            break
+        z = precondition(s)
+        sz, sz0 = s.dot(z), sz
+        q = z + (sz / sz0) * q
+
+    return d
+
+
+def _pyramid(friction8):
+    """The normals of the sides of the friction pyramid, in the tangent plane,
+    and the corners of its section at unit normal force, divided by the friction coefficient."""
+    count = 8 if friction8 else 4
+    normals = [[cos(2 * pi * i / count), sin(2 * pi * i / count)] for i in range(count)]
+    corners = [[cos(2 * pi * (i + 0.5) / count) / cos(pi / count), sin(2 * pi * (i + 0.5) / count) / cos(pi / count)] for i in range(count)]
+    return array(normals), array(corners)
+
+
+def _project_forces(z, w, mu, pyramid, jacobian=False):
+    """Project the contact force components ``[c_np, c_nn, c_u, c_v]`` of interface vertices
+    onto the friction pyramid and the positive tension axis,
+    in the metric of the weights ``w`` of the objective function.
+
+    With the Jacobian, also return the derivative of the projection times the inverse of the weights,
+    which is symmetric.
+    """
+    sn = sqrt(w[:, 0])
+    st = sqrt(w[:, 2])
+
+    # in the scaled coordinates the metric is Euclidean
+    # and the pyramid has the scaled friction coefficient
+
+    result = _project_pyramid(sn * z[:, 0], st[:, None] * z[:, 2:], mu * st / sn, pyramid, jacobian)
+
+    x = empty(z.shape)
+    x[:, 0] = result[0] / sn
+    x[:, 1] = maximum(z[:, 1], 0.0)
+    x[:, 2:] = result[1] / st[:, None]
+
+    if not jacobian:
+        return x
+
+    s = array([sn, st, st]).T
+    index = array([0, 2, 3])
+
+    Q = zeros((len(z), 4, 4))
+    Q[:, index[:, None], index[None, :]] = result[2] / (s[:, :, None] * s[:, None, :])
+    Q[:, 1, 1] = (z[:, 1] > 0) / w[:, 1]
+
+    return x, Q
+
+
+def _project_pyramid(n, t, mu, pyramid, jacobian=False):
+    """Project the points ``(n, t)`` onto the pyramids ``normal . t <= mu * n``.
+
+    The projection is the closest feasible point of the projections
+    onto the interior, the sides, the edges and the apex of the pyramid.
+    """
+    normals, corners = pyramid
+    count = len(normals)
+    size = len(n)
+
+    mu = mu[:, None]
+    s = t.dot(normals.T)
+
+    # the candidates: the point itself, the sides, the edges and the apex
+
+    N = zeros((size, 2 * count + 2))
+    T = zeros((size, 2 * count + 2, 2))
+
+    N[:, 0] = n
+    T[:, 0] = t
+
+    tau = (n[:, None] + mu * s) / (1.0 + mu ** 2)
+    N[:, 1:count + 1] = tau
+    T[:, 1:count + 1] = t[:, None, :] + (mu * tau - s)[:, :, None] * normals[None, :, :]
+
+    c2 = (corners ** 2).sum(axis=1)
+    sigma = (n[:, None] + mu * t.dot(corners.T)) / (1.0 + mu ** 2 * c2)
+    N[:, count + 1:2 * count + 1] = sigma
+    T[:, count + 1:2 * count + 1] = (mu * sigma)[:, :, None] * corners[None, :, :]
+
+    # the point itself is feasible if it is inside, the apex always is
+
+    eps = 1e-9 * (absolute(n) + absolute(t).sum(axis=1) + 1e-300)
+
+    violation = (T.dot(normals.T) - mu[:, :, None] * N[:, :, None]).max(axis=2)
+    feasible = (violation <= eps[:, None]) & (N >= 0)
+    feasible[:, 0] = (s <= mu * n[:, None]).all(axis=1)
+    feasible[:, -1] = True
+
+    distance = (N - n[:, None]) ** 2 + ((T - t[:, None, :]) ** 2).sum(axis=2)
+    distance = where(feasible, distance, inf)
+
+    best = distance.argmin(axis=1)
+    rows = arange(size)
+
+    if not jacobian:
+        return N[rows, best], T[rows, best]
+
+    # the Jacobian is the identity in the interior,
+    # the projection onto the plane of a side, the projection onto the direction of an edge,
+    # and zero at the apex
+
+    J = zeros((size, 3, 3))
+    J[best == 0] = eye(3)
+
+    side = (best >= 1) & (best <= count)
+    if side.any():
+        i = best[side] - 1
+        m = mu[side, 0]
+        a = concatenate([-m[:, None], normals[i]], axis=1) / sqrt(1.0 + m ** 2)[:, None]
+        J[side] = eye(3) - a[:, :, None] * a[:, None, :]
+
+    edge = (best > count) & (best <= 2 * count)
+    if edge.any():
+        i = best[edge] - count - 1
+        m = mu[edge, 0]
+        e = concatenate([ones((len(i), 1)), m[:, None] * corners[i]], axis=1)
+        e /= norm(e, axis=1)[:, None]
+        J[edge] = e[:, :, None] * e[:, None, :]
+
+    return N[rows, best], T[rows, best], J
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+    pass
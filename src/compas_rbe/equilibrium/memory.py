@@ -0,0 +1,153 @@
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+
+__all__ = [
+    'MemoryBudgetError',
+    'estimate_memory',
+    'select_representation',
+]
+
+
+# bytes per entry of a dense matrix, and per nonzero of a sparse matrix (value and two indices)
+
+DENSE = 8
+SPARSE = 16
+
+
+class MemoryBudgetError(MemoryError):
+    """Raised if the matrices of an equilibrium problem would exceed the memory budget."""
+
+
+def estimate_memory(assembly, tension=True, friction8=False):
+    """Estimate the memory needed for the matrices of the equilibrium problem of an assembly.
+
+    Parameters
+    ----------
+    assembly : compas_assembly.datastructures.Assembly
+        The assembly.
+    tension : bool, optional
+        Include the tension components of the contact forces.
+        Default is ``True``.
+    friction8 : bool, optional
+        Use an eight-sided friction pyramid.
+        Default is ``False``.
+
+    Returns
+    -------
+    dict
+        The size of the problem
+        (the number of ``'rows'`` of the equilibrium matrix of the free blocks,
+        the number of ``'columns'``, and the number of ``'rows_iq'`` of the friction constraints),
+        and the estimated peak memory of the ``'dense'`` and the ``'sparse'`` representation of the matrices,
+        in bytes.
+
+    Notes
+    -----
+    The estimates include the temporary copies made during the reduction to the free blocks,
+    the scaling, and the conversion to the input of the solver,
+    but not the memory used by the solver itself.
+    They are meant to decide between representations,
+    and to refuse problems that are far too large, before anything is allocated.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        estimate = estimate_memory(assembly)
+
+        print(estimate['dense'] / 2 ** 20, estimate['sparse'] / 2 ** 20)
+
+    """
+    n = assembly.number_of_vertices()
+    free = len(list(assembly.vertices_where({'is_support': False})))
+    vcount = sum(len(attr['interface_points']) for u, v, attr in assembly.edges(True))
+
+    # unknowns and inequality constraints per interface vertex
+
+    nv = 4 if tension else 3
+    t = 2 if tension else 1
+    ni = t + (8 if friction8 else 4)
+
+    rows = 6 * free
+    columns = nv * vcount
+    rows_iq = ni * vcount
+
+    # the full equilibrium matrix, the reduced matrix and two scaled copies,
+    # the friction constraints and two scaled copies,
+    # the diagonal objective matrix and its copy in the input of the solver
+
+    dense = DENSE * (6 * n * columns + 3 * rows * columns + 3 * rows_iq * columns + 2 * columns * columns)
+
+    # every unknown contributes to the 6 rows of both blocks of its interface
+
+    nnz_A = 2 * 6 * columns
+    nnz_G = (t + (20 if friction8 else 8)) * vcount
+
+    sparse = SPARSE * 3 * (nnz_A + nnz_G + columns) + DENSE * 4 * (rows + rows_iq + columns)
+
+    return {
+        'rows': rows,
+        'columns': columns,
+        'rows_iq': rows_iq,
+        'dense': dense,
+        'sparse': sparse,
+    }
+
+
+def select_representation(estimate, budget=None, sparse='auto'):
+    """Select the representation of the matrices of an equilibrium problem within a memory budget.
+
+    Parameters
+    ----------
+    estimate : dict
+        The estimate of :func:`estimate_memory`.
+    budget : float, optional
+        The memory budget in MB.
+        Default is no budget.
+    sparse : {'auto', True, False}, optional
+        Use sparse matrices.
+        With ``'auto'``, sparse matrices are only used if the dense ones would exceed the budget.
+        Default is ``'auto'``.
+
+    Returns
+    -------
+    bool
+        ``True`` if sparse matrices should be used.
+
+    Raises
+    ------
+    MemoryBudgetError
+        If the selected representation would exceed the budget.
+
+    """
+    if sparse == 'auto':
+        sparse = bool(budget) and estimate['dense'] > budget * 2 ** 20
+
+    if not budget:
+        return sparse
+
+    needed = estimate['sparse'] if sparse else estimate['dense']
+
+    if needed > budget * 2 ** 20:
+        if sparse:
+            raise MemoryBudgetError(
+                'The equilibrium problem ({0} x {1}) needs approximately {2:.1f} MB, '
+                'even with sparse matrices, which exceeds the memory budget of {3:.1f} MB.'.format(
+                    estimate['rows'], estimate['columns'], needed / 2 ** 20, budget))
+        raise MemoryBudgetError(
+            'The dense matrices of the equilibrium problem ({0} x {1}) need approximately {2:.1f} MB, '
+            'which exceeds the memory budget of {3:.1f} MB. '
+            'Use sparse matrices (sparse=True or sparse=\'auto\') or increase the budget.'.format(
+                estimate['rows'], estimate['columns'], needed / 2 ** 20, budget))
+
+    return sparse
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+    pass
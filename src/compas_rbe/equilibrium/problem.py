@@ -0,0 +1,411 @@
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+import compas
+
+try:
+    from numpy import array
+    from numpy import zeros
+    from numpy import diagflat
+    from scipy.sparse import diags
+except ImportError:
+    compas.raise_if_not_ironpython()
+
+from compas_rbe.equilibrium.helpers import make_Aeq
+from compas_rbe.equilibrium.helpers import make_Aiq
+from compas_rbe.equilibrium.scaling import _ruiz
+from compas_rbe.equilibrium.scaling import _rescale
+from compas_rbe.equilibrium.scaling import unscale_solution
+
+
+__all__ = ['EquilibriumProblem']
+
+
+# the weights of the compression, tension and friction components of the objective, per backend
+# tension is allowed but penalised with a large weight
+# in Whiting, the weights of the friction forces are the same as those of the compression forces
+
+WEIGHTS = {
+    'cvx': (1.0, 1e+5, 1e+2),
+    'cvxopt': (1.0, 1e+5, 1.0),
+}
+
+# the parameters of a problem, with their defaults
+
+PARAMETERS = {
+    'friction8': False,
+    'mu': 0.6,
+    'density': 1.0,
+    'tension': True,
+    'sparse': True,
+    'weights': WEIGHTS['cvx'],
+}
+
+# the data of the assembly that can be invalidated
+#
+# vertices:   the blocks were added or removed
+# supports:   the supports changed
+# blocks:     the geometry (the volume and the centroid) of the blocks changed
+# interfaces: the interfaces changed
+
+CHANGES = ('vertices', 'supports', 'blocks', 'interfaces')
+
+# the cached data, in order of computation, with the data and parameters it is computed from
+
+DEPENDENCIES = [
+    ('key_index', ('vertices', )),
+    ('free', ('key_index', 'supports')),
+    ('vcount', ('interfaces', )),
+    ('Aeq', ('key_index', 'blocks', 'interfaces', 'tension')),
+    ('loads', ('key_index', 'blocks', 'density')),
+    ('Aiq', ('vcount', 'friction8', 'mu', 'tension')),
+    ('A', ('Aeq', 'free', 'sparse')),
+    ('b', ('loads', 'free')),
+    ('G', ('Aiq', 'sparse')),
+    ('h', ('G', )),
+    ('p', ('vcount', 'tension', 'weights')),
+    ('P', ('p', 'sparse')),
+    ('q', ('p', )),
+    ('ruiz', ('A', 'G')),
+    ('equilibrated', ('ruiz', 'b', 'p')),
+]
+
+
+class EquilibriumProblem(object):
+    r"""The matrices of the equilibrium problem of an assembly,
+    which are built when they are first needed and reused until they are invalidated.
+
+    Parameters
+    ----------
+    assembly : compas_assembly.datastructures.Assembly
+        The assembly.
+    friction8 : bool, optional
+        Use an eight-sided friction pyramid.
+        Default is ``False``.
+    mu : float, optional
+        The friction coefficient.
+        Default is ``0.6``.
+    density : float, optional
+        Density of the block material.
+        Default is ``1.0``.
+    tension : bool, optional
+        Include the tension components of the contact forces.
+        Default is ``True``.
+    sparse : bool, optional
+        Use sparse matrices.
+        Default is ``True``.
+    weights : tuple, optional
+        The weights of the compression, tension and friction components in the objective.
+        Default are the weights of :func:`compute_interface_forces_cvx`.
+
+    Attributes
+    ----------
+    assembly : compas_assembly.datastructures.Assembly
+        The assembly.
+    key_index : dict
+        The index of every block (vertex) of the assembly.
+    free : list
+        The indices of the blocks that are not supports.
+    vcount : int
+        The number of interface vertices.
+    A : array or sparse matrix
+        The equilibrium matrix of the free blocks.
+    b : array
+        The loads of the free blocks.
+    G : array or sparse matrix
+        The matrix of the friction and compression constraints.
+    h : array
+        The right hand side of the friction and compression constraints.
+    p : array
+        The diagonal of the matrix of the objective.
+    P : array or sparse matrix
+        The matrix of the objective.
+    q : array
+        The linear term of the objective.
+    equilibrated : dict
+        The equilibrated ``'A'``, ``'b'``, ``'G'``, ``'p'`` and ``'P'``, and the ``'scaling'`` factors.
+        See :func:`equilibrate`.
+
+    Notes
+    -----
+    The problem is
+
+    .. math::
+
+        \begin{aligned}
+            & \underset{x}{\text{minimise}} & \quad 0.5 \, \mathbf{x}^{T} \mathbf{P} \mathbf{x} + \mathbf{q}^{T} \mathbf{x} \\
+            & \text{such that} & \quad \mathbf{A} \mathbf{x} = \mathbf{b} \\
+            &                  & \quad \mathbf{G} \mathbf{x} \leq \mathbf{h} \\
+        \end{aligned}
+
+    Changing a parameter only discards the data that depend on it.
+    For example, a different ``density`` only changes the loads,
+    and a different ``mu`` only the friction constraints.
+    The equilibration of the constraint matrices, which is the expensive part of the scaling,
+    is kept if only the loads or the weights of the objective change.
+    Changes of the assembly are not detected,
+    and have to be reported with :meth:`invalidate`.
+
+    The problem can be passed to :func:`compute_interface_forces_cvx` and :func:`compute_interface_forces_cvxopt`,
+    which set the parameters they need,
+    such that solving the same assembly with both, or solving it again after a small change,
+    only rebuilds what is different.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        problem = EquilibriumProblem(assembly)
+
+        compute_interface_forces_cvx(assembly, problem=problem)
+        compute_interface_forces_cvxopt(assembly, problem=problem)
+
+        assembly.vertex[key]['is_support'] = True
+        problem.invalidate('supports')
+
+        compute_interface_forces_cvx(assembly, problem=problem)
+
+    """
+
+    def __init__(self, assembly, **parameters):
+        self.assembly = assembly
+        self.parameters = dict(PARAMETERS)
+        self.data = {}
+        self.update(**parameters)
+
+    def update(self, **parameters):
+        """Change the parameters of the problem.
+
+        Parameters
+        ----------
+        parameters : dict
+            The new values of the parameters.
+
+        Returns
+        -------
+        list
+            The names of the parameters that changed.
+
+        Raises
+        ------
+        TypeError
+            If a parameter is unknown.
+
+        """
+        changed = []
+
+        for name, value in parameters.items():
+            if name not in PARAMETERS:
+                raise TypeError('Unknown parameter: {}'.format(name))
+            if name == 'weights':
+                value = tuple(value)
+            if value != self.parameters[name]:
+                self.parameters[name] = value
+                changed.append(name)
+
+        if changed:
+            self.invalidate(*changed)
+
+        return changed
+
+    def invalidate(self, *names):
+        """Discard the data that depend on changed data of the assembly.
+
+        Parameters
+        ----------
+        names : list, optional
+            What changed:
+            ``'vertices'`` if blocks were added or removed,
+            ``'supports'``, ``'blocks'`` if their geometry changed, ``'interfaces'``,
+            or the names of parameters or of cached data.
+            Default is everything.
+
+        Returns
+        -------
+        list
+            The names of the discarded data.
+
+        """
+        if not names:
+            names = CHANGES
+
+        stale = set(names)
+
+        for name, dependencies in DEPENDENCIES:
+            if stale.intersection(dependencies):
+                stale.add(name)
+
+        discarded = [name for name, dependencies in DEPENDENCIES if name in stale and name in self.data]
+
+        for name in discarded:
+            del self.data[name]
+
+        return discarded
+
+    def unscale(self, x):
+        """Transform a solution of the equilibrated problem back to the original variables.
+
+        Parameters
+        ----------
+        x : array
+            The solution of the equilibrated problem.
+
+        Returns
+        -------
+        array
+            The solution of the problem.
+
+        """
+        return unscale_solution(x, self.equilibrated['scaling'])
+
+    # ==========================================================================
+    # parameters
+    # ==========================================================================
+
+    @property
+    def friction8(self):
+        return self.parameters['friction8']
+
+    @property
+    def mu(self):
+        return self.parameters['mu']
+
+    @property
+    def density(self):
+        return self.parameters['density']
+
+    @property
+    def tension(self):
+        return self.parameters['tension']
+
+    @property
+    def sparse(self):
+        return self.parameters['sparse']
+
+    @property
+    def weights(self):
+        return self.parameters['weights']
+
+    # ==========================================================================
+    # data
+    # ==========================================================================
+
+    @property
+    def key_index(self):
+        return self._get('key_index')
+
+    @property
+    def free(self):
+        return self._get('free')
+
+    @property
+    def vcount(self):
+        return self._get('vcount')
+
+    @property
+    def A(self):
+        return self._get('A')
+
+    @property
+    def b(self):
+        return self._get('b')
+
+    @property
+    def G(self):
+        return self._get('G')
+
+    @property
+    def h(self):
+        return self._get('h')
+
+    @property
+    def p(self):
+        return self._get('p')
+
+    @property
+    def P(self):
+        return self._get('P')
+
+    @property
+    def q(self):
+        return self._get('q')
+
+    @property
+    def equilibrated(self):
+        return self._get('equilibrated')
+
+    def _get(self, name):
+        if name not in self.data:
+            self.data[name] = getattr(self, '_make_' + name)()
+        return self.data[name]
+
+    def _make_key_index(self):
+        return {key: index for index, key in enumerate(self.assembly.vertices())}
+
+    def _make_free(self):
+        n = len(self.key_index)
+        fixed = set(self.key_index[key] for key in self.assembly.vertices_where({'is_support': True}))
+        return [index for index in range(n) if index not in fixed]
+
+    def _make_vcount(self):
+        return sum(len(attr['interface_points']) for u, v, attr in self.assembly.edges(True))
+
+    def _make_Aeq(self):
+        A, vcount = make_Aeq(self.assembly, tension=self.tension)
+        return A.tocsr()
+
+    def _make_loads(self):
+        b = [[0, 0, -1 * self.assembly.blocks[key].volume() * self.density, 0, 0, 0] for key in self.assembly.vertices()]
+        return array(b, dtype=float)
+
+    def _make_Aiq(self):
+        return make_Aiq(self.vcount, self.friction8, self.mu, tension=self.tension).tocsr()
+
+    def _make_A(self):
+        # row-major ordering => fx, fy, fz, mx, my, mz, fx, fy, fz, mx, my, mz, ...
+        A = self._get('Aeq')[[index * 6 + i for index in self.free for i in range(6)], :]
+        return A if self.sparse else A.toarray()
+
+    def _make_b(self):
+        return self._get('loads')[self.free, :].reshape((-1, 1), order='C')
+
+    def _make_G(self):
+        G = self._get('Aiq')
+        return G if self.sparse else G.toarray()
+
+    def _make_h(self):
+        return zeros((self.G.shape[0], 1))
+
+    def _make_p(self):
+        a1, a2, a3 = self.weights
+        if self.tension:
+            return array([a1, a2, a3, a3] * self.vcount, dtype=float)
+        return array([a1, a3, a3] * self.vcount, dtype=float)
+
+    def _make_P(self):
+        return diags(self.p) if self.sparse else diagflat(self.p)
+
+    def _make_q(self):
+        return zeros((self.p.shape[0], 1))
+
+    def _make_ruiz(self):
+        A, G, d, e, f = _ruiz(self.A, self.G)
+        return {'A': A, 'G': G, 'columns': d, 'rows': e, 'rows_iq': f}
+
+    def _make_equilibrated(self):
+        # see equilibrate
+        # the scaling of the constraint matrices is reused if only the loads or the weights change
+        ruiz = self._get('ruiz')
+        b, p, force, cost = _rescale(self.b, self.p, ruiz['columns'], ruiz['rows'])
+        P = diags(p) if self.sparse else diagflat(p)
+        scaling = {'columns': ruiz['columns'], 'rows': ruiz['rows'], 'rows_iq': ruiz['rows_iq'], 'force': force, 'cost': cost}
+        return {'A': ruiz['A'], 'b': b, 'G': ruiz['G'], 'p': p, 'P': P, 'scaling': scaling}
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,267 @@
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+import compas
+
+try:
+    from numpy import ones
+    from numpy import absolute
+    from numpy import sqrt
+    from numpy import asarray
+    from numpy import exp
+    from numpy import log
+    from numpy.linalg import cond
+    from scipy.sparse import issparse
+    from scipy.sparse import diags
+except ImportError:
+    compas.raise_if_not_ironpython()
+
+
+__all__ = [
+    'equilibrate',
+    'unscale_solution',
+    'condition_estimate',
+]
+
+
+def equilibrate(A, b, G, p, columns=True, maxiters=25, tol=1e-2):
+    r"""Equilibrate the matrices of the equilibrium problem.
+
+    Parameters
+    ----------
+    A : array or sparse matrix
+        The coefficient matrix of the equality constraints.
+    b : array
+        The right hand side of the equality constraints.
+    G : array or sparse matrix
+        The coefficient matrix of the inequality constraints.
+        Use ``None`` if the inequality constraints are handled separately,
+        which is only possible if the columns are not scaled.
+    p : array
+        The diagonal of the matrix of the quadratic objective.
+    columns : bool, optional
+        Scale the columns (the variables) as well as the rows.
+        Default is ``True``.
+    maxiters : int, optional
+        Maximum number of scaling iterations.
+        Default is ``25``.
+    tol : float, optional
+        Tolerance on the deviation of the row and column norms from one.
+        Default is ``1e-2``.
+
+    Returns
+    -------
+    tuple
+        The scaled matrices ``A``, ``b``, ``G``, ``p``,
+        and a dict with the scaling factors.
+
+    Notes
+    -----
+    The equilibrium problem
+
+    .. math::
+
+        \begin{aligned}
+            & \underset{x}{\text{minimise}} & \quad 0.5 \, \mathbf{x}^{T} \mathbf{P} \mathbf{x} \\
+            & \text{such that} & \quad \mathbf{A} \mathbf{x} = \mathbf{b} \\
+            &                  & \quad \mathbf{G} \mathbf{x} \leq \mathbf{0} \\
+        \end{aligned}
+
+    is replaced by the equivalent problem in :math:`\hat{\mathbf{x}}`,
+    with :math:`\mathbf{x} = f \mathbf{D} \hat{\mathbf{x}}`
+
+    .. math::
+
+        \begin{aligned}
+            & \underset{\hat{x}}{\text{minimise}} & \quad 0.5 \, c \, f^{2} \,
+                \hat{\mathbf{x}}^{T} \mathbf{D} \mathbf{P} \mathbf{D} \hat{\mathbf{x}} \\
+            & \text{such that} & \quad \mathbf{E} \mathbf{A} \mathbf{D} \hat{\mathbf{x}} = \mathbf{E} \mathbf{b} / f \\
+            &                  & \quad \mathbf{F} \mathbf{G} \mathbf{D} \hat{\mathbf{x}} \leq \mathbf{0} \\
+        \end{aligned}
+
+    The diagonal matrices :math:`\mathbf{D}`, :math:`\mathbf{E}` and :math:`\mathbf{F}` are computed
+    with Ruiz equilibration, such that the infinity norms of all rows and columns
+    of the stacked constraint matrix are (close to) one.
+    In the rows of :math:`\mathbf{A}` this removes the difference in magnitude between the
+    force components and the moments, which scale with the length unit of the model.
+    The force scale :math:`f` is the largest load, which removes the force unit,
+    and the cost scale :math:`c` normalises the (geometric) mean of the objective weights.
+
+    Without column scaling, the friction constraints are not modified,
+    and the scaled problem has the same (per vertex) structure as the original one.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        A, b, G, p, scaling = equilibrate(A, b, G, p)
+
+        # solve the scaled problem
+        # ...
+
+        x = unscale_solution(x, scaling)
+
+    """
+    As, Gs, d, e, f = _ruiz(A, G, columns, maxiters, tol)
+    bs, ps, force, cost = _rescale(b, p, d, e)
+
+    scaling = {
+        'columns': d,
+        'rows': e,
+        'rows_iq': f,
+        'force': force,
+        'cost': cost,
+    }
+
+    return As, bs, Gs, ps, scaling
+
+
+def unscale_solution(x, scaling):
+    """Transform the solution of an equilibrated problem back to the original variables.
+
+    Parameters
+    ----------
+    x : array
+        The solution of the equilibrated problem.
+    scaling : dict
+        The scaling factors returned by :func:`equilibrate`.
+
+    Returns
+    -------
+    array
+        The solution of the original problem.
+
+    """
+    shape = x.shape
+    x = scaling['force'] * scaling['columns'] * x.reshape((-1, ))
+    return x.reshape(shape)
+
+
+def condition_estimate(A, maxsize=1000):
+    """Estimate the condition number of a constraint matrix.
+
+    Parameters
+    ----------
+    A : array or sparse matrix
+        The matrix.
+    maxsize : int, optional
+        The maximum number of rows for which the 2-norm condition number is computed.
+        Default is ``1000``.
+
+    Returns
+    -------
+    float
+        The 2-norm condition number of the matrix if it is small enough,
+        otherwise the ratio of the largest and smallest row norms,
+        which is a lower bound of the condition number.
+
+    """
+    if A.shape[0] <= maxsize:
+        A = A.toarray() if issparse(A) else A
+        return float(cond(A))
+
+    rows = _norms(A, 1, ord=2)
+    rows = rows[rows > 0]
+    return float(rows.max() / rows.min())
+
+
+# ==============================================================================
+# Helpers
+# ==============================================================================
+
+
+def _norms(A, axis, ord=None):
+    """Compute the infinity norms (or 2-norms) of the rows (1) or columns (0) of a matrix.
+    Zero norms are replaced by one."""
+    if issparse(A):
+        A = absolute(A)
+        if ord == 2:
+            norms = sqrt(asarray(A.multiply(A).sum(axis=axis)).flatten())
+        else:
+            norms = A.max(axis=axis).toarray().flatten()
+    else:
+        A = absolute(A)
+        if ord == 2:
+            norms = sqrt((A * A).sum(axis=axis))
+        else:
+            norms = A.max(axis=axis) if A.size else ones(A.shape[1 - axis])
+    norms = asarray(norms, dtype=float)
+    norms[norms == 0] = 1.0
+    return norms
+
+
+def _ruiz(A, G, columns=True, maxiters=25, tol=1e-2):
+    """Compute the Ruiz scaling of the constraint matrices.
+    Returns the scaled matrices and the column, row and inequality row factors."""
+    m, n = A.shape
+    k = G.shape[0] if G is not None else 0
+
+    d = ones(n)
+    e = ones(m)
+    f = ones(k)
+
+    As = A
+    Gs = G
+
+    for _ in range(maxiters):
+        rows_A = _norms(As, 1)
+        rows_G = _norms(Gs, 1) if k else ones(0)
+
+        if columns:
+            cols = _norms(As, 0)
+            if k:
+                cols_G = _norms(Gs, 0)
+                cols[cols_G > cols] = cols_G[cols_G > cols]
+        else:
+            cols = ones(n)
+
+        deviation = max(absolute(1 - rows_A).max() if m else 0,
+                        absolute(1 - rows_G).max() if k else 0,
+                        absolute(1 - cols).max() if n else 0)
+
+        if deviation < tol:
+            break
+
+        sr_A = 1.0 / sqrt(rows_A)
+        sr_G = 1.0 / sqrt(rows_G)
+        sc = 1.0 / sqrt(cols)
+
+        e *= sr_A
+        f *= sr_G
+        d *= sc
+
+        As = _scale(A, e, d)
+        Gs = _scale(G, f, d) if k else G
+
+    return As, Gs, d, e, f
+
+
+def _rescale(b, p, d, e):
+    """Scale the loads and the objective weights with the factors of the Ruiz scaling,
+    and compute the force and cost scales."""
+    force = absolute(b).max() if len(b) else 1.0
+    force = force or 1.0
+
+    ps = p * d ** 2 * force ** 2
+    cost = 1.0 / exp(log(ps).mean()) if len(ps) else 1.0
+    ps = cost * ps
+
+    bs = e * asarray(b).reshape((-1, )) / force
+    bs = bs.reshape(asarray(b).shape)
+
+    return bs, ps, force, cost
+
+
+def _scale(A, rows, cols):
+    if issparse(A):
+        return diags(rows).dot(A).dot(diags(cols)).tocsc()
+    return A * rows[:, None] * cols[None, :]
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,429 @@
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+import compas
+
+try:
+    from numpy import array
+    from numpy import zeros
+    from numpy import cumsum
+    from numpy import absolute
+    from numpy import sqrt
+    from numpy import concatenate
+    from scipy.sparse import block_diag
+except ImportError:
+    compas.raise_if_not_ironpython()
+
+from compas_rbe.equilibrium.helpers import set_interface_forces
+from compas_rbe.equilibrium.scaling import equilibrate
+from compas_rbe.equilibrium.scaling import unscale_solution
+from compas_rbe.equilibrium.timing import PhaseTimer
+from compas_rbe.equilibrium.telemetry import SolverMonitor
+from compas_rbe.equilibrium.telemetry import SOLVED
+from compas_rbe.equilibrium.problem import EquilibriumProblem
+from compas_rbe.equilibrium.problem import WEIGHTS
+from compas_rbe.equilibrium.interfaceforces import compute_interface_forces_cvx
+from compas_rbe.equilibrium.interfaceforces import compute_interface_forces_cvxopt
+from compas_rbe.tracing import traced
+
+
+__all__ = ['compute_interface_forces_stacked']
+
+
+SOLVERS = ('OSQP', 'ECOS', 'CVXOPT', 'MOSEK', 'CPLEX')
+
+
+@traced(category='backend')
+def compute_interface_forces_stacked(assemblies,
+                                     backend='cvx',
+                                     friction8=False,
+                                     mu=0.6,
+                                     density=1.0,
+                                     verbose=False,
+                                     maxiters=1000,
+                                     solver=None,
+                                     scale=True,
+                                     tension=True,
+                                     fallback=True,
+                                     callback=None):
+    r"""Compute the interface forces of many independent assemblies with a single solve.
+
+    The equilibrium problems of the assemblies are stacked into one problem,
+    with block-diagonal constraint matrices and a separable objective,
+
+    .. math::
+
+        \begin{aligned}
+
+            & \underset{x_1, \ldots, x_k}{\text{minimise}} & \quad \sum_{i} 0.5 \, \mathbf{x}_{i}^{T} \mathbf{P}_{i} \mathbf{x}_{i} \\
+            & \text{such that} & \quad \mathbf{A}_{i} \mathbf{x}_{i} = \mathbf{b}_{i} \\
+            &                  & \quad \mathbf{G}_{i} \mathbf{x}_{i} <= \mathbf{0} \\
+
+        \end{aligned}
+
+    of which the solution consists of the solutions of the individual problems.
+
+    Parameters
+    ----------
+    assemblies : list
+        The rigid block assemblies.
+    backend : {'cvx', 'cvxopt'}, optional
+        The formulation of the problem and the solver,
+        as in :func:`compute_interface_forces_cvx` and :func:`compute_interface_forces_cvxopt`.
+        Default is ``'cvx'``.
+    friction8 : bool, optional
+        Use an eight-sided friction pyramid.
+        Default is ``False``.
+    mu : float, optional
+        ?
+    density : float, optional
+        Density of the block material.
+        Default is ``1.0``
+    verbose : bool, optional
+        Print information during the execution of the algorithm.
+        Default is ``False``.
+    maxiters : int, optional
+        Maximum number of iterations used by the solver,
+        with the ``'cvxopt'`` backend.
+        Default is ``1000``.
+    solver : {'OSQP', 'ECOS', 'CVXOPT', 'MOSEK', 'CPLEX'}, optional
+        The solver to be used internally, with the ``'cvx'`` backend.
+        Default is ``'ECOS'``.
+    scale : bool, optional
+        Equilibrate the stacked problem before solving it.
+        Default is ``True``.
+    tension : {True, False, 'auto'}, optional
+        Allow tension at the interfaces.
+        With ``'auto'``, the stacked problem is solved without tension first,
+        and with tension only if that problem can't be solved.
+        Default is ``True``.
+    fallback : bool, optional
+        If the stacked problem can't be solved,
+        solve the assemblies one by one, such that the problems that can be solved are solved.
+        Default is ``True``.
+    callback : callable, optional
+        A function that is called with the progress of the solver and with its final report.
+        See :class:`SolverMonitor`.
+        Default is ``None``.
+
+    Returns
+    -------
+    dict
+        Information about the solution process,
+        with the solver ``'status'`` and the number of ``'iterations'`` of the stacked problem,
+        the total value of the ``'objective'`` function,
+        whether ``'tension'`` was allowed,
+        the number of variables of the stacked problem (``'size'``),
+        whether the assemblies were solved one by one (``'fallback'``),
+        per assembly the ``'status'`` and the value of the ``'objective'`` function (``'assemblies'``),
+        the ``'progress'`` of the solver,
+        and the wall and CPU ``'timings'`` and the memory of the phases of the computation.
+        The interface forces of the assemblies are updated in place.
+
+    Notes
+    -----
+    The matrices are always sparse.
+    The setup of the problem and of the solver, and the overhead of the calls,
+    are shared by all assemblies, which makes this much faster than solving many small assemblies one by one.
+    For large assemblies, there is no advantage.
+
+    A single assembly that can't be in equilibrium makes the stacked problem infeasible.
+    With ``fallback``, the assemblies are then solved one by one,
+    with the parameters of the stacked problem,
+    and the per assembly information contains the information of the individual solves.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        assemblies = [pile_assembly(n) for n in range(2, 10)]
+
+        info = compute_interface_forces_stacked(assemblies, backend='cvxopt')
+
+        for assembly, result in zip(assemblies, info['assemblies']):
+            print(assembly.number_of_vertices(), result['status'])
+
+    """
+    if backend not in WEIGHTS:
+        raise ValueError('Unknown backend for stacked problems: {}'.format(backend))
+
+    options = dict(backend=backend, friction8=friction8, mu=mu, density=density, verbose=verbose,
+                   maxiters=maxiters, solver=solver, scale=scale, fallback=fallback, callback=callback)
+
+    if tension == 'auto':
+        info = compute_interface_forces_stacked(assemblies, tension=False, **dict(options, fallback=False))
+
+        if info['status'] in SOLVED:
+            return info
+
+        return compute_interface_forces_stacked(assemblies, tension=True, **options)
+
+    timer = PhaseTimer()
+    monitor = SolverMonitor('stacked', callback)
+
+    # ==========================================================================
+    # problems
+    # ==========================================================================
+
+    timer.phase('build')
+
+    # the objective weights of the single assembly solvers,
+    # such that the stacked solution is the same as the individual solutions
+
+    parameters = dict(friction8=friction8, mu=mu, density=density, tension=tension, sparse=True, weights=WEIGHTS[backend])
+
+    problems = [EquilibriumProblem(assembly, **parameters) for assembly in assemblies]
+    problems = [(problem.A, problem.b, problem.G, problem.p) for problem in problems]
+
+    timer.phase('stack')
+
+    A = block_diag([problem[0] for problem in problems], format='csr')
+    b = concatenate([problem[1] for problem in problems]).reshape((-1, 1))
+    G = block_diag([problem[2] for problem in problems], format='csr')
+    p = concatenate([problem[3] for problem in problems])
+
+    # the weights of the unscaled problem, for the objectives of the individual assemblies
+
+    weights = p
+
+    h = zeros((G.shape[0], 1))
+
+    # the variables, equations and inequalities of assembly i are
+    # x[offsets[i]:offsets[i + 1]], A[rows[i]:rows[i + 1]] and G[constraints[i]:constraints[i + 1]]
+
+    offsets = _offsets([problem[3].shape[0] for problem in problems])
+    rows = _offsets([problem[0].shape[0] for problem in problems])
+    constraints = _offsets([problem[2].shape[0] for problem in problems])
+
+    # ==========================================================================
+    # scaling
+    # ==========================================================================
+
+    timer.phase('scaling')
+
+    scaling = None
+
+    if scale:
+        A, b, G, p, scaling = equilibrate(A, b, G, p)
+
+    # ==========================================================================
+    # solve
+    # ==========================================================================
+
+    timer.phase('setup')
+
+    if verbose:
+        print('')
+        print('stacked {0} assemblies: {1} variables'.format(len(assemblies), p.shape[0]))
+        print('with  G', G.shape)
+        print('      A', A.shape)
+
+    if backend == 'cvx':
+        status, iterations, x = _solve_cvx(A, b, G, h, p, offsets, solver, verbose, timer)
+    else:
+        blocks = list(zip(_pairs(offsets), _pairs(rows), _pairs(constraints)))
+        status, iterations, x = _solve_cvxopt(A, b, G, h, p, blocks, maxiters, verbose, monitor, timer)
+
+    timer.phase('update')
+
+    # ==========================================================================
+    # update
+    # ==========================================================================
+
+    results = [{'status': status, 'objective': None} for assembly in assemblies]
+    objective = None
+
+    if x is not None:
+        if scaling:
+            x = unscale_solution(x, scaling)
+
+        x = x.flatten()
+
+        objective = 0.0
+
+        for assembly, result, (start, end) in zip(assemblies, results, _pairs(offsets)):
+            xi = x[start:end]
+            result['objective'] = 0.5 * float((weights[start:end] * xi ** 2).sum())
+            objective += result['objective']
+
+            xi[absolute(xi) < 1e-6] = 0.0
+
+            set_interface_forces(assembly, xi.tolist(), tension=tension)
+
+    monitor.done(status, objective=objective, iterations=iterations, assemblies=len(assemblies))
+
+    info = {
+        'status': status,
+        'objective': objective,
+        'iterations': iterations,
+        'tension': tension,
+        'size': len(weights),
+        'fallback': False,
+        'assemblies': results,
+        'progress': monitor.history,
+    }
+
+    if status not in SOLVED and fallback and len(assemblies) > 1:
+        timer.phase('fallback')
+
+        info['fallback'] = True
+        info['assemblies'] = [_solve_assembly(assembly, tension=tension, **options) for assembly in assemblies]
+
+    timer.stop()
+
+    info['timings'] = timer.to_data()
+
+    return info
+
+
+# ==============================================================================
+# Helpers
+# ==============================================================================
+
+
+def _solve_cvx(A, b, G, h, p, offsets, solver, verbose, timer):
+    import cvxpy
+
+    solver = solver or 'ECOS'
+
+    if solver not in SOLVERS:
+        raise Exception('Solver not supported: {}'.format(solver))
+
+    if compas.PY3:
+        x = cvxpy.Variable((p.shape[0], 1))
+    else:
+        x = cvxpy.Variable(p.shape[0])
+
+    # one term per assembly, such that the cones of the objective are as separable as the problems
+
+    w = sqrt(p).reshape(x.shape)
+
+    objective = cvxpy.Minimize(0.5 * sum(cvxpy.sum_squares(cvxpy.multiply(w[start:end], x[start:end]))
+                                         for start, end in _pairs(offsets)))
+
+    constraints = [
+        A * x == b,
+        G * x <= h
+    ]
+
+    problem = cvxpy.Problem(objective, constraints)
+
+    timer.phase('solve')
+
+    try:
+        problem.solve(solver=getattr(cvxpy, solver), verbose=verbose)
+    except cvxpy.error.SolverError:
+        return 'error', None, None
+
+    compilation = getattr(problem, 'compilation_time', None)
+
+    if compilation:
+        timer.add('solve', -compilation)
+        timer.add('setup', compilation)
+
+    x = array(x.value).reshape((-1, 1)) if problem.status in SOLVED else None
+
+    return problem.status, problem.solver_stats.num_iters, x
+
+
+def _solve_cvxopt(A, b, G, h, p, blocks, maxiters, verbose, monitor, timer):
+    import cvxopt
+
+    from compas_rbe.equilibrium.interfaceforces.interfaceforces_cvxopt import _spmatrix
+
+    args = (
+        cvxopt.spdiag(cvxopt.matrix(p)),
+        cvxopt.matrix(zeros((p.shape[0], 1))),
+        _spmatrix(G),
+        cvxopt.matrix(h),
+        _spmatrix(A),
+        cvxopt.matrix(b)
+    )
+
+    settings = {'feastol': 1e-7, 'maxiters': maxiters, 'show_progress': True}
+
+    kktsolver = _block_kktsolver(A, G, p, blocks)
+
+    timer.phase('solve')
+
+    # CVXOPT raises a ValueError if the equations of an assembly are rank deficient
+
+    try:
+        with monitor.capture(echo=verbose):
+            res = cvxopt.solvers.qp(*args, kktsolver=kktsolver, options=settings)
+    except ValueError:
+        return 'error', None, None
+
+    x = array(res['x']).reshape((-1, 1)) if res['x'] and res['status'] in SOLVED else None
+
+    return res['status'], res['iterations'], x
+
+
+def _block_kktsolver(A, G, p, blocks):
+    """Solve the KKT systems of a block-diagonal problem per block.
+
+    The default solver of CVXOPT eliminates the equations of the entire problem at once,
+    which is quadratic in the number of assemblies.
+    """
+    import cvxopt
+
+    from cvxopt.misc import kkt_chol2
+
+    from compas_rbe.equilibrium.interfaceforces.interfaceforces_cvxopt import _spmatrix
+
+    factors = []
+
+    for (c0, c1), (e0, e1), (g0, g1) in blocks:
+        factor = kkt_chol2(_spmatrix(G[g0:g1, c0:c1]), {'l': g1 - g0, 'q': [], 's': []}, _spmatrix(A[e0:e1, c0:c1]))
+        factors.append((factor, cvxopt.spdiag(cvxopt.matrix(p[c0:c1]))))
+
+    def kktsolver(W):
+        solvers = []
+
+        for (factor, P), (cols, eqs, rows) in zip(factors, blocks):
+            Wi = {'d': W['d'][rows[0]:rows[1]], 'di': W['di'][rows[0]:rows[1]], 'v': [], 'beta': [], 'r': [], 'rti': []}
+            solvers.append(factor(Wi, P))
+
+        def solve(x, y, z):
+            for solver, (cols, eqs, rows) in zip(solvers, blocks):
+                xi = x[cols[0]:cols[1]]
+                yi = y[eqs[0]:eqs[1]]
+                zi = z[rows[0]:rows[1]]
+                solver(xi, yi, zi)
+                x[cols[0]:cols[1]] = xi
+                y[eqs[0]:eqs[1]] = yi
+                z[rows[0]:rows[1]] = zi
+
+        return solve
+
+    return kktsolver
+
+
+def _offsets(sizes):
+    return [0] + cumsum(sizes).tolist()
+
+
+def _pairs(offsets):
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+def _solve_assembly(assembly, backend, tension, solver, fallback, **kwargs):
+    """Solve a single assembly with the backend of the stacked problem."""
+    try:
+        if backend == 'cvx':
+            info = compute_interface_forces_cvx(assembly, tension=tension, solver=solver, **kwargs)
+        else:
+            info = compute_interface_forces_cvxopt(assembly, tension=tension, **kwargs)
+    except Exception as e:
+        return {'status': 'error', 'objective': None, 'iterations': None, 'error': str(e)}
+
+    return {'status': info['status'], 'objective': info['objective'], 'iterations': info['iterations']}
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,234 @@
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+import re
+import sys
+import logging
+import threading
+
+from contextlib import contextmanager
+
+
+__all__ = ['SolverMonitor']
+
+
+LOG = logging.getLogger('compas_rbe.equilibrium')
+LOG.addHandler(logging.NullHandler())
+
+# statuses of successful solves, of all backends
+
+SOLVED = ('optimal', 'optimal_inaccurate', 'converged')
+
+# a row of the progress table of CVXOPT, e.g. " 3: -1.2e+00 -1.3e+00 1e-01 2e-16 3e-01"
+
+ROW = re.compile(r'^\s*(\d+):\s+(.*)$')
+
+# the redirection of sys.stdout is shared by all threads
+
+_LOCK = threading.Lock()
+_CAPTURES = [0]
+
+
+class SolverMonitor(object):
+    """Forward the progress of an equilibrium solver to a callback and to the log.
+
+    Parameters
+    ----------
+    backend : str
+        The name of the backend.
+    callback : callable, optional
+        A function that is called with a dict per event.
+        All events have a ``'backend'`` and an ``'event'``,
+        which is ``'iteration'`` for the progress of the solver,
+        or ``'done'`` for the final report.
+        The other items depend on the backend,
+        for example the ``'iteration'``, the residuals and the duality gap.
+    history : bool, optional
+        Keep the iteration events.
+        Default is ``True``.
+
+    Attributes
+    ----------
+    history : list
+        The iteration events.
+
+    Notes
+    -----
+    The iterations of the CVXOPT, PGS and DD backends are reported.
+    The CVX backend only reports the final result:
+    the solvers behind CVXPY (ECOS, OSQP, SCS, ...) write their progress
+    from compiled code directly to the console of the process,
+    where it can't be captured with ``sys.stdout``.
+
+    The iterations are logged with level ``DEBUG``,
+    and the final report with level ``INFO``, or ``WARNING`` if the problem was not solved,
+    to the logger ``'compas_rbe.equilibrium'``.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        def callback(event):
+            if event['event'] == 'iteration':
+                print(event['iteration'], event['gap'])
+
+        info = compute_interface_forces_cvxopt(assembly, callback=callback)
+
+    """
+
+    def __init__(self, backend, callback=None, history=True):
+        self.backend = backend
+        self.callback = callback
+        self.keep = history
+        self.history = []
+
+    def iteration(self, iteration, **values):
+        """Report an iteration of the solver."""
+        event = {'backend': self.backend, 'event': 'iteration', 'iteration': iteration}
+        event.update(values)
+
+        if self.keep:
+            self.history.append(event)
+
+        if LOG.isEnabledFor(logging.DEBUG):
+            LOG.debug('%s %5d %s', self.backend, iteration,
+                      '  '.join('{0} {1:.3e}'.format(key, values[key]) for key in sorted(values)))
+
+        if self.callback:
+            self.callback(event)
+
+    def done(self, status, **values):
+        """Report the result of the solver."""
+        event = {'backend': self.backend, 'event': 'done', 'status': status}
+        event.update(values)
+
+        level = logging.INFO if status in SOLVED else logging.WARNING
+        LOG.log(level, '%s: %s after %s iterations (objective %s)',
+                self.backend, status, values.get('iterations'), values.get('objective'))
+
+        if self.callback:
+            self.callback(event)
+
+    @contextmanager
+    def capture(self, echo=False):
+        """Capture the progress table that CVXOPT prints to ``sys.stdout``,
+        and report its rows as iterations.
+
+        Parameters
+        ----------
+        echo : bool, optional
+            Also write the captured output to ``sys.stdout``.
+            Default is ``False``.
+
+        Notes
+        -----
+        Only the output of the current thread is captured.
+        While any thread is capturing, ``sys.stdout`` is replaced by a stream
+        that forwards the output of every thread to its own destination.
+
+        """
+        with _LOCK:
+            if _CAPTURES[0] == 0 or not isinstance(sys.stdout, _ThreadStdout):
+                sys.stdout = _ThreadStdout(sys.stdout)
+            _CAPTURES[0] += 1
+            stdout = sys.stdout
+
+        stream = _TableStream(self, stdout.target() if echo else None)
+        previous = stdout.redirect(stream)
+        try:
+            yield stream
+        finally:
+            stdout.redirect(previous)
+            stream.flush()
+            with _LOCK:
+                _CAPTURES[0] -= 1
+                if _CAPTURES[0] == 0 and sys.stdout is stdout:
+                    sys.stdout = stdout.stdout
+
+
+# ==============================================================================
+# Helpers
+# ==============================================================================
+
+
+class _ThreadStdout(object):
+    """A file-like object that forwards the output of every thread to its own stream."""
+
+    def __init__(self, stdout):
+        self.stdout = stdout
+        self.local = threading.local()
+
+    def target(self):
+        return getattr(self.local, 'stream', None) or self.stdout
+
+    def redirect(self, stream):
+        previous = getattr(self.local, 'stream', None)
+        self.local.stream = stream
+        return previous
+
+    def write(self, text):
+        self.target().write(text)
+
+    def flush(self):
+        self.target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stdout, name)
+
+
+class _TableStream(object):
+    """A file-like object that parses a progress table line by line."""
+
+    def __init__(self, monitor, echo=None):
+        self.monitor = monitor
+        self.echo = echo
+        self.header = None
+        self.buffer = ''
+        self.messages = []
+
+    def write(self, text):
+        if self.echo:
+            self.echo.write(text)
+        self.buffer += text
+        while '\n' in self.buffer:
+            line, self.buffer = self.buffer.split('\n', 1)
+            self.parse(line)
+
+    def flush(self):
+        if self.buffer:
+            self.parse(self.buffer)
+            self.buffer = ''
+        if self.echo:
+            self.echo.flush()
+
+    def parse(self, line):
+        if not line.strip():
+            return
+
+        match = ROW.match(line)
+
+        if match and self.header:
+            try:
+                values = [float(token) for token in match.group(2).split()]
+            except ValueError:
+                values = None
+            if values:
+                self.monitor.iteration(int(match.group(1)), **dict(zip(self.header, values)))
+                return
+
+        tokens = line.split()
+
+        if not match and tokens and all(token.isalpha() for token in tokens):
+            self.header = tokens
+            return
+
+        self.messages.append(line.strip())
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,210 @@
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+import sys
+import time
+
+try:
+    wall_clock = time.perf_counter
+    cpu_clock = time.process_time
+except AttributeError:
+    wall_clock = time.time
+    cpu_clock = time.clock
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from compas_rbe.tracing import is_tracing
+from compas_rbe.tracing import _timestamp
+from compas_rbe.tracing import _complete
+
+
+__all__ = [
+    'PhaseTimer',
+    'peak_rss',
+]
+
+
+class PhaseTimer(object):
+    """Measure the wall and CPU time of the consecutive phases of a computation.
+
+    Attributes
+    ----------
+    phases : list
+        The names of the phases, in the order in which they were started.
+    wall : dict
+        Per phase, the wall time in seconds.
+    cpu : dict
+        Per phase, the CPU time of the current process in seconds.
+    memory : dict
+        Per phase, the peak resident memory of the process at the end of the phase,
+        and the peak memory allocated by Python during the phase, if :mod:`tracemalloc` is tracing,
+        in MB.
+
+    Notes
+    -----
+    Starting a phase ends the previous one.
+    A phase that is started more than once accumulates the time of all its runs.
+    The CPU time does not include the time of other processes, such as solver workers.
+    If problems are solved concurrently in multiple threads,
+    the CPU time and the memory include those of the other threads.
+
+    The peak resident memory never decreases,
+    therefore the phase in which it increases is the phase that needed the memory.
+    The peak allocated memory is only measured per phase from Python 3.9,
+    and includes the allocations of numpy.
+
+    If a trace is being recorded (see :mod:`compas_rbe.tracing`),
+    every run of a phase is also recorded as a span in the trace.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        timer = PhaseTimer()
+
+        timer.phase('Aeq')
+        A, vcount = make_Aeq(assembly)
+
+        timer.phase('Aiq')
+        G = make_Aiq(vcount)
+
+        timer.stop()
+
+        print(timer.to_data())
+
+    """
+
+    def __init__(self):
+        self.phases = []
+        self.wall = {}
+        self.cpu = {}
+        self.memory = {}
+        self._current = None
+        self._wall = None
+        self._cpu = None
+        self._start = None
+
+    def phase(self, name):
+        """End the current phase, if any, and start a new one.
+
+        Parameters
+        ----------
+        name : str
+            The name of the phase.
+            Use ``None`` to pause the timer.
+
+        """
+        wall = wall_clock()
+        cpu = cpu_clock()
+
+        if self._current is not None:
+            self.wall[self._current] += wall - self._wall
+            self.cpu[self._current] += cpu - self._cpu
+            self._measure_memory(self._current)
+            if self._start is not None:
+                _complete(self._current, self._start, wall - self._wall, 'phase')
+
+        if name is not None and name not in self.wall:
+            self.phases.append(name)
+            self.wall[name] = 0.0
+            self.cpu[name] = 0.0
+
+        if name is not None and tracemalloc is not None and tracemalloc.is_tracing():
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+
+        self._current = name
+        self._wall = wall
+        self._cpu = cpu
+        self._start = _timestamp() if name is not None and is_tracing() else None
+
+    def stop(self):
+        """End the current phase."""
+        self.phase(None)
+
+    def add(self, name, wall, cpu=0.0):
+        """Add an externally measured duration to a phase.
+
+        Parameters
+        ----------
+        name : str
+            The name of the phase.
+        wall : float
+            The wall time in seconds.
+        cpu : float, optional
+            The CPU time in seconds.
+
+        """
+        if name not in self.wall:
+            self.phases.append(name)
+            self.wall[name] = 0.0
+            self.cpu[name] = 0.0
+        self.wall[name] += wall
+        self.cpu[name] += cpu
+
+    def to_data(self):
+        """The timings as a dict, with per phase and for the ``'total'`` the ``'wall'`` and ``'cpu'`` time,
+        and the ``'peak_rss'`` and ``'peak_traced'`` memory."""
+        data = {}
+        for name in self.phases:
+            data[name] = {'wall': self.wall[name], 'cpu': self.cpu[name]}
+            data[name].update(self.memory.get(name, {}))
+        data['total'] = {'wall': sum(self.wall.values()), 'cpu': sum(self.cpu.values())}
+        data['total'].update(_memory_totals(self.memory.values()))
+        return data
+
+    def _measure_memory(self, name):
+        memory = self.memory.setdefault(name, {'peak_rss': None, 'peak_traced': None})
+
+        rss = peak_rss()
+        if rss is not None:
+            memory['peak_rss'] = max(rss, memory['peak_rss'] or 0.0)
+
+        if tracemalloc is not None and tracemalloc.is_tracing():
+            traced = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            memory['peak_traced'] = max(traced, memory['peak_traced'] or 0.0)
+
+
+def peak_rss():
+    """Get the peak resident memory of the current process.
+
+    Returns
+    -------
+    float
+        The peak resident set size in MB,
+        or ``None`` if it is not available on the platform.
+
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    if sys.platform == 'darwin':
+        return rss / 2 ** 20
+    return rss / 2 ** 10
+
+
+def _memory_totals(memory):
+    totals = {'peak_rss': None, 'peak_traced': None}
+    for item in memory:
+        for key in totals:
+            if item.get(key) is not None:
+                totals[key] = max(item[key], totals[key] or 0.0)
+    return totals
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+    pass
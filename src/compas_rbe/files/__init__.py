@@ -0,0 +1,68 @@
+"""
+********************************************************************************
+compas_rbe.files
+********************************************************************************
+
+.. currentmodule:: compas_rbe.files
+
+
+Binary format
+=============
+
+A compact alternative to the JSON files of the models,
+with the geometry and the interface forces stored as typed arrays
+that are mapped into memory when the file is opened.
+
+.. autosummary::
+    :toctree: generated/
+    :nosignatures:
+
+    write_binary
+    read_binary
+    binary_to_data
+    read_binary_forces
+    write_binary_forces
+    read_binary_array
+    read_binary_blocks
+
+
+Streaming
+=========
+
+Incremental loading of the JSON files of the models,
+with the geometry of the blocks stored in arrays.
+
+.. autosummary::
+    :toctree: generated/
+    :nosignatures:
+
+    ArrayBlock
+    iter_json_members
+    load_assembly_streaming
+
+
+Legacy data
+===========
+
+Conversion of the old JSON files, with the faces of the blocks stored as linked lists.
+
+.. autosummary::
+    :toctree: generated/
+    :nosignatures:
+
+    face_cycles
+    convert_legacy_data
+    convert_legacy_file
+    convert_legacy_directory
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from .binary import *
+from .streaming import *
+from .legacy import *
+
+__all__ = [name for name in dir() if not name.startswith('_')]
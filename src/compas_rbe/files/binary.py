@@ -0,0 +1,579 @@
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+import sys
+import json
+import struct
+
+from array import array
+
+import compas
+
+try:
+    import numpy
+except ImportError:
+    compas.raise_if_not_ironpython()
+
+
+__all__ = [
+    'write_binary',
+    'read_binary',
+    'binary_to_data',
+    'read_binary_forces',
+    'write_binary_forces',
+    'read_binary_array',
+    'read_binary_blocks',
+]
+
+
+MAGIC = b'RBE1'
+
+ALIGN = 8
+
+TYPECODES = {
+    'd': '<f8',
+    'i': '<i4',
+    'B': '|u1',
+}
+
+FORCES = ('c_np', 'c_nn', 'c_u', 'c_v')
+
+NAN = float('nan')
+
+
+def write_binary(path, data):
+    """Write the data of an assembly and its blocks to a binary file.
+
+    Parameters
+    ----------
+    path : str
+        The path of the file.
+    data : dict
+        The data of the ``'assembly'`` and of its ``'blocks'``,
+        in the format of the JSON files of the models.
+
+    Notes
+    -----
+    The file starts with a small JSON header that describes the typed arrays that follow.
+    The coordinates of the assembly vertices, the faces of the blocks,
+    and the points, frames and forces of the interfaces are stored as arrays.
+    All other attributes are stored in the header.
+    The keys of the vertices of the assembly and of the blocks are stored as integers.
+
+    The writer doesn't depend on numpy and can be used in Rhino.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        with open(compas_rbe.get('complex/matthias_vault_blocks.json'), 'r') as f:
+            data = json.load(f)
+
+        write_binary('vault.rbe', data)
+
+        arrays = read_binary('vault.rbe')['arrays']
+
+    """
+    arrays = []
+    meta = {}
+
+    # ==========================================================================
+    # assembly
+    # ==========================================================================
+
+    assembly = data['assembly']
+
+    vertex_keys = array('i')
+    vertex_xyz = array('d')
+    vertex_support = array('B')
+    vertex_attr = {}
+
+    for key, attr in assembly['vertex'].items():
+        vertex_keys.append(_int(key))
+        vertex_xyz.extend([attr['x'], attr['y'], attr['z']])
+        vertex_support.append(1 if attr.get('is_support') else 0)
+        extra = {name: value for name, value in attr.items() if name not in ('x', 'y', 'z', 'is_support')}
+        if extra:
+            vertex_attr[key] = extra
+
+    arrays.append(('vertex_keys', vertex_keys, (len(vertex_keys), )))
+    arrays.append(('vertex_xyz', vertex_xyz, (len(vertex_keys), 3)))
+    arrays.append(('vertex_support', vertex_support, (len(vertex_keys), )))
+
+    edges = array('i')
+    offsets = array('i', [0])
+    points = array('d')
+    forces = array('d')
+    uvw = array('d')
+    origin = array('d')
+    edge_attr = []
+
+    geometry = ('interface_points', 'interface_forces', 'interface_uvw', 'interface_origin')
+
+    for u in assembly['edge']:
+        for v, attr in assembly['edge'][u].items():
+            edges.extend([_int(u), _int(v)])
+
+            interface_points = attr.get('interface_points') or []
+            interface_forces = attr.get('interface_forces') or []
+
+            offsets.append(offsets[-1] + len(interface_points))
+
+            for xyz in interface_points:
+                points.extend(xyz)
+
+            for i in range(len(interface_points)):
+                if i < len(interface_forces):
+                    forces.extend([interface_forces[i][name] for name in FORCES])
+                else:
+                    forces.extend([NAN] * 4)
+
+            frame = attr.get('interface_uvw') or [[NAN] * 3] * 3
+            for axis in frame:
+                uvw.extend(axis)
+
+            origin.extend(attr.get('interface_origin') or [NAN] * 3)
+
+            edge_attr.append({name: value for name, value in attr.items() if name not in geometry})
+
+    m = len(offsets) - 1
+
+    arrays.append(('edges', edges, (m, 2)))
+    arrays.append(('interface_offsets', offsets, (m + 1, )))
+    arrays.append(('interface_points', points, (offsets[-1], 3)))
+    arrays.append(('interface_forces', forces, (offsets[-1], 4)))
+    arrays.append(('interface_uvw', uvw, (m, 3, 3)))
+    arrays.append(('interface_origin', origin, (m, 3)))
+
+    meta['assembly'] = {name: value for name, value in assembly.items() if name not in ('vertex', 'edge', 'halfedge')}
+    meta['vertex'] = vertex_attr
+    meta['edge'] = edge_attr
+
+    # ==========================================================================
+    # blocks
+    # ==========================================================================
+
+    block_keys = array('i')
+    block_vertices = array('i', [0])
+    block_faces = array('i', [0])
+    xyz = array('d')
+    vkeys = array('i')
+    fkeys = array('i')
+    face_offsets = array('i', [0])
+    face_vertices = array('i')
+    block_meta = []
+
+    for key, block in data['blocks'].items():
+        block_keys.append(_int(key))
+
+        index = {}
+        extra = {}
+
+        for vkey, attr in block['vertex'].items():
+            index[vkey] = len(index)
+            vkeys.append(_int(vkey))
+            xyz.extend([attr['x'], attr['y'], attr['z']])
+            attr = {name: value for name, value in attr.items() if name not in ('x', 'y', 'z')}
+            if attr:
+                extra[vkey] = attr
+
+        for fkey, vertices in block['face'].items():
+            fkeys.append(_int(fkey))
+            face_vertices.extend([index[vkey] for vkey in vertices])
+            face_offsets.append(len(face_vertices))
+
+        block_vertices.append(len(vkeys))
+        block_faces.append(len(fkeys))
+
+        other = {name: value for name, value in block.items() if name not in ('vertex', 'face', 'facedata')}
+        facedata = block.get('facedata') or {}
+        if any(facedata.values()):
+            other['facedata'] = facedata
+        if extra:
+            other['vertex'] = extra
+        block_meta.append(other)
+
+    nb = len(block_keys)
+
+    arrays.append(('block_keys', block_keys, (nb, )))
+    arrays.append(('block_vertex_offsets', block_vertices, (nb + 1, )))
+    arrays.append(('block_face_offsets', block_faces, (nb + 1, )))
+    arrays.append(('block_vertex_keys', vkeys, (len(vkeys), )))
+    arrays.append(('block_vertex_xyz', xyz, (len(vkeys), 3)))
+    arrays.append(('block_face_keys', fkeys, (len(fkeys), )))
+    arrays.append(('face_offsets', face_offsets, (len(fkeys) + 1, )))
+    arrays.append(('face_vertices', face_vertices, (len(face_vertices), )))
+
+    meta['blocks'] = block_meta
+
+    # ==========================================================================
+    # header
+    # ==========================================================================
+
+    # the offsets of the arrays are relative to the start of the data
+    # which is the end of the header, padded to the alignment of the arrays
+
+    layout = {}
+    offset = 0
+
+    for name, values, shape in arrays:
+        layout[name] = {'dtype': TYPECODES[values.typecode], 'shape': list(shape), 'offset': offset}
+        offset += _padded(len(values) * values.itemsize)
+
+    header = {'version': 1, 'arrays': layout, 'meta': meta}
+    header = json.dumps(header, separators=(',', ':')).encode('utf-8')
+
+    start = _padded(len(MAGIC) + 4 + len(header))
+
+    # ==========================================================================
+    # write
+    # ==========================================================================
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        f.write(b'\x00' * (start - len(MAGIC) - 4 - len(header)))
+
+        for name, values, shape in arrays:
+            if sys.byteorder == 'big':
+                values = array(values.typecode, values)
+                values.byteswap()
+            raw = values.tobytes() if hasattr(values, 'tobytes') else values.tostring()
+            f.write(raw)
+            f.write(b'\x00' * (_padded(len(raw)) - len(raw)))
+
+
+def read_binary(path, mmap=True):
+    """Open a binary assembly file.
+
+    Parameters
+    ----------
+    path : str
+        The path of the file.
+    mmap : bool, optional
+        Map the arrays into memory instead of reading them.
+        Default is ``True``.
+
+    Returns
+    -------
+    dict
+        The ``'meta'`` data of the header and the ``'arrays'``.
+        With ``mmap=True`` the arrays are read-only :class:`numpy.memmap` objects,
+        and the data is only read from disk when it is accessed.
+
+    """
+    header, start = _read_header(path)
+
+    arrays = {}
+
+    for name, spec in header['arrays'].items():
+        arrays[name] = _load(path, start, spec, mmap)
+
+    return {'meta': header['meta'], 'arrays': arrays}
+
+
+def read_binary_forces(path, mode='r'):
+    """Map the interface forces of a binary assembly file into memory.
+
+    Parameters
+    ----------
+    path : str
+        The path of the file.
+    mode : {'r', 'r+'}, optional
+        The access mode of the memory map.
+        Default is ``'r'``.
+
+    Returns
+    -------
+    numpy.memmap
+        The forces as an array of *n* rows ``[c_np, c_nn, c_u, c_v]``,
+        one per interface point, in the order of the interfaces in the file.
+        The forces of interfaces that were not analysed are ``nan``.
+
+    """
+    header, start = _read_header(path)
+    return _load(path, start, header['arrays']['interface_forces'], True, mode)
+
+
+def write_binary_forces(path, x):
+    """Write a solution vector to the interface forces of a binary assembly file, in place.
+
+    Parameters
+    ----------
+    path : str
+        The path of the file.
+    x : list
+        The *4n* vector of contact force components,
+        ordered per interface point as ``[c_np, c_nn, c_u, c_v]``,
+        as in :func:`compas_rbe.equilibrium.set_interface_forces`.
+
+    """
+    forces = read_binary_forces(path, mode='r+')
+    forces[:] = numpy.asarray(x, dtype=float).reshape(forces.shape)
+    if isinstance(forces, numpy.memmap):
+        forces.flush()
+
+
+def read_binary_array(path, name):
+    """Read one of the arrays of a binary assembly file, without numpy.
+
+    Parameters
+    ----------
+    path : str
+        The path of the file.
+    name : str
+        The name of the array, for example ``'interface_forces'`` or ``'edges'``.
+
+    Returns
+    -------
+    tuple
+        The values of the array as a flat list, and its shape.
+
+    Notes
+    -----
+    This function only uses the standard library, and can be used in Rhino.
+
+    """
+    header, start = _read_header(path)
+    spec = header['arrays'][name]
+
+    typecode = {dtype: typecode for typecode, dtype in TYPECODES.items()}[spec['dtype']]
+
+    count = 1
+    for size in spec['shape']:
+        count *= size
+
+    values = array(typecode)
+
+    with open(path, 'rb') as f:
+        f.seek(start + spec['offset'])
+        raw = f.read(count * values.itemsize)
+
+    if hasattr(values, 'frombytes'):
+        values.frombytes(raw)
+    else:
+        values.fromstring(raw)
+
+    if sys.byteorder == 'big':
+        values.byteswap()
+
+    return values.tolist(), spec['shape']
+
+
+def read_binary_blocks(path):
+    """Map the geometry of the blocks of a binary assembly file into array-backed blocks.
+
+    Parameters
+    ----------
+    path : str
+        The path of the file.
+
+    Returns
+    -------
+    dict
+        A :class:`ArrayBlock` per block key,
+        of which the vertex coordinates are views of the memory-mapped coordinates in the file.
+
+    """
+    from compas_rbe.files.streaming import ArrayBlock
+
+    result = read_binary(path)
+    meta = result['meta']
+    arrays = result['arrays']
+
+    keys = arrays['block_keys'].tolist()
+    vertex_offsets = arrays['block_vertex_offsets'].tolist()
+    face_offsets = arrays['block_face_offsets'].tolist()
+    offsets = arrays['face_offsets'].tolist()
+    vertices = arrays['face_vertices'].tolist()
+    xyz = arrays['block_vertex_xyz']
+    vkeys = arrays['block_vertex_keys']
+
+    blocks = {}
+
+    for index, key in enumerate(keys):
+        va, vb = vertex_offsets[index], vertex_offsets[index + 1]
+        fa, fb = face_offsets[index], face_offsets[index + 1]
+        faces = [vertices[offsets[i]:offsets[i + 1]] for i in range(fa, fb)]
+        attributes = meta['blocks'][index].get('attributes')
+        blocks[key] = ArrayBlock(xyz[va:vb], faces, vkeys[va:vb].tolist(), attributes)
+
+    return blocks
+
+
+def binary_to_data(path, blocks=True):
+    """Convert a binary assembly file to the data of the assembly and its blocks.
+
+    Parameters
+    ----------
+    path : str
+        The path of the file.
+    blocks : bool, optional
+        Include the data of the blocks.
+        Default is ``True``.
+
+    Returns
+    -------
+    dict
+        The data of the ``'assembly'`` and of its ``'blocks'``,
+        in the format of the JSON files of the models.
+        Without the blocks, ``'blocks'`` is ``None``.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        data = binary_to_data('vault.rbe')
+
+        assembly = Assembly.from_data(data['assembly'])
+        assembly.blocks = {int(key): Block.from_data(data['blocks'][key]) for key in data['blocks']}
+
+    """
+    result = read_binary(path, mmap=False)
+    meta = result['meta']
+    arrays = result['arrays']
+
+    # ==========================================================================
+    # assembly
+    # ==========================================================================
+
+    assembly = dict(meta['assembly'])
+
+    vertex = {}
+    edge = {}
+    halfedge = {}
+
+    keys = [str(key) for key in arrays['vertex_keys'].tolist()]
+    xyz = arrays['vertex_xyz'].tolist()
+    support = arrays['vertex_support'].tolist()
+
+    for key, (x, y, z), is_support in zip(keys, xyz, support):
+        attr = {'x': x, 'y': y, 'z': z, 'is_support': bool(is_support)}
+        attr.update(meta['vertex'].get(key, {}))
+        vertex[key] = attr
+        edge[key] = {}
+        halfedge[key] = {}
+
+    offsets = arrays['interface_offsets'].tolist()
+    points = arrays['interface_points'].tolist()
+    forces = arrays['interface_forces'].tolist()
+    uvw = arrays['interface_uvw'].tolist()
+    origin = arrays['interface_origin'].tolist()
+
+    for index, (u, v) in enumerate(arrays['edges'].tolist()):
+        u, v = str(u), str(v)
+
+        attr = dict(meta['edge'][index])
+        a, b = offsets[index], offsets[index + 1]
+
+        attr['interface_points'] = points[a:b] or None
+        attr['interface_uvw'] = None if _isnan(uvw[index][0][0]) else uvw[index]
+        attr['interface_origin'] = None if _isnan(origin[index][0]) else origin[index]
+
+        if b > a and not _isnan(forces[a][0]):
+            attr['interface_forces'] = [dict(zip(FORCES, f)) for f in forces[a:b]]
+        else:
+            attr['interface_forces'] = None
+
+        edge[u][v] = attr
+        halfedge[u][v] = repr(None)
+        halfedge[v][u] = repr(None)
+
+    assembly['vertex'] = vertex
+    assembly['edge'] = edge
+    assembly['halfedge'] = halfedge
+
+    if not blocks:
+        return {'assembly': assembly, 'blocks': None}
+
+    # ==========================================================================
+    # blocks
+    # ==========================================================================
+
+    blocks = {}
+
+    vkeys = [str(key) for key in arrays['block_vertex_keys'].tolist()]
+    fkeys = [str(key) for key in arrays['block_face_keys'].tolist()]
+    xyz = arrays['block_vertex_xyz'].tolist()
+    vertex_offsets = arrays['block_vertex_offsets'].tolist()
+    face_offsets = arrays['block_face_offsets'].tolist()
+    offsets = arrays['face_offsets'].tolist()
+    vertices = arrays['face_vertices'].tolist()
+
+    for index, key in enumerate(arrays['block_keys'].tolist()):
+        block = dict(meta['blocks'][index])
+        extra = block.pop('vertex', {})
+
+        va, vb = vertex_offsets[index], vertex_offsets[index + 1]
+        fa, fb = face_offsets[index], face_offsets[index + 1]
+
+        block['vertex'] = {}
+        for vkey, (x, y, z) in zip(vkeys[va:vb], xyz[va:vb]):
+            attr = {'x': x, 'y': y, 'z': z}
+            attr.update(extra.get(vkey, {}))
+            block['vertex'][vkey] = attr
+
+        block['face'] = {}
+        for i in range(fa, fb):
+            block['face'][fkeys[i]] = [vkeys[va + j] for j in vertices[offsets[i]:offsets[i + 1]]]
+
+        if 'facedata' not in block:
+            block['facedata'] = {fkey: {} for fkey in fkeys[fa:fb]}
+
+        blocks[str(key)] = block
+
+    return {'assembly': assembly, 'blocks': blocks}
+
+
+# ==============================================================================
+# Helpers
+# ==============================================================================
+
+
+def _int(key):
+    try:
+        return int(key)
+    except ValueError:
+        raise ValueError('The binary format only supports integer keys: {}'.format(key))
+
+
+def _isnan(value):
+    return value != value
+
+
+def _padded(size):
+    return size + (-size) % ALIGN
+
+
+def _read_header(path):
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('Not a binary assembly file: {}'.format(path))
+        size = struct.unpack('<I', f.read(4))[0]
+        header = json.loads(f.read(size).decode('utf-8'))
+    return header, _padded(len(MAGIC) + 4 + size)
+
+
+def _load(path, start, spec, mmap=True, mode='r'):
+    shape = tuple(spec['shape'])
+    dtype = numpy.dtype(spec['dtype'])
+
+    if not numpy.prod(shape):
+        return numpy.zeros(shape, dtype=dtype)
+
+    if mmap:
+        return numpy.memmap(path, dtype=dtype, mode=mode, offset=start + spec['offset'], shape=shape)
+
+    with open(path, 'rb') as f:
+        f.seek(start + spec['offset'])
+        return numpy.fromfile(f, dtype=dtype, count=int(numpy.prod(shape))).reshape(shape)
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+    pass
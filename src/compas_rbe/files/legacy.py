@@ -0,0 +1,380 @@
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+import os
+import json
+import glob
+import hashlib
+
+from multiprocessing import Pool
+
+import compas
+
+try:
+    from numpy import array
+    from numpy import full
+    from numpy import searchsorted
+    from numpy import argsort
+except ImportError:
+    compas.raise_if_not_ironpython()
+
+from compas_rbe.cache import _replace
+
+__all__ = [
+    'face_cycles',
+    'convert_legacy_data',
+    'convert_legacy_file',
+    'convert_legacy_directory',
+]
+
+
+def face_cycles(faces):
+    """Reconstruct the vertex cycles of faces stored as linked lists.
+
+    Parameters
+    ----------
+    faces : dict
+        Per face key, a dict mapping every vertex key of the face to the next vertex key.
+
+    Returns
+    -------
+    dict
+        Per face key, the list of vertex keys of the face,
+        starting from the first vertex of the linked list.
+
+    Raises
+    ------
+    ValueError
+        If a face is empty, or if its links don't form a single closed cycle.
+
+    Notes
+    -----
+    The cycles of all faces are traversed together:
+    the links are converted to an array of successors of the half-edges,
+    and all faces advance by one vertex per step.
+    The number of steps is the number of vertices of the largest face.
+
+    Examples
+    --------
+    >>> face_cycles({'0': {'a': 'b', 'b': 'c', 'c': 'a'}})
+    {'0': ['a', 'b', 'c']}
+
+    """
+    fkeys = list(faces)
+
+    if not fkeys:
+        return {}
+
+    vkeys = {}
+    face = []
+    head = []
+    tail = []
+    start = []
+
+    for index, fkey in enumerate(fkeys):
+        cycle = faces[fkey]
+        if not cycle:
+            raise ValueError('The face {} has no vertices.'.format(fkey))
+        first = True
+        for u, v in cycle.items():
+            if first:
+                start.append(len(face))
+                first = False
+            face.append(index)
+            head.append(vkeys.setdefault(u, len(vkeys)))
+            tail.append(vkeys.setdefault(v, len(vkeys)))
+
+    face = array(face)
+    head = array(head)
+    tail = array(tail)
+    start = array(start)
+
+    # the successor of half-edge (f, u, v) is the half-edge (f, v, w)
+    # half-edges are identified by the combination of their face and head vertex
+
+    n = len(vkeys)
+    ids = face * n + head
+    order = argsort(ids)
+    position = searchsorted(ids[order], face * n + tail).clip(0, len(ids) - 1)
+    successor = order[position]
+
+    if (ids[successor] != face * n + tail).any():
+        raise ValueError('The faces are not closed cycles.')
+
+    count = array([len(faces[fkey]) for fkey in fkeys])
+
+    # all faces advance one vertex at a time
+    # a face that returns to its first vertex early, or not at all,
+    # consists of several cycles, or is not a cycle
+
+    cycles = full((len(fkeys), count.max()), -1)
+    current = start.copy()
+
+    for step in range(count.max()):
+        active = step < count
+        if step and (current[active] == start[active]).any():
+            raise ValueError('The faces are not single cycles.')
+        cycles[active, step] = head[current[active]]
+        current = successor[current]
+        done = step + 1 == count
+        if (current[done] != start[done]).any():
+            raise ValueError('The faces are not single cycles.')
+
+    names = [None] * n
+    for key, index in vkeys.items():
+        names[index] = key
+
+    result = {}
+    for index, fkey in enumerate(fkeys):
+        result[fkey] = [names[i] for i in cycles[index, :count[index]]]
+
+    return result
+
+
+def convert_legacy_data(data, support='Block_0'):
+    """Convert the data of an assembly in the legacy format to the current format.
+
+    Parameters
+    ----------
+    data : list
+        The data of the blocks of the assembly,
+        with the faces of the blocks stored as linked lists of vertices.
+    support : str, optional
+        The name of the block(s) that are supports.
+        Default is ``'Block_0'``.
+
+    Returns
+    -------
+    dict
+        The data of the ``'assembly'`` and of its ``'blocks'``,
+        in the format of the JSON files of the models.
+
+    Notes
+    -----
+    The blocks are numbered in the order of the legacy data,
+    and the vertices of the assembly are placed at the centroids of the vertices of the blocks,
+    as in :meth:`compas_assembly.datastructures.Assembly.add_block`.
+    The interfaces are not part of the legacy format.
+
+    """
+    vertex = {}
+    edge = {}
+    blocks = {}
+
+    for index, item in enumerate(data):
+        key = str(index)
+
+        block = dict(item)
+        block['face'] = face_cycles(item['face'])
+        blocks[key] = block
+
+        xyz = array([[attr['x'], attr['y'], attr['z']] for attr in item['vertex'].values()])
+        x, y, z = xyz.mean(axis=0).tolist()
+
+        name = (item.get('attributes') or {}).get('name')
+
+        vertex[key] = {'x': x, 'y': y, 'z': z, 'is_support': name == support}
+        edge[key] = {}
+
+    assembly = {
+        'attributes': {'name': 'Assembly'},
+        'dva': {'x': 0.0, 'y': 0.0, 'z': 0.0, 'is_support': False},
+        'dea': {
+            'interface_points': None,
+            'interface_type': None,
+            'interface_size': None,
+            'interface_uvw': None,
+            'interface_origin': None,
+            'interface_forces': None,
+        },
+        'vertex': vertex,
+        'edge': edge,
+        'halfedge': {key: {} for key in vertex},
+        'max_int_key': len(vertex) - 1,
+    }
+
+    return {'assembly': assembly, 'blocks': blocks}
+
+
+def convert_legacy_file(source, destination, binary=False):
+    """Convert a file in the legacy format.
+
+    Parameters
+    ----------
+    source : str
+        The path of the legacy file.
+    destination : str
+        The path of the converted file.
+    binary : bool, optional
+        Write the compact binary format of :func:`write_binary` instead of JSON.
+        Default is ``False``.
+
+    Returns
+    -------
+    dict
+        The ``'source'`` and ``'destination'`` paths,
+        and the SHA-256 checksums of both files.
+
+    """
+    from compas_rbe.files.binary import write_binary
+
+    with open(source, 'r') as f:
+        data = convert_legacy_data(json.load(f))
+
+    directory = os.path.dirname(os.path.abspath(destination))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    tmp = destination + '.tmp'
+
+    if binary:
+        write_binary(tmp, data)
+    else:
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+
+    _replace(tmp, destination)
+
+    return {
+        'source': source,
+        'destination': destination,
+        'source_sha256': _sha256(source),
+        'destination_sha256': _sha256(destination),
+    }
+
+
+def convert_legacy_directory(source, destination, pattern='**/*.json', binary=False, processes=None, verbose=True):
+    """Convert all legacy files in a directory, in a pool of processes.
+
+    Parameters
+    ----------
+    source : str
+        The directory of the legacy files.
+    destination : str
+        The directory of the converted files.
+        The structure of the subdirectories of the source directory is preserved.
+    pattern : str, optional
+        The glob pattern of the legacy files, relative to the source directory.
+        Default is ``'**/*.json'``.
+    binary : bool, optional
+        Write the compact binary format instead of JSON.
+        Default is ``False``.
+    processes : int, optional
+        The number of worker processes.
+        Default is the number of CPUs.
+    verbose : bool, optional
+        Print progress information.
+        Default is ``True``.
+
+    Returns
+    -------
+    dict
+        The manifest, with per converted file (relative to the destination directory)
+        the relative path of the source file and the checksums of both files.
+        The manifest is written to ``manifest.json`` in the destination directory.
+
+    Notes
+    -----
+    Files are only converted if their converted file (in the requested format)
+    is not in the manifest or doesn't exist,
+    or if the checksum of the source file changed.
+    Files that can't be converted are reported and skipped.
+
+    """
+    manifest_path = os.path.join(destination, 'manifest.json')
+
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+
+    ext = '.rbe' if binary else '.json'
+
+    tasks = []
+
+    for path in sorted(_glob(source, pattern)):
+        relative = os.path.relpath(path, source)
+        target = os.path.join(destination, os.path.splitext(relative)[0] + ext)
+        entry = manifest.get(os.path.relpath(target, destination))
+        if entry and entry['source_sha256'] == _sha256(path) and os.path.exists(target):
+            continue
+        tasks.append((path, target, binary))
+
+    if verbose:
+        print('{} files to convert'.format(len(tasks)))
+
+    if not os.path.isdir(destination):
+        os.makedirs(destination)
+
+    if tasks:
+        pool = Pool(processes)
+        try:
+            for i, entry in enumerate(pool.imap_unordered(_convert, tasks, chunksize=8)):
+                if 'error' in entry:
+                    if verbose:
+                        print('failed: {source} ({error})'.format(**entry))
+                    continue
+
+                entry['source'] = os.path.relpath(entry['source'], source)
+                key = os.path.relpath(entry['destination'], destination)
+                del entry['destination']
+                manifest[key] = entry
+
+                if verbose and (i + 1) % 100 == 0:
+                    print('{} / {}'.format(i + 1, len(tasks)))
+
+            pool.close()
+        except KeyboardInterrupt:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+            _write_manifest(manifest_path, manifest)
+
+    return manifest
+
+
+# ==============================================================================
+# Helpers
+# ==============================================================================
+
+
+def _convert(task):
+    source, destination, binary = task
+    try:
+        return convert_legacy_file(source, destination, binary)
+    except Exception as e:
+        return {'source': source, 'error': '{}: {}'.format(type(e).__name__, e)}
+
+
+def _glob(directory, pattern):
+    path = os.path.join(directory, pattern)
+    try:
+        return glob.glob(path, recursive=True)
+    except TypeError:
+        # Python 2 doesn't support recursive patterns
+        return glob.glob(path.replace('**' + os.sep, ''))
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(2 ** 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_manifest(path, manifest):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=4, sort_keys=True)
+    _replace(tmp, path)
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+    pass
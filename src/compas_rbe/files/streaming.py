@@ -0,0 +1,402 @@
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+import re
+import json
+
+import compas
+
+try:
+    from numpy import array
+    from numpy import cross
+    from numpy import einsum
+    from numpy import zeros
+except ImportError:
+    compas.raise_if_not_ironpython()
+
+
+__all__ = [
+    'ArrayBlock',
+    'iter_json_members',
+    'load_assembly_streaming',
+]
+
+
+WHITESPACE = ' \t\n\r'
+
+# the characters that change the nesting of a JSON value, outside and inside strings
+
+STRUCTURE = re.compile(r'["\[\]{}]')
+ESCAPE = re.compile(r'["\\]')
+
+
+class ArrayBlock(object):
+    """A light-weight, array-backed representation of the geometry of a block.
+
+    Parameters
+    ----------
+    xyz : array
+        The coordinates of the vertices, as an array of shape *(n, 3)*.
+    faces : list
+        The faces of the block, as lists of vertex indices.
+    vertices : list, optional
+        The keys of the vertices.
+        Default is the indices of the vertices.
+    attributes : dict, optional
+        The attributes of the block.
+
+    Attributes
+    ----------
+    centroid : array
+        The center of mass of the block.
+
+    Notes
+    -----
+    The mass properties are computed from the (outward oriented) faces of the block
+    with the divergence theorem.
+    An ``ArrayBlock`` provides the methods :meth:`center` and :meth:`volume`
+    used by the equilibrium solvers,
+    and can therefore be used instead of a :class:`compas_assembly.datastructures.Block`.
+
+    """
+
+    def __init__(self, xyz, faces, vertices=None, attributes=None):
+        self.xyz = xyz
+        self.faces = faces
+        self.vertices = vertices if vertices is not None else list(range(len(xyz)))
+        self.attributes = attributes or {}
+        self._volume, self.centroid = _mass_properties(xyz, faces)
+
+    def center(self):
+        """The center of mass of the block."""
+        return self.centroid.tolist()
+
+    def volume(self):
+        """The volume of the block."""
+        return self._volume
+
+    def to_data(self):
+        """Convert the block to the data format of a mesh."""
+        keys = [str(key) for key in self.vertices]
+        return {
+            'attributes': self.attributes,
+            'dva': {'x': 0.0, 'y': 0.0, 'z': 0.0},
+            'dea': {},
+            'dfa': {},
+            'vertex': {key: {'x': x, 'y': y, 'z': z} for key, (x, y, z) in zip(keys, self.xyz.tolist())},
+            'face': {str(fkey): [keys[index] for index in face] for fkey, face in enumerate(self.faces)},
+            'facedata': {str(fkey): {} for fkey in range(len(self.faces))},
+            'edgedata': {},
+            'max_int_key': len(keys) - 1,
+            'max_int_fkey': len(self.faces) - 1,
+        }
+
+    @classmethod
+    def from_data(cls, data):
+        """Construct a block from the data of a mesh."""
+        index = {}
+        xyz = zeros((len(data['vertex']), 3))
+        for i, (key, attr) in enumerate(data['vertex'].items()):
+            index[key] = i
+            xyz[i] = attr['x'], attr['y'], attr['z']
+        faces = [[index[key] for key in face] for face in data['face'].values()]
+        vertices = [int(key) if key.isdigit() else key for key in index]
+        return cls(xyz, faces, vertices, data.get('attributes'))
+
+
+def iter_json_members(path, stream=('blocks', ), chunksize=2 ** 20):
+    """Iterate over the members of a JSON object in a file, without loading the entire file.
+
+    Parameters
+    ----------
+    path : str
+        The path of the file.
+    stream : tuple, optional
+        The names of the (object) members of the top-level object of which the members should be
+        parsed one at a time.
+        Default is ``('blocks', )``.
+    chunksize : int, optional
+        The number of characters read from the file at a time.
+        Default is ``2 ** 20``.
+
+    Yields
+    ------
+    tuple
+        The name of the parent member (or ``None`` for members of the top-level object),
+        the name of the member, and its (parsed) value.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        for parent, key, value in iter_json_members(compas_rbe.get('complex/matthias_vault_blocks.json')):
+            if parent == 'blocks':
+                print(key, len(value['vertex']))
+
+    """
+    with open(path, 'r') as f:
+        reader = _Reader(f, chunksize)
+
+        reader.expect('{')
+
+        for name in reader.members():
+            if name in stream:
+                reader.expect('{')
+                for key in reader.members():
+                    yield name, key, reader.value()
+            else:
+                yield None, name, reader.value()
+
+
+def load_assembly_streaming(path, density=1.0, callback=None, chunksize=2 ** 20):
+    """Load the assembly and the array-backed geometry of its blocks from a JSON file.
+
+    Parameters
+    ----------
+    path : str
+        The path of a JSON file with the ``'assembly'`` and its ``'blocks'``.
+    density : float, optional
+        The density of the block material, for the mass of the blocks.
+        Default is ``1.0``.
+    callback : callable, optional
+        A function that is called with the key and the :class:`ArrayBlock` of every block,
+        as soon as the block is parsed.
+    chunksize : int, optional
+        The number of characters read from the file at a time.
+        Default is ``2 ** 20``.
+
+    Returns
+    -------
+    dict
+        The data of the ``'assembly'``,
+        the ``'blocks'`` as :class:`ArrayBlock` objects,
+        and the ``'mass'`` of every block.
+
+    Notes
+    -----
+    The blocks are parsed one at a time,
+    and the nested dicts of a block are discarded as soon as its arrays are filled.
+    The peak memory is therefore dominated by the arrays and the data of the assembly.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        result = load_assembly_streaming(compas_rbe.get('complex/matthias_vault_blocks.json'))
+
+        assembly = Assembly.from_data(result['assembly'])
+        assembly.blocks = result['blocks']
+
+        compute_interface_forces_cvx(assembly)
+
+    """
+    result = {'assembly': None, 'blocks': {}, 'mass': {}}
+
+    for parent, key, value in iter_json_members(path, chunksize=chunksize):
+        if parent == 'blocks':
+            block = ArrayBlock.from_data(value)
+            key = int(key) if key.isdigit() else key
+            result['blocks'][key] = block
+            result['mass'][key] = density * block.volume()
+            if callback:
+                callback(key, block)
+        elif key == 'assembly':
+            result['assembly'] = value
+
+    return result
+
+
+# ==============================================================================
+# Helpers
+# ==============================================================================
+
+
+class _Reader(object):
+    """Incremental reader of JSON values from a file, based on :meth:`json.JSONDecoder.raw_decode`.
+
+    Objects, arrays and strings are only decoded when they are complete.
+    Their end is found by scanning the chunks for the characters that change the nesting,
+    such that every character is scanned and decoded only once,
+    however many chunks a value spans.
+    """
+
+    def __init__(self, f, chunksize):
+        self.f = f
+        self.chunksize = chunksize
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def chunk(self):
+        if self.eof:
+            return ''
+        chunk = self.f.read(self.chunksize)
+        if not chunk:
+            self.eof = True
+        return chunk
+
+    def read(self):
+        chunk = self.chunk()
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def skip(self):
+        """Skip whitespace, and return the next character."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read():
+                raise ValueError('Unexpected end of file.')
+
+    def expect(self, char):
+        if self.skip() != char:
+            raise ValueError('Expected {!r} at {}.'.format(char, self.pos))
+        self.pos += 1
+
+    def value(self):
+        if self.skip() not in '{["':
+            return self.scalar()
+
+        scanner = _Scanner()
+        parts = []
+        text, start = self.buffer, self.pos
+        end = scanner.scan(text, start)
+
+        while end is None:
+            parts.append(text[start:])
+            text, start = self.chunk(), 0
+            if not text:
+                raise ValueError('Unexpected end of file.')
+            end = scanner.scan(text, start)
+
+        parts.append(text[start:end])
+
+        self.buffer = text
+        self.pos = end
+
+        value, _ = self.decoder.raw_decode(''.join(parts))
+        return value
+
+    def scalar(self):
+        # numbers, booleans and null are short,
+        # and are parsed again after a read
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if self.read():
+                    continue
+                raise
+            # a number at the end of the buffer may be incomplete
+            if end == len(self.buffer) and self.read():
+                continue
+            self.pos = end
+            return value
+
+    def members(self):
+        """Iterate over the names of the members of an object.
+        The value of every member has to be consumed before the next name is requested."""
+        if self.skip() == '}':
+            self.pos += 1
+            return
+        while True:
+            name = self.value()
+            self.expect(':')
+            yield name
+            char = self.skip()
+            self.pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError('Expected \',\' or \'}}\' at {}.'.format(self.pos - 1))
+
+
+class _Scanner(object):
+    """Find the end of a JSON object, array or string, in one or more consecutive chunks of text."""
+
+    def __init__(self):
+        self.depth = 0
+        self.string = False
+        self.escape = False
+
+    def scan(self, text, i):
+        """Scan a chunk from index ``i``, and return the index after the end of the value,
+        or ``None`` if the value continues in the next chunk."""
+        n = len(text)
+        while True:
+            if self.escape:
+                if i >= n:
+                    return None
+                i += 1
+                self.escape = False
+            if self.string:
+                match = ESCAPE.search(text, i)
+                if not match:
+                    return None
+                i = match.end()
+                if match.group() == '\\':
+                    self.escape = True
+                    continue
+                self.string = False
+                if not self.depth:
+                    return i
+            else:
+                match = STRUCTURE.search(text, i)
+                if not match:
+                    return None
+                i = match.end()
+                char = match.group()
+                if char == '"':
+                    self.string = True
+                elif char in '[{':
+                    self.depth += 1
+                else:
+                    self.depth -= 1
+                    if not self.depth:
+                        return i
+
+
+def _mass_properties(xyz, faces):
+    """Compute the volume and the centroid of a closed polyhedron with outward oriented faces."""
+    triangles = []
+    for face in faces:
+        for i in range(1, len(face) - 1):
+            triangles.append((face[0], face[i], face[i + 1]))
+
+    if not triangles:
+        return 0.0, xyz.mean(axis=0) if len(xyz) else zeros(3)
+
+    triangles = array(triangles)
+
+    # signed volumes of the tetrahedra formed by the triangles and a reference point
+    # the first vertex is used as reference point to reduce round-off
+
+    o = xyz[0]
+    a = xyz[triangles[:, 0]] - o
+    b = xyz[triangles[:, 1]] - o
+    c = xyz[triangles[:, 2]] - o
+
+    volumes = einsum('ij,ij->i', a, cross(b, c)) / 6.0
+    volume = volumes.sum()
+
+    if abs(volume) < 1e-16:
+        return 0.0, xyz.mean(axis=0)
+
+    centroid = o + (volumes[:, None] * (a + b + c)).sum(axis=0) / (4.0 * volume)
+
+    return float(abs(volume)), centroid
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+    pass
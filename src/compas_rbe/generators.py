@@ -0,0 +1,474 @@
+"""
+********************************************************************************
+compas_rbe.generators
+********************************************************************************
+
+.. currentmodule:: compas_rbe.generators
+
+Parametric assemblies of arbitrary size, for scaling studies.
+
+All blocks are hexahedra, and the interfaces are computed from the parameters of the generators,
+such that large assemblies can be generated without an interface detection.
+
+.. code-block:: python
+
+    assembly = generate_assembly('dome', 10000)
+
+    compute_interface_forces_cvx(assembly, solver='ECOS')
+
+
+Functions
+=========
+
+.. autosummary::
+    :toctree: generated/
+    :nosignatures:
+
+    generate_assembly
+    wall_assembly
+    barrel_vault_assembly
+    dome_assembly
+    pile_assembly
+
+"""
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+from math import cos
+from math import sin
+from math import pi
+from math import sqrt
+
+
+__all__ = [
+    'generate_assembly',
+    'wall_assembly',
+    'barrel_vault_assembly',
+    'dome_assembly',
+    'pile_assembly',
+]
+
+
+KINDS = ['wall', 'barrel', 'dome', 'pile']
+
+# the faces of a hexahedron with the corners
+# 0 = (0, 0, 0), 1 = (1, 0, 0), 2 = (1, 1, 0), 3 = (0, 1, 0)
+# 4 = (0, 0, 1), 5 = (1, 0, 1), 6 = (1, 1, 1), 7 = (0, 1, 1)
+
+HEXAHEDRON = [
+    [0, 3, 2, 1],
+    [4, 5, 6, 7],
+    [0, 1, 5, 4],
+    [1, 2, 6, 5],
+    [2, 3, 7, 6],
+    [3, 0, 4, 7],
+]
+
+
+def generate_assembly(kind, n):
+    """Generate an assembly of (approximately) a given number of blocks.
+
+    Parameters
+    ----------
+    kind : {'wall', 'barrel', 'dome', 'pile'}
+        The type of assembly.
+    n : int
+        The number of blocks.
+
+    Returns
+    -------
+    compas_assembly.datastructures.Assembly
+        The assembly, with supports and interfaces.
+
+    Notes
+    -----
+    The parameters of the generators are rounded to integers,
+    such that the number of blocks is only approximately ``n``.
+
+    """
+    n = max(int(n), 4)
+
+    if kind == 'wall':
+        courses = max(2, int(round(sqrt(n / 4.0))))
+        return wall_assembly(max(2, int(round(n / courses))), courses)
+
+    if kind == 'barrel':
+        voussoirs = max(5, int(round(sqrt(n))))
+        return barrel_vault_assembly(voussoirs, max(1, int(round(n / voussoirs))))
+
+    if kind == 'dome':
+        courses = max(2, int(round(sqrt(n / 4.0))))
+        return dome_assembly(courses, max(4, int(round(n / courses))))
+
+    if kind == 'pile':
+        return pile_assembly(max(1, int(round((3 * n) ** (1.0 / 3.0)))))
+
+    raise ValueError('Unknown kind of assembly: {}'.format(kind))
+
+
+def wall_assembly(blocks=10, courses=10, length=2.0, height=1.0, depth=1.0):
+    """Generate a wall in running bond on a support.
+
+    Parameters
+    ----------
+    blocks : int, optional
+        The number of blocks per course.
+        Every other course has an additional block,
+        because it starts and ends with a half block.
+        Default is ``10``.
+    courses : int, optional
+        The number of courses.
+        Default is ``10``.
+    length : float, optional
+        The length of the blocks.
+        Default is ``2.0``.
+    height : float, optional
+        The height of the blocks.
+        Default is ``1.0``.
+    depth : float, optional
+        The depth of the blocks and of the wall.
+        Default is ``1.0``.
+
+    Returns
+    -------
+    compas_assembly.datastructures.Assembly
+        The assembly.
+
+    """
+    builder = _Builder('wall')
+
+    total = blocks * length
+
+    support = builder.box([-length, -depth, -height], [total + length, 2 * depth, 0.0], is_support=True)
+    below = [(-length, total + length, support)]
+
+    for j in range(courses):
+        z0 = j * height
+        z1 = z0 + height
+
+        if j % 2:
+            xs = [0.0] + [(i + 0.5) * length for i in range(blocks)] + [total]
+        else:
+            xs = [i * length for i in range(blocks + 1)]
+
+        course = []
+        for x0, x1 in zip(xs[:-1], xs[1:]):
+            key = builder.box([x0, 0.0, z0], [x1, depth, z1])
+            course.append((x0, x1, key))
+
+        # head joints
+        for (x0, x1, u), (_, _, v) in zip(course[:-1], course[1:]):
+            builder.interface(u, v, [[x1, 0.0, z0], [x1, depth, z0], [x1, depth, z1], [x1, 0.0, z1]])
+
+        # bed joints
+        for a0, a1, u in below:
+            for b0, b1, v in course:
+                x0 = max(a0, b0)
+                x1 = min(a1, b1)
+                if x1 - x0 > 1e-9:
+                    builder.interface(u, v, [[x0, 0.0, z0], [x1, 0.0, z0], [x1, depth, z0], [x0, depth, z0]])
+
+        below = course
+
+    return builder.assembly
+
+
+def barrel_vault_assembly(voussoirs=11, rings=10, radius=5.0, thickness=0.75, width=1.0):
+    """Generate a semi-circular barrel vault.
+
+    Parameters
+    ----------
+    voussoirs : int, optional
+        The number of voussoirs per ring (per arch).
+        Default is ``11``.
+    rings : int, optional
+        The number of rings along the axis of the vault.
+        Default is ``10``.
+    radius : float, optional
+        The radius of the intrados.
+        Default is ``5.0``.
+    thickness : float, optional
+        The thickness of the vault.
+        Default is ``0.75``.
+    width : float, optional
+        The width of the rings.
+        Default is ``1.0``.
+
+    Returns
+    -------
+    compas_assembly.datastructures.Assembly
+        The assembly.
+        The springers (the first and last voussoir of every ring) are supports.
+
+    """
+    builder = _Builder('barrel_vault')
+
+    r = [radius, radius + thickness]
+
+    def point(a, y, k):
+        return [r[k] * cos(a), y, r[k] * sin(a)]
+
+    angles = [pi * (1.0 - i / voussoirs) for i in range(voussoirs + 1)]
+
+    keys = {}
+
+    for j in range(rings):
+        y = [j * width, (j + 1) * width]
+
+        for i in range(voussoirs):
+            a = angles[i:i + 2]
+            corners = [point(a[c[0]], y[c[1]], c[2]) for c in _CORNERS]
+            keys[i, j] = builder.hexahedron(corners, is_support=i in (0, voussoirs - 1))
+
+            if i:
+                builder.interface(keys[i - 1, j], keys[i, j], [point(a[0], y[0], 0), point(a[0], y[0], 1),
+                                                               point(a[0], y[1], 1), point(a[0], y[1], 0)])
+            if j:
+                builder.interface(keys[i, j - 1], keys[i, j], [point(a[0], y[0], 0), point(a[1], y[0], 0),
+                                                               point(a[1], y[0], 1), point(a[0], y[0], 1)])
+
+    return builder.assembly
+
+
+def dome_assembly(courses=8, blocks=24, radius=5.0, thickness=0.5, oculus=pi / 6):
+    """Generate a spherical dome with an oculus.
+
+    Parameters
+    ----------
+    courses : int, optional
+        The number of courses.
+        Default is ``8``.
+    blocks : int, optional
+        The number of blocks per course.
+        Default is ``24``.
+    radius : float, optional
+        The radius of the intrados.
+        Default is ``5.0``.
+    thickness : float, optional
+        The thickness of the dome.
+        Default is ``0.5``.
+    oculus : float, optional
+        The angle between the vertical and the edge of the oculus.
+        Default is ``pi / 6``.
+
+    Returns
+    -------
+    compas_assembly.datastructures.Assembly
+        The assembly.
+        The blocks of the first course are supports.
+
+    Notes
+    -----
+    The joints are in planes through the center of the sphere,
+    and therefore the interfaces are planar.
+
+    """
+    builder = _Builder('dome')
+
+    r = [radius, radius + thickness]
+
+    def point(t, p, k):
+        return [r[k] * cos(p) * cos(t), r[k] * cos(p) * sin(t), r[k] * sin(p)]
+
+    phis = [(0.5 * pi - oculus) * i / courses for i in range(courses + 1)]
+    thetas = [2 * pi * i / blocks for i in range(blocks + 1)]
+
+    keys = {}
+
+    for j in range(courses):
+        p = phis[j:j + 2]
+
+        for i in range(blocks):
+            t = thetas[i:i + 2]
+            corners = [point(t[c[0]], p[c[1]], c[2]) for c in _CORNERS]
+            keys[i, j] = builder.hexahedron(corners, is_support=j == 0)
+
+            if i:
+                builder.interface(keys[i - 1, j], keys[i, j], [point(t[0], p[0], 0), point(t[0], p[0], 1),
+                                                               point(t[0], p[1], 1), point(t[0], p[1], 0)])
+            if j:
+                builder.interface(keys[i, j - 1], keys[i, j], [point(t[0], p[0], 0), point(t[1], p[0], 0),
+                                                               point(t[1], p[0], 1), point(t[0], p[0], 1)])
+
+        # close the course
+        t = thetas[0]
+        builder.interface(keys[blocks - 1, j], keys[0, j], [point(t, p[0], 0), point(t, p[0], 1),
+                                                            point(t, p[1], 1), point(t, p[1], 0)])
+
+    return builder.assembly
+
+
+def pile_assembly(layers=10, size=1.0, height=0.5):
+    """Generate a square pyramid of blocks on a support.
+
+    Parameters
+    ----------
+    layers : int, optional
+        The number of layers.
+        The bottom layer has ``layers x layers`` blocks,
+        and every layer has one block less in both directions than the layer below.
+        Default is ``10``.
+    size : float, optional
+        The size of the (square) blocks in plan.
+        Default is ``1.0``.
+    height : float, optional
+        The height of the blocks.
+        Default is ``0.5``.
+
+    Returns
+    -------
+    compas_assembly.datastructures.Assembly
+        The assembly.
+        Every block rests on four blocks of the layer below.
+
+    """
+    builder = _Builder('pile')
+
+    support = builder.box([-size, -size, -height], [(layers + 1) * size, (layers + 1) * size, 0.0], is_support=True)
+
+    below = None
+
+    for layer in range(layers):
+        m = layers - layer
+        z0 = layer * height
+        z1 = z0 + height
+        offset = 0.5 * layer * size
+
+        def x(i):
+            return offset + i * size
+
+        keys = {}
+        for i in range(m):
+            for j in range(m):
+                keys[i, j] = builder.box([x(i), x(j), z0], [x(i + 1), x(j + 1), z1])
+
+                if i:
+                    builder.interface(keys[i - 1, j], keys[i, j], [[x(i), x(j), z0], [x(i), x(j + 1), z0],
+                                                                   [x(i), x(j + 1), z1], [x(i), x(j), z1]])
+                if j:
+                    builder.interface(keys[i, j - 1], keys[i, j], [[x(i), x(j), z0], [x(i + 1), x(j), z0],
+                                                                   [x(i + 1), x(j), z1], [x(i), x(j), z1]])
+
+                if below is None:
+                    builder.interface(support, keys[i, j], [[x(i), x(j), z0], [x(i + 1), x(j), z0],
+                                                            [x(i + 1), x(j + 1), z0], [x(i), x(j + 1), z0]])
+                    continue
+
+                # the block covers a quarter of four blocks of the layer below
+                for di in (0, 1):
+                    for dj in (0, 1):
+                        x0 = x(i) + 0.5 * di * size
+                        y0 = x(j) + 0.5 * dj * size
+                        x1 = x0 + 0.5 * size
+                        y1 = y0 + 0.5 * size
+                        builder.interface(below[i + di, j + dj], keys[i, j], [[x0, y0, z0], [x1, y0, z0],
+                                                                              [x1, y1, z0], [x0, y1, z0]])
+
+        below = keys
+
+    return builder.assembly
+
+
+# ==============================================================================
+# Helpers
+# ==============================================================================
+
+
+# the parameters of the corners of a hexahedron, in the order of HEXAHEDRON
+
+_CORNERS = [
+    (0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0),
+    (0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1),
+]
+
+
+class _Builder(object):
+    """Add hexahedral blocks and planar interfaces to an assembly."""
+
+    def __init__(self, name):
+        from compas_assembly.datastructures import Assembly
+
+        self.assembly = Assembly()
+        self.assembly.attributes['name'] = name
+        self.centers = {}
+
+    def box(self, lo, hi, is_support=False):
+        corners = [[hi[i] if c[i] else lo[i] for i in range(3)] for c in _CORNERS]
+        return self.hexahedron(corners, is_support)
+
+    def hexahedron(self, corners, is_support=False):
+        from compas_assembly.datastructures import Block
+
+        faces = HEXAHEDRON
+
+        # the faces are oriented outwards
+        # if the corners are a positive parametrisation of the hexahedron
+
+        a, b, c = [_subtract(corners[i], corners[0]) for i in (1, 3, 4)]
+        if _dot(_cross(a, b), c) < 0:
+            faces = [face[::-1] for face in faces]
+
+        block = Block.from_vertices_and_faces(corners, faces)
+
+        key = self.assembly.add_block(block, is_support=is_support)
+        self.centers[key] = [sum(axis) / 8.0 for axis in zip(*corners)]
+
+        return key
+
+    def interface(self, u, v, points):
+        """Add the interface between two blocks, with the normal pointing from ``u`` to ``v``."""
+        n = len(points)
+
+        # Newell's method for the normal and the area of a planar polygon
+
+        normal = [0.0, 0.0, 0.0]
+        for i in range(n):
+            a = points[i]
+            b = points[(i + 1) % n]
+            normal[0] += (a[1] - b[1]) * (a[2] + b[2])
+            normal[1] += (a[2] - b[2]) * (a[0] + b[0])
+            normal[2] += (a[0] - b[0]) * (a[1] + b[1])
+
+        length = sqrt(_dot(normal, normal))
+        w = [axis / length for axis in normal]
+
+        if _dot(w, _subtract(self.centers[v], self.centers[u])) < 0:
+            w = [-axis for axis in w]
+            points = points[::-1]
+
+        e = _subtract(points[1], points[0])
+        e = _subtract(e, [_dot(e, w) * axis for axis in w])
+        length = sqrt(_dot(e, e))
+        e = [axis / length for axis in e]
+
+        origin = [sum(axis) / n for axis in zip(*points)]
+
+        self.assembly.add_edge(u, v, attr_dict={
+            'interface_points': points,
+            'interface_type': 'face_face',
+            'interface_size': 0.5 * sqrt(_dot(normal, normal)),
+            'interface_uvw': [e, _cross(w, e), w],
+            'interface_origin': origin,
+            'interface_forces': None,
+        })
+
+
+def _subtract(a, b):
+    return [a[0] - b[0], a[1] - b[1], a[2] - b[2]]
+
+
+def _dot(a, b):
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+
+def _cross(a, b):
+    return [a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0]]
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+    pass
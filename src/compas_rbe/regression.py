@@ -0,0 +1,369 @@
+"""
+********************************************************************************
+compas_rbe.regression
+********************************************************************************
+
+.. currentmodule:: compas_rbe.regression
+
+Regression checks of the equilibrium solvers against the reference results of the data sets.
+
+The reference results are the files ending with ``_result.json`` in the data sets of the package.
+They contain the interfaces and the interface forces of the assemblies of the corresponding input files.
+The assemblies are solved again with every solver configuration,
+and the interface forces and the resultants of the interfaces are compared with the references.
+
+.. code-block:: bash
+
+    python scripts/regression.py temp/regression.json --configurations cvx-ECOS cvxopt
+
+The regression checks are also part of every run of :func:`compas_rbe.benchmark.run_benchmark`.
+
+
+Functions
+=========
+
+.. autosummary::
+    :toctree: generated/
+    :nosignatures:
+
+    run_regression
+    check_file
+    compare_interface_forces
+    interface_resultants
+
+"""
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+import os
+import glob
+import json
+import time
+import traceback
+
+from math import sqrt
+
+import compas_rbe
+
+from compas_rbe.batch import _write_json
+
+
+__all__ = [
+    'run_regression',
+    'check_file',
+    'compare_interface_forces',
+    'interface_resultants',
+]
+
+
+DATASETS = [
+    'simple_stack',
+]
+
+# the tolerances on the relative errors of the interface forces and of the resultants, per backend
+# the forces of the vertices of an interface depend on the weights of the objective function,
+# which are different for cvxopt,
+# while the resultants are determined by equilibrium for statically determinate assemblies
+# newton and dd are approximate
+
+TOLERANCES = {
+    'cvx': {'forces': 1e-3, 'resultants': 1e-6},
+    'cvxopt': {'forces': 1e-2, 'resultants': 1e-6},
+    'newton': {'forces': 1e-2, 'resultants': 1e-3},
+    # the name of the newton backend in earlier versions
+    'pgs': {'forces': 1e-2, 'resultants': 1e-3},
+    'dd': {'forces': 1e-2, 'resultants': 1e-3},
+}
+
+FIELDS = [
+    'dataset',
+    'name',
+    'configuration',
+    'status',
+    'forces',
+    'resultants',
+    'passed',
+    'time_solve',
+    'error',
+]
+
+
+def interface_resultants(assembly):
+    """Compute the resultant force and moment of the forces of every interface of an assembly.
+
+    Parameters
+    ----------
+    assembly : compas_assembly.datastructures.Assembly
+        An assembly with interface forces.
+
+    Returns
+    -------
+    dict
+        Per edge ``(u, v)``, the resultant force and moment, as ``[fx, fy, fz, mx, my, mz]``,
+        in global coordinates, with the moment about the origin of the interface.
+        Interfaces without forces are not included.
+
+    """
+    resultants = {}
+
+    for u, v, attr in assembly.edges(True):
+        forces = attr.get('interface_forces')
+        if not forces:
+            continue
+
+        e_u, e_v, e_w = attr['interface_uvw']
+        origin = attr['interface_origin']
+
+        resultant = [0.0] * 6
+
+        for point, force in zip(attr['interface_points'], forces):
+            n = force['c_np'] - force['c_nn']
+            f = [n * w + force['c_u'] * a + force['c_v'] * b for a, b, w in zip(e_u, e_v, e_w)]
+            r = [p - o for p, o in zip(point, origin)]
+            m = [r[1] * f[2] - r[2] * f[1], r[2] * f[0] - r[0] * f[2], r[0] * f[1] - r[1] * f[0]]
+            for i in range(3):
+                resultant[i] += f[i]
+                resultant[i + 3] += m[i]
+
+        resultants[u, v] = resultant
+
+    return resultants
+
+
+def compare_interface_forces(reference, assembly):
+    """Compare the interface forces of an assembly with those of a reference.
+
+    Parameters
+    ----------
+    reference : compas_assembly.datastructures.Assembly
+        The reference assembly.
+    assembly : compas_assembly.datastructures.Assembly
+        The assembly, with the same vertices and edges as the reference.
+
+    Returns
+    -------
+    dict
+        The largest error of the components of the forces of the interface vertices (``'forces'``),
+        relative to the largest component of the reference,
+        and the largest error of the resultant forces and moments of the interfaces (``'resultants'``),
+        relative to the largest resultant force of the reference,
+        and to that force times the size of the largest interface.
+
+    Raises
+    ------
+    ValueError
+        If the assemblies don't have the same interfaces,
+        or if an interface of the reference has forces and the interface of the assembly doesn't.
+
+    """
+    edges = set(reference.edges())
+
+    if edges != set(assembly.edges()):
+        raise ValueError('The assembly and the reference do not have the same interfaces.')
+
+    # the scale of the forces and of the moments
+
+    fmax = 1e-12
+    rmax = 1e-12
+    lmax = 1e-12
+
+    for u, v, attr in reference.edges(True):
+        for force in attr.get('interface_forces') or []:
+            fmax = max(fmax, *[abs(force[name]) for name in ('c_np', 'c_nn', 'c_u', 'c_v')])
+        origin = attr['interface_origin']
+        for point in attr['interface_points']:
+            lmax = max(lmax, sqrt(sum((p - o) ** 2 for p, o in zip(point, origin))))
+
+    expected = interface_resultants(reference)
+    actual = interface_resultants(assembly)
+
+    for resultant in expected.values():
+        rmax = max(rmax, sqrt(sum(f ** 2 for f in resultant[:3])))
+
+    # the errors
+
+    forces = 0.0
+    resultants = 0.0
+
+    for u, v in edges:
+        ref = reference.edge[u][v].get('interface_forces')
+        if not ref:
+            continue
+
+        new = assembly.edge[u][v].get('interface_forces')
+        if not new or len(new) != len(ref):
+            raise ValueError('The interface {0}-{1} has no forces.'.format(u, v))
+
+        for a, b in zip(ref, new):
+            for name in ('c_np', 'c_nn', 'c_u', 'c_v'):
+                forces = max(forces, abs(a[name] - b[name]) / fmax)
+
+        for i in range(3):
+            resultants = max(resultants, abs(expected[u, v][i] - actual[u, v][i]) / rmax)
+            resultants = max(resultants, abs(expected[u, v][i + 3] - actual[u, v][i + 3]) / (rmax * lmax))
+
+    return {'forces': forces, 'resultants': resultants}
+
+
+def check_file(path, backend='cvx', **kwargs):
+    """Compute the interface forces of the assembly of a reference result, and compare them with the reference.
+
+    Parameters
+    ----------
+    path : str
+        The path of a JSON file with the ``'assembly'`` and its ``'blocks'``,
+        with interfaces and interface forces.
+    backend : {'cvx', 'cvxopt', 'newton', 'dd'}, optional
+        The equilibrium solver.
+        Default is ``'cvx'``.
+    kwargs : dict, optional
+        Additional keyword arguments of the solver.
+
+    Returns
+    -------
+    dict
+        The comparison, with the fields of :data:`FIELDS`.
+        The solver ``'status'`` is ``'error'`` if the computation failed.
+
+    """
+    from compas_assembly.datastructures import Assembly
+    from compas_assembly.datastructures import Block
+
+    from compas_rbe.equilibrium.caching import BACKENDS
+
+    result = {field: None for field in FIELDS}
+    result['name'] = os.path.basename(path)[:-len('_result.json')]
+
+    kwargs.setdefault('verbose', False)
+
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+
+        reference = Assembly.from_data(data['assembly'])
+
+        # the forces of the reference are removed
+        # such that they can't be used as a starting point
+
+        assembly = Assembly.from_data(json.loads(json.dumps(data['assembly'])))
+        assembly.blocks = {int(key): Block.from_data(data['blocks'][key]) for key in data['blocks']}
+
+        for u, v, attr in assembly.edges(True):
+            attr['interface_forces'] = None
+
+        t0 = time.time()
+
+        info = BACKENDS[backend](assembly, **kwargs) or {}
+
+        result['time_solve'] = time.time() - t0
+        result['status'] = info.get('status')
+        result.update(compare_interface_forces(reference, assembly))
+
+    except Exception:
+        result['status'] = 'error'
+        result['error'] = traceback.format_exc().strip().splitlines()[-1]
+
+    return result
+
+
+def run_regression(datasets=None, configurations=None, tolerances=None, outfile=None, verbose=True):
+    """Check all solver configurations against the reference results of the data sets.
+
+    Parameters
+    ----------
+    datasets : list, optional
+        The names of the data sets, as the directories in :data:`compas_rbe.DATA`,
+        or the paths of other directories with reference results.
+        Default is :data:`DATASETS`.
+    configurations : list, optional
+        The solver configurations,
+        as dicts with a ``'name'``, a ``'backend'`` and the keyword arguments (``'kwargs'``) of the backend.
+        Default is :data:`compas_rbe.benchmark.CONFIGURATIONS`.
+    tolerances : dict, optional
+        Per backend, the tolerances on the relative errors of the ``'forces'`` and the ``'resultants'``.
+        Default is :data:`TOLERANCES`.
+    outfile : str, optional
+        The path of a JSON file for the results.
+    verbose : bool, optional
+        Print the results of every case when it is done.
+        Default is ``True``.
+
+    Returns
+    -------
+    dict
+        The ``'results'`` of all combinations of reference files and configurations,
+        with the fields of :data:`FIELDS`,
+        and whether all cases ``'passed'``.
+
+    Notes
+    -----
+    A case passes if the solver finds a solution
+    and both errors are within the tolerances of its backend.
+
+    """
+    from compas_rbe.benchmark import CONFIGURATIONS
+
+    datasets = datasets or DATASETS
+    configurations = configurations or CONFIGURATIONS
+    tolerances = tolerances or TOLERANCES
+
+    results = []
+
+    for dataset in datasets:
+        directory = dataset if os.path.isdir(dataset) else os.path.join(compas_rbe.DATA, dataset)
+
+        for path in sorted(glob.glob(os.path.join(directory, '*_result.json'))):
+            for configuration in configurations:
+                backend = configuration['backend']
+                kwargs = dict(configuration.get('kwargs') or {})
+
+                result = check_file(path, backend, **kwargs)
+                result['dataset'] = os.path.basename(os.path.normpath(directory))
+                result['configuration'] = configuration['name']
+                result['passed'] = _passed(result, tolerances.get(backend, TOLERANCES['cvx']))
+
+                results.append(result)
+
+                if verbose:
+                    print('{dataset}/{name} {configuration}: {status} {0} '
+                          '(forces {1}, resultants {2})'.format(
+                              'ok' if result['passed'] else 'FAILED',
+                              _format(result['forces']),
+                              _format(result['resultants']),
+                              **result))
+
+    regression = {'results': results, 'passed': all(result['passed'] for result in results)}
+
+    if outfile:
+        directory = os.path.dirname(os.path.abspath(outfile))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        _write_json(outfile, regression)
+
+    return regression
+
+
+# ==============================================================================
+# Helpers
+# ==============================================================================
+
+
+def _passed(result, tolerance):
+    if result['status'] not in ('optimal', 'optimal_inaccurate', 'converged'):
+        return False
+    if result['forces'] is None or result['resultants'] is None:
+        return False
+    return result['forces'] <= tolerance['forces'] and result['resultants'] <= tolerance['resultants']
+
+
+def _format(value):
+    return '-' if value is None else '{0:.1e}'.format(value)
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,715 @@
+"""
+********************************************************************************
+compas_rbe.rpc
+********************************************************************************
+
+.. currentmodule:: compas_rbe.rpc
+
+Services for a persistent solver server.
+
+In contrast to :class:`compas.utilities.XFunc`, which starts a new Python process
+(and imports numpy, scipy and cvxpy) for every call,
+a :class:`compas.rpc.Proxy` keeps a single server process alive between calls.
+The modules of the server stay imported
+and the results of previous calls are kept in an in-memory cache.
+
+.. code-block:: python
+
+    from compas.rpc import Proxy
+
+    rbe = Proxy('compas_rbe.rpc')
+    rbe.warmup()
+
+    result = rbe.compute_interface_forces_rpc(data, solver='ECOS')
+
+For interactive work, a session keeps the assembly on the server.
+After the first call, the client only sends the blocks and attributes that changed,
+and the server only returns the interface forces that changed.
+
+.. code-block:: python
+
+    session = rbe.open_session(data)
+
+    result = rbe.compute_interface_forces_session(session, solver='ECOS')
+    set_session_forces(assembly, result['edges'])
+
+    # modify the assembly
+    # ...
+
+    delta = make_delta(data, new_data)
+    result = rbe.compute_interface_forces_session(session, delta, solver='ECOS')
+    set_session_forces(assembly, result['edges'])
+
+For large assemblies, the geometry and the forces can be exchanged through
+a memory-mapped binary file in :data:`compas_rbe.TEMP` instead.
+Only the path of the file and the solver info are sent over the connection.
+
+.. code-block:: python
+
+    path = write_transport_file(data)
+
+    info = rbe.compute_interface_forces_file(path, solver='ECOS')
+    set_file_forces(assembly, path)
+
+
+Functions
+=========
+
+.. autosummary::
+    :toctree: generated/
+    :nosignatures:
+
+    ping
+    warmup
+    compute_interface_forces_rpc
+    cache_info
+    clear_cache
+    open_session
+    compute_interface_forces_session
+    close_session
+    make_delta
+    set_session_forces
+    write_transport_file
+    compute_interface_forces_file
+    set_file_forces
+
+
+Exceptions
+==========
+
+.. autosummary::
+    :toctree: generated/
+    :nosignatures:
+
+    SessionError
+
+"""
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+import time
+import uuid
+
+from copy import deepcopy
+
+from compas_rbe.cache import LRUCache
+from compas_rbe.cache import digest
+from compas_rbe.cache import _jsonable
+from compas_rbe.tracing import trace as span
+from compas_rbe.tracing import traced
+from compas_rbe.tracing import _recording
+
+
+__all__ = [
+    'SessionError',
+    'ping',
+    'warmup',
+    'compute_interface_forces_rpc',
+    'cache_info',
+    'clear_cache',
+    'open_session',
+    'compute_interface_forces_session',
+    'close_session',
+    'make_delta',
+    'set_session_forces',
+    'write_transport_file',
+    'compute_interface_forces_file',
+    'set_file_forces',
+]
+
+
+RESULTS = LRUCache(maxsize=16)
+
+SESSIONS = LRUCache(maxsize=8)
+
+# the backends that reuse the matrices of an EquilibriumProblem
+
+PROBLEM = ('cvx', 'cvxopt')
+
+STARTED = time.time()
+
+
+class SessionError(KeyError):
+    """Raised if a session doesn't exist (anymore), or if it doesn't match the changes of the client."""
+
+
+def ping():
+    """Check that the server is alive.
+
+    Returns
+    -------
+    dict
+        The process id of the server and the time (in seconds) since the module was imported.
+
+    """
+    import os
+    return {'pid': os.getpid(), 'uptime': time.time() - STARTED}
+
+
+def warmup():
+    """Import the modules required by the solvers.
+
+    Call this once after starting the server,
+    to avoid paying the import time of the numerical packages on the first request.
+
+    Returns
+    -------
+    dict
+        The import time (in seconds).
+
+    """
+    t0 = time.time()
+
+    import numpy  # noqa: F401
+    import scipy.sparse  # noqa: F401
+    import cvxpy  # noqa: F401
+    import compas_assembly.datastructures  # noqa: F401
+    import compas_rbe.equilibrium  # noqa: F401
+
+    return {'time': time.time() - t0}
+
+
+def compute_interface_forces_rpc(data, backend='cvx', cache=True, trace=None, **kwargs):
+    """Compute the interface forces of an assembly on the server.
+
+    Parameters
+    ----------
+    data : dict
+        The data of the ``'assembly'`` and of its ``'blocks'``,
+        as for :func:`compas_rbe.equilibrium.compute_interface_forces_xfunc`.
+    backend : {'cvx', 'cvxopt', 'newton', 'dd'}, optional
+        The equilibrium solver.
+        Default is ``'cvx'``.
+    cache : bool, optional
+        Return the result of an identical previous request, if available.
+        Default is ``True``.
+    trace : str, optional
+        The path of a trace file of the client,
+        to which the spans of this call are added.
+        See :mod:`compas_rbe.tracing`.
+        Default is ``None``.
+    kwargs : dict, optional
+        Additional keyword arguments of the solver.
+
+    Returns
+    -------
+    dict
+        The updated data of the ``'assembly'`` and its ``'blocks'``,
+        and the solver ``'info'``.
+        ``info['cached']`` indicates if the result was retrieved from the cache.
+        Only the results of solved problems are cached.
+
+    """
+    with _recording(trace, 'rpc', inherit=False):
+        with span('compute_interface_forces_rpc', category='rpc', backend=backend):
+            return _compute_interface_forces_rpc(data, backend, cache, **kwargs)
+
+
+def _compute_interface_forces_rpc(data, backend='cvx', cache=True, **kwargs):
+    from compas_assembly.datastructures import Assembly
+    from compas_assembly.datastructures import Block
+
+    from compas_rbe.equilibrium.telemetry import SOLVED
+
+    from compas_rbe.equilibrium.caching import BACKENDS
+
+    if backend not in BACKENDS:
+        raise ValueError('Unknown backend: {}'.format(backend))
+
+    key = digest(data, backend, kwargs)
+
+    # the cached results are copied
+    # such that the caller can't change them
+
+    if cache:
+        result = RESULTS.get(key)
+        if result is not None:
+            result = deepcopy(result)
+            result['info']['cached'] = True
+            return result
+
+    # the solvers modify the attribute dicts of the assembly in place
+    # which should not change the key of the cached request
+
+    with span('from_data', category='rpc'):
+        data = deepcopy(data)
+
+        assembly = Assembly.from_data(data['assembly'])
+        assembly.blocks = {int(key): Block.from_data(data['blocks'][key]) for key in data['blocks']}
+
+    t0 = time.time()
+
+    info = BACKENDS[backend](assembly, **kwargs) or {}
+
+    info = _jsonable(info)
+    info['time'] = time.time() - t0
+    info['cached'] = False
+
+    with span('to_data', category='rpc'):
+        result = {
+            'assembly': assembly.to_data(),
+            'blocks': {str(key): assembly.blocks[key].to_data() for key in assembly.blocks},
+            'info': info,
+        }
+
+    # the forces of a failed solve are those of the request, if any
+
+    if info.get('status') in SOLVED:
+        RESULTS.set(key, deepcopy(result))
+
+    return result
+
+
+def cache_info():
+    """Get the statistics of the result cache of the server.
+
+    Returns
+    -------
+    dict
+        The number of ``'hits'`` and ``'misses'``,
+        the current ``'size'`` and the ``'maxsize'``.
+
+    """
+    return RESULTS.info()
+
+
+def clear_cache():
+    """Remove all results from the cache of the server."""
+    RESULTS.clear()
+
+
+# ==============================================================================
+# Sessions
+# ==============================================================================
+
+
+def open_session(data):
+    """Open a session on the server for the interactive analysis of an assembly.
+
+    Parameters
+    ----------
+    data : dict
+        The data of the ``'assembly'`` and of its ``'blocks'``,
+        as for :func:`compute_interface_forces_rpc`.
+
+    Returns
+    -------
+    str
+        The identifier of the session.
+
+    Notes
+    -----
+    The server keeps a limited number of sessions.
+    The least recently used sessions are closed automatically.
+
+    The matrices of the equilibrium problem of the assembly are kept with the session,
+    and only the matrices affected by the changes of a call are rebuilt
+    (with the ``'cvx'`` and ``'cvxopt'`` backends).
+    See :class:`compas_rbe.equilibrium.EquilibriumProblem`.
+
+    """
+    from compas_assembly.datastructures import Assembly
+    from compas_assembly.datastructures import Block
+
+    from compas_rbe.equilibrium import EquilibriumProblem
+
+    assembly = Assembly.from_data(deepcopy(data['assembly']))
+    assembly.blocks = {int(key): Block.from_data(data['blocks'][key]) for key in data['blocks']}
+
+    session = uuid.uuid4().hex
+
+    SESSIONS.set(session, {'assembly': assembly, 'problem': EquilibriumProblem(assembly), 'forces': {}})
+
+    return session
+
+
+def compute_interface_forces_session(session, delta=None, backend='cvx', trace=None, **kwargs):
+    """Update the assembly of a session and compute its interface forces.
+
+    Parameters
+    ----------
+    session : str
+        The identifier of the session.
+    delta : dict, optional
+        The changes since the previous call, as computed by :func:`make_delta`.
+    backend : {'cvx', 'cvxopt', 'newton', 'dd'}, optional
+        The equilibrium solver.
+        Default is ``'cvx'``.
+    trace : str, optional
+        The path of a trace file of the client,
+        to which the spans of this call are added.
+        See :mod:`compas_rbe.tracing`.
+        Default is ``None``.
+    kwargs : dict, optional
+        Additional keyword arguments of the solver.
+
+    Returns
+    -------
+    dict
+        The solver ``'info'``,
+        and the ``'edges'`` of which the interface forces changed since the previous call,
+        as a list of ``[u, v, interface_forces]``.
+        Without a delta, the client is assumed to have no forces,
+        and the forces of all edges are returned.
+        If the equilibrium problem is not solved,
+        the interface forces are ``None``.
+
+    Raises
+    ------
+    SessionError
+        If the session doesn't exist (anymore),
+        or if the delta refers to vertices or edges that are not part of the assembly.
+        In both cases a new session should be opened.
+
+    """
+    with _recording(trace, 'rpc', inherit=False):
+        with span('compute_interface_forces_session', category='rpc', backend=backend):
+            return _compute_interface_forces_session(session, delta, backend, **kwargs)
+
+
+def _compute_interface_forces_session(session, delta=None, backend='cvx', **kwargs):
+    from compas_assembly.datastructures import Block
+
+    from compas_rbe.equilibrium.telemetry import SOLVED
+
+    from compas_rbe.equilibrium.caching import BACKENDS
+
+    if backend not in BACKENDS:
+        raise ValueError('Unknown backend: {}'.format(backend))
+
+    state = SESSIONS.get(session)
+
+    if state is None:
+        raise SessionError('Unknown session: {}'.format(session))
+
+    assembly = state['assembly']
+    problem = state['problem']
+
+    if delta:
+        with span('apply delta', category='rpc'):
+            keys = {str(key): key for key in assembly.vertices()}
+
+            # a partially applied delta leaves the assembly in an unknown state
+            # therefore the session is closed
+
+            try:
+                for key, attr in delta.get('vertex', {}).items():
+                    assembly.vertex[keys[str(key)]].update(attr)
+
+                for u in delta.get('edge', {}):
+                    for v, attr in delta['edge'][u].items():
+                        assembly.edge[keys[str(u)]][keys[str(v)]].update(attr)
+
+                for key, data in delta.get('blocks', {}).items():
+                    assembly.blocks[keys[str(key)]] = Block.from_data(data)
+
+            except KeyError as e:
+                SESSIONS.delete(session)
+                raise SessionError('The delta does not match the assembly of the session: {}'.format(e))
+
+            # only the matrices that depend on the changes are rebuilt
+
+            changes = []
+
+            if any('is_support' in attr for attr in delta.get('vertex', {}).values()):
+                changes.append('supports')
+            if delta.get('blocks'):
+                changes.append('blocks')
+            if any(delta['edge'][u] for u in delta.get('edge', {})):
+                changes.append('interfaces')
+
+            if changes:
+                problem.invalidate(*changes)
+
+    if backend in PROBLEM:
+        kwargs['problem'] = problem
+
+    t0 = time.time()
+
+    info = BACKENDS[backend](assembly, **kwargs) or {}
+
+    info = _jsonable(info)
+    info['time'] = time.time() - t0
+
+    # the forces of a failed solve are those of a previous solve, if any
+
+    if info.get('status') not in SOLVED:
+        for u, v, attr in assembly.edges(True):
+            attr['interface_forces'] = None
+
+    edges = []
+
+    with span('changed forces', category='rpc'):
+        for u, v, attr in assembly.edges(True):
+            forces = _jsonable(attr.get('interface_forces'))
+            if delta is None or state['forces'].get((u, v)) != forces:
+                state['forces'][u, v] = forces
+                edges.append([u, v, forces])
+
+    return {'info': info, 'edges': edges}
+
+
+def close_session(session):
+    """Close a session and release its assembly."""
+    SESSIONS.delete(session)
+
+
+@traced(category='client')
+def make_delta(old, new, ignore=('interface_forces', )):
+    """Compute the changes between two versions of the data of an assembly.
+
+    Parameters
+    ----------
+    old : dict
+        The data of the ``'assembly'`` and its ``'blocks'`` sent in the previous call.
+    new : dict
+        The current data of the ``'assembly'`` and its ``'blocks'``.
+    ignore : tuple, optional
+        The names of edge attributes that are computed on the server.
+        Default is ``('interface_forces', )``.
+
+    Returns
+    -------
+    dict
+        The changed ``'vertex'`` and ``'edge'`` attributes, and the changed ``'blocks'``.
+
+    Notes
+    -----
+    This function doesn't depend on numpy and can be used in Rhino.
+    Only changes of existing vertices, edges and blocks are detected.
+    If vertices or edges are added or removed, a new session should be opened instead.
+
+    """
+    delta = {'vertex': {}, 'edge': {}, 'blocks': {}}
+
+    vertex = old['assembly']['vertex']
+    for key, attr in new['assembly']['vertex'].items():
+        changed = _changed(vertex[key], attr)
+        if changed:
+            delta['vertex'][key] = changed
+
+    edge = old['assembly']['edge']
+    for u in new['assembly']['edge']:
+        for v, attr in new['assembly']['edge'][u].items():
+            changed = _changed(edge[u][v], attr, ignore)
+            if changed:
+                delta['edge'].setdefault(u, {})[v] = changed
+
+    for key, data in new['blocks'].items():
+        if old['blocks'][key] != data:
+            delta['blocks'][key] = data
+
+    return delta
+
+
+@traced(category='client')
+def set_session_forces(assembly, edges):
+    """Update the interface forces of an assembly with the changed edges returned by a session.
+
+    Parameters
+    ----------
+    assembly : compas_assembly.datastructures.Assembly
+        The assembly of the client.
+    edges : list
+        The changed edges, as a list of ``[u, v, interface_forces]``.
+
+    """
+    keys = {str(key): key for key in assembly.vertices()}
+
+    for u, v, forces in edges:
+        assembly.edge[keys[str(u)]][keys[str(v)]]['interface_forces'] = forces
+
+
+# ==============================================================================
+# Files
+# ==============================================================================
+
+
+@traced(category='client')
+def write_transport_file(data, path=None):
+    """Write the data of an assembly to a binary transport file.
+
+    Parameters
+    ----------
+    data : dict
+        The data of the ``'assembly'`` and of its ``'blocks'``.
+    path : str, optional
+        The path of the file.
+        Default is a new file in :data:`compas_rbe.TEMP`.
+
+    Returns
+    -------
+    str
+        The path of the file.
+
+    Notes
+    -----
+    This function doesn't depend on numpy and can be used in Rhino.
+
+    """
+    import os
+    import compas_rbe
+
+    from compas_rbe.files import write_binary
+
+    if not path:
+        if not os.path.isdir(compas_rbe.TEMP):
+            os.makedirs(compas_rbe.TEMP)
+        path = os.path.join(compas_rbe.TEMP, '{}.rbe'.format(uuid.uuid4().hex))
+
+    write_binary(path, data)
+
+    return path
+
+
+def compute_interface_forces_file(path, backend='cvx', trace=None, **kwargs):
+    """Compute the interface forces of the assembly in a binary transport file.
+
+    Parameters
+    ----------
+    path : str
+        The path of the file.
+    backend : {'cvx', 'cvxopt', 'newton', 'dd'}, optional
+        The equilibrium solver.
+        Default is ``'cvx'``.
+    trace : str, optional
+        The path of a trace file of the client,
+        to which the spans of this call are added.
+        See :mod:`compas_rbe.tracing`.
+        Default is ``None``.
+    kwargs : dict, optional
+        Additional keyword arguments of the solver.
+
+    Returns
+    -------
+    dict
+        The solver ``'info'``.
+        The forces are written to the file, in place.
+        If the solver didn't find a solution, the forces in the file are ``NaN``.
+
+    Notes
+    -----
+    The geometry of the blocks is mapped into memory, and not converted to meshes.
+
+    """
+    with _recording(trace, 'rpc', inherit=False):
+        with span('compute_interface_forces_file', category='rpc', backend=backend):
+            return _compute_interface_forces_file(path, backend, **kwargs)
+
+
+def _compute_interface_forces_file(path, backend='cvx', **kwargs):
+    from compas_assembly.datastructures import Assembly
+
+    from compas_rbe.equilibrium.caching import BACKENDS
+    from compas_rbe.equilibrium.telemetry import SOLVED
+    from compas_rbe.files import binary_to_data
+    from compas_rbe.files import read_binary_array
+    from compas_rbe.files import read_binary_blocks
+    from compas_rbe.files import write_binary_forces
+    from compas_rbe.files.binary import NAN
+
+    if backend not in BACKENDS:
+        raise ValueError('Unknown backend: {}'.format(backend))
+
+    with span('read file', category='rpc'):
+        data = binary_to_data(path, blocks=False)
+
+        assembly = Assembly.from_data(data['assembly'])
+        assembly.blocks = read_binary_blocks(path)
+
+    t0 = time.time()
+
+    info = BACKENDS[backend](assembly, **kwargs) or {}
+
+    info = _jsonable(info)
+    info['time'] = time.time() - t0
+
+    # the forces are written in the order of the interfaces in the file
+    # interface points without forces, and all points after a failed solve, get NaN rows
+
+    solved = info.get('status') in SOLVED
+
+    with span('write file', category='rpc'):
+        keys = {str(key): key for key in assembly.vertices()}
+        edges, _ = read_binary_array(path, 'edges')
+        offsets, _ = read_binary_array(path, 'interface_offsets')
+
+        x = []
+        for index in range(len(offsets) - 1):
+            u = keys[str(edges[2 * index])]
+            v = keys[str(edges[2 * index + 1])]
+            forces = (assembly.edge[u][v].get('interface_forces') or []) if solved else []
+            for i in range(offsets[index + 1] - offsets[index]):
+                if i < len(forces):
+                    x += [forces[i]['c_np'], forces[i]['c_nn'], forces[i]['c_u'], forces[i]['c_v']]
+                else:
+                    x += [NAN] * 4
+
+        write_binary_forces(path, x)
+
+    return info
+
+
+@traced(category='client')
+def set_file_forces(assembly, path, remove=True):
+    """Update the interface forces of an assembly with the forces in a binary transport file.
+
+    Parameters
+    ----------
+    assembly : compas_assembly.datastructures.Assembly
+        The assembly of the client.
+    path : str
+        The path of the file.
+    remove : bool, optional
+        Remove the file afterwards.
+        Default is ``True``.
+
+    Notes
+    -----
+    This function doesn't depend on numpy and can be used in Rhino.
+
+    """
+    import os
+
+    from compas_rbe.files import read_binary_array
+
+    edges, _ = read_binary_array(path, 'edges')
+    offsets, _ = read_binary_array(path, 'interface_offsets')
+    forces, _ = read_binary_array(path, 'interface_forces')
+
+    keys = {str(key): key for key in assembly.vertices()}
+
+    for index in range(len(offsets) - 1):
+        u = keys[str(edges[2 * index])]
+        v = keys[str(edges[2 * index + 1])]
+        attr = assembly.edge[u][v]
+        a, b = offsets[index], offsets[index + 1]
+        if b > a and forces[4 * a] == forces[4 * a]:
+            attr['interface_forces'] = [
+                {'c_np': forces[4 * i], 'c_nn': forces[4 * i + 1], 'c_u': forces[4 * i + 2], 'c_v': forces[4 * i + 3]}
+                for i in range(a, b)
+            ]
+        else:
+            attr['interface_forces'] = None
+
+    if remove:
+        os.remove(path)
+
+
+# ==============================================================================
+# Helpers
+# ==============================================================================
+
+
+def _changed(old, new, ignore=()):
+    """Get the attributes of a dict that are new or have a different value."""
+    return {name: value for name, value in new.items() if name not in ignore and old.get(name) != value}
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+    pass
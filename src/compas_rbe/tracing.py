@@ -0,0 +1,367 @@
+"""
+********************************************************************************
+compas_rbe.tracing
+********************************************************************************
+
+.. currentmodule:: compas_rbe.tracing
+
+Opt-in tracing of the computation of interface forces.
+
+A trace records the spans of the xfunc and rpc entry points, the interface detection,
+the matrix builders and the phases of the equilibrium backends,
+of the current process and of all processes started by it,
+in a single file in the Chrome trace-event format in :data:`compas_rbe.TEMP`.
+Open the file with ``chrome://tracing`` or https://ui.perfetto.dev.
+
+.. code-block:: python
+
+    from compas_rbe.tracing import start_trace
+    from compas_rbe.tracing import stop_trace
+
+    path = start_trace()
+
+    compute_interface_forces_cvx(assembly)
+
+    stop_trace()
+
+The path of the trace is stored in the environment variable ``COMPAS_RBE_TRACE``,
+such that child processes, such as the workers of a batch or of a domain decomposition,
+write to the same file.
+Processes that are not started by the current process,
+such as the process of an :class:`compas.utilities.XFunc` or an rpc server,
+receive the path as the ``trace`` argument of the entry points.
+A persistent rpc server only records the calls that receive a path.
+
+.. code-block:: python
+
+    path = start_trace()
+
+    with trace('XFunc'):
+        result = f(data, trace=path)
+
+    stop_trace()
+
+Tracing is off by default.
+Without a trace, the overhead of the instrumentation is a single lookup per span.
+
+
+Functions
+=========
+
+.. autosummary::
+    :toctree: generated/
+    :nosignatures:
+
+    start_trace
+    stop_trace
+    is_tracing
+    trace
+    traced
+    load_trace
+
+"""
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+
+from contextlib import contextmanager
+from functools import wraps
+
+import compas_rbe
+
+
+__all__ = [
+    'start_trace',
+    'stop_trace',
+    'is_tracing',
+    'trace',
+    'traced',
+    'load_trace',
+]
+
+
+ENV = 'COMPAS_RBE_TRACE'
+
+# the timestamps of all processes are on the same (wall) clock,
+# with the resolution of the performance counter of the process
+
+try:
+    _counter = time.perf_counter
+except AttributeError:
+    _counter = time.clock if sys.platform == 'win32' else time.time
+
+_EPOCH = time.time() - _counter()
+
+# the processes of which the metadata was written, per trace
+
+_NAMED = set()
+
+_NAME = {'name': None}
+
+
+def start_trace(path=None, append=False, name=None):
+    """Start recording a trace, in the current process and in the processes started by it.
+
+    Parameters
+    ----------
+    path : str, optional
+        The path of the trace file.
+        Default is a new file in :data:`compas_rbe.TEMP`.
+    append : bool, optional
+        Add to an existing trace file, for example the trace of the process that made the call.
+        Default is ``False``.
+    name : str, optional
+        The name of the current process in the trace.
+        Default is the name of the process in :mod:`multiprocessing`, or ``'python'``.
+
+    Returns
+    -------
+    str
+        The path of the trace file.
+
+    """
+    if not path:
+        if not os.path.isdir(compas_rbe.TEMP):
+            os.makedirs(compas_rbe.TEMP)
+        path = os.path.join(compas_rbe.TEMP, 'trace_{0}_{1}.json'.format(time.strftime('%Y%m%d_%H%M%S'), uuid.uuid4().hex[:8]))
+
+    path = os.path.abspath(path)
+
+    # events are appended as lines of a JSON array without the closing bracket,
+    # which is allowed by the format and lets every process append independently
+
+    if not append or not os.path.exists(path):
+        with open(path, 'w') as f:
+            f.write('[\n')
+
+    os.environ[ENV] = path
+
+    if name:
+        _NAME['name'] = name
+        _NAMED.discard((path, os.getpid()))
+
+    return path
+
+
+def stop_trace():
+    """Stop recording the trace of the current process.
+
+    Returns
+    -------
+    str
+        The path of the trace file, or ``None`` if there was no trace.
+
+    Notes
+    -----
+    Processes that were started during the trace keep writing to the file until they finish.
+
+    """
+    return os.environ.pop(ENV, None)
+
+
+def is_tracing():
+    """Verify that a trace is being recorded.
+
+    Returns
+    -------
+    bool
+        ``True`` if a trace is being recorded.
+
+    """
+    return bool(os.environ.get(ENV))
+
+
+@contextmanager
+def _recording(path, name=None, inherit=True):
+    """Record the trace of a block of code in an existing trace file, if a path is given.
+    Without a path, the trace inherited from the parent process is used, if ``inherit`` is ``True``."""
+    previous = os.environ.get(ENV)
+
+    if path:
+        start_trace(path, append=True, name=name)
+    elif not inherit:
+        os.environ.pop(ENV, None)
+
+    try:
+        yield
+    finally:
+        if previous:
+            os.environ[ENV] = previous
+        else:
+            os.environ.pop(ENV, None)
+
+
+@contextmanager
+def trace(name, category='compas_rbe', **args):
+    """Record a span in the trace, if a trace is being recorded.
+
+    Parameters
+    ----------
+    name : str
+        The name of the span.
+    category : str, optional
+        The category of the span.
+        Default is ``'compas_rbe'``.
+    args : dict, optional
+        Additional data of the span, shown in the details of the span.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        with trace('assembly_interfaces', blocks=assembly.number_of_vertices()):
+            assembly_interfaces(assembly)
+
+    """
+    if not is_tracing():
+        yield
+        return
+
+    start = _timestamp()
+    try:
+        yield
+    finally:
+        _complete(name, start, _timestamp() - start, category, **args)
+
+
+def traced(name=None, category='compas_rbe'):
+    """Decorate a function such that its calls are recorded as spans, if a trace is being recorded.
+
+    Parameters
+    ----------
+    name : str, optional
+        The name of the spans.
+        Default is the name of the function.
+    category : str, optional
+        The category of the spans.
+        Default is ``'compas_rbe'``.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        @traced()
+        def make_Aeq(assembly, return_vcount=True, tension=True):
+            pass
+
+    """
+    def decorate(func):
+        label = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not is_tracing():
+                return func(*args, **kwargs)
+            with trace(label, category):
+                return func(*args, **kwargs)
+
+        # for the inspection of the signature, also on Python 2
+        wrapper.__wrapped__ = func
+
+        return wrapper
+
+    return decorate
+
+
+def load_trace(path):
+    """Load the events of a trace file.
+
+    Parameters
+    ----------
+    path : str
+        The path of the trace file.
+
+    Returns
+    -------
+    list
+        The trace events.
+
+    """
+    with open(path, 'r') as f:
+        text = f.read().strip()
+
+    if not text.endswith(']'):
+        text = text.rstrip(',') + ']'
+
+    return json.loads(text)
+
+
+# ==============================================================================
+# Helpers
+# ==============================================================================
+
+
+def _timestamp():
+    """The current time in seconds since the epoch, comparable between processes."""
+    return _EPOCH + _counter()
+
+
+def _complete(name, start, duration, category='compas_rbe', **args):
+    """Record a span with a known start (as :func:`timestamp`) and duration in seconds."""
+    event = {
+        'name': name,
+        'cat': category,
+        'ph': 'X',
+        'ts': start * 1e6,
+        'dur': duration * 1e6,
+    }
+    if args:
+        event['args'] = args
+    _write(event)
+
+
+def _write(event):
+    path = os.environ.get(ENV)
+    if not path:
+        return
+
+    pid = os.getpid()
+
+    event['pid'] = pid
+    event['tid'] = threading.current_thread().ident
+
+    lines = []
+
+    if (path, pid) not in _NAMED:
+        _NAMED.add((path, pid))
+        lines.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': _process_name()}})
+
+    lines.append(event)
+
+    text = ''.join(json.dumps(line, default=str) + ',\n' for line in lines)
+
+    # a single write of a few lines in append mode is not interleaved with the writes of other processes
+    # tracing never interrupts the computation
+
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+    except OSError:
+        return
+    try:
+        os.write(fd, text.encode('utf-8'))
+    finally:
+        os.close(fd)
+
+
+def _process_name():
+    name = None
+    if 'multiprocessing' in sys.modules:
+        name = sys.modules['multiprocessing'].current_process().name
+    if not name or name == 'MainProcess':
+        name = _NAME['name'] or 'python'
+    return '{0} ({1})'.format(name, os.getpid())
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+if __name__ == "__main__":
+    pass
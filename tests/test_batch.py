@@ -0,0 +1,46 @@
+import os
+import shutil
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('cvxpy')
+pytest.importorskip('compas_assembly')
+
+import compas_rbe
+
+from compas_rbe.batch import SUFFIX
+from compas_rbe.batch import run_batch
+
+
+@pytest.fixture
+def directory(tmpdir):
+    for name in ('simple_stack_1', 'simple_stack_3'):
+        path = compas_rbe.get('simple_stack/{}_result.json'.format(name))
+        shutil.copy(path, str(tmpdir.join('{}.json'.format(name))))
+        shutil.copy(path, str(tmpdir.join('{}_result.json'.format(name))))
+    return str(tmpdir)
+
+
+def test_run_batch(directory):
+    summaries = run_batch(os.path.join(directory, '*.json'), directory, processes=2, verbose=False, solver='ECOS')
+
+    assert [summary['name'] for summary in summaries] == ['simple_stack_1', 'simple_stack_3']
+    assert all(summary['status'] == 'optimal' for summary in summaries)
+    assert os.path.exists(os.path.join(directory, 'simple_stack_1{}.json'.format(SUFFIX)))
+
+    # the reference results are neither inputs nor outputs of the batch
+
+    with open(os.path.join(directory, 'simple_stack_1_result.json')) as a:
+        with open(os.path.join(directory, 'simple_stack_1.json')) as b:
+            assert a.read() == b.read()
+
+    summaries = run_batch(os.path.join(directory, '*.json'), directory, verbose=False, solver='ECOS')
+    assert all(summary['status'] == 'optimal' for summary in summaries)
+
+
+def test_run_batch_timeout(directory):
+    summaries = run_batch(os.path.join(directory, '*.json'), directory, backend='dd', timeout=0.1, verbose=False)
+
+    assert all(summary['status'] == 'error' for summary in summaries)
+    assert all(summary['error'].startswith('Timeout') for summary in summaries)
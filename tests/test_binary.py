@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+pytest.importorskip('compas')
+pytest.importorskip('numpy')
+
+import compas_rbe
+
+from compas.datastructures import Network
+
+from compas_rbe.files import write_binary
+from compas_rbe.files import binary_to_data
+
+
+@pytest.fixture
+def data():
+    with open(compas_rbe.get('simple_stack/simple_stack_1_result.json'), 'r') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def path(tmpdir, data):
+    path = str(tmpdir.join('simple_stack_1_result.rbe'))
+    write_binary(path, data)
+    return path
+
+
+def test_halfedge_round_trip(data, path):
+    result = binary_to_data(path)
+    assert result['assembly']['halfedge'] == data['assembly']['halfedge']
+
+
+def test_network_from_data(data, path):
+    network = Network.from_data(binary_to_data(path)['assembly'])
+    original = Network.from_data(data['assembly'])
+    assert sorted(network.edges()) == sorted(original.edges())
+
+
+def test_assembly_from_data(data, path):
+    datastructures = pytest.importorskip('compas_assembly.datastructures')
+
+    result = binary_to_data(path)
+
+    assembly = datastructures.Assembly.from_data(result['assembly'])
+    assembly.blocks = {int(key): datastructures.Block.from_data(result['blocks'][key]) for key in result['blocks']}
+
+    assert assembly.number_of_vertices() == len(data['assembly']['vertex'])
+    assert assembly.number_of_edges() == 1
+
+    for u, v, attr in assembly.edges(True):
+        forces = data['assembly']['edge'][str(u)][str(v)]['interface_forces']
+        for a, b in zip(attr['interface_forces'], forces):
+            assert a == pytest.approx(b)
@@ -0,0 +1,111 @@
+import os
+import time
+
+import pytest
+
+from compas_rbe.cache import DiskCache
+from compas_rbe.cache import digest
+
+
+@pytest.fixture
+def cache(tmpdir):
+    return DiskCache(str(tmpdir), maxsize=2)
+
+
+def test_digest():
+    assert digest({'a': 1, 'b': [1, 2]}) == digest({'b': [1, 2], 'a': 1})
+    assert digest({'a': 1}) != digest({'a': 2})
+
+
+def test_get_set(cache):
+    assert cache.get('a') is None
+    cache.set('a', {'x': [1.0, 2.0]})
+    assert 'a' in cache
+    assert cache.get('a') == {'x': [1.0, 2.0]}
+
+
+def test_evict_least_recently_used(cache):
+    for i, key in enumerate('abc'):
+        cache.set(key, i)
+        os.utime(cache._filepath(key), (i, i))
+    cache.evict()
+    assert 'a' not in cache
+    assert cache.get('b') == 1
+    assert cache.get('c') == 2
+    assert cache.info()['size'] == 2
+
+
+def test_evict_only_when_needed(tmpdir):
+    cache = DiskCache(str(tmpdir), maxsize=100)
+    scans = []
+    evict = cache.evict
+
+    def counted():
+        scans.append(1)
+        evict()
+
+    cache.evict = counted
+    for key in 'abcde':
+        cache.set(key, key)
+    cache.set('a', 'a')
+    assert len(scans) == 1
+    assert cache._size == 5
+
+
+def test_remove_orphans(cache):
+    old = os.path.join(cache.path, 'old.tmp')
+    new = os.path.join(cache.path, 'new.tmp')
+    for path in (old, new):
+        with open(path, 'w') as f:
+            f.write('{')
+    t = time.time() - 2 * 3600
+    os.utime(old, (t, t))
+    cache.evict()
+    assert not os.path.exists(old)
+    assert os.path.exists(new)
+
+
+# ==============================================================================
+# Equilibrium results
+# ==============================================================================
+
+
+@pytest.fixture
+def assembly():
+    pytest.importorskip('numpy')
+    pytest.importorskip('compas_assembly')
+    from compas_rbe.generators import wall_assembly
+    return wall_assembly(3, 3)
+
+
+def test_equilibrium_key(assembly):
+    from compas_rbe.equilibrium import equilibrium_key
+    assert equilibrium_key(assembly) == equilibrium_key(assembly, mu=0.6)
+    assert equilibrium_key(assembly) == equilibrium_key(assembly, verbose=True)
+    assert equilibrium_key(assembly) != equilibrium_key(assembly, mu=0.5)
+    assert equilibrium_key(assembly) != equilibrium_key(assembly, backend='cvxopt')
+
+
+def test_cache_hit(assembly, cache):
+    from compas_rbe.equilibrium import compute_interface_forces_cached
+
+    info = compute_interface_forces_cached(assembly, cache=cache, solver='ECOS')
+    assert info['status'] == 'optimal'
+    assert not info['cached']
+
+    forces = [attr['interface_forces'] for u, v, attr in assembly.edges(True)]
+    for u, v, attr in assembly.edges(True):
+        attr['interface_forces'] = None
+
+    info = compute_interface_forces_cached(assembly, cache=cache, solver='ECOS')
+    assert info['cached']
+    assert [attr['interface_forces'] for u, v, attr in assembly.edges(True)] == forces
+
+
+def test_failed_solve_not_cached(assembly, cache):
+    from compas_rbe.equilibrium import compute_interface_forces_cached
+
+    info = compute_interface_forces_cached(assembly, backend='newton', cache=cache, maxiters=1)
+    assert info['status'] == 'maxiters'
+    assert info['cached'] is False
+    assert cache.info()['size'] == 0
@@ -0,0 +1,57 @@
+import os
+import json
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from compas_rbe.files import face_cycles
+from compas_rbe.files import convert_legacy_directory
+
+
+def test_face_cycles():
+    faces = {'0': {'a': 'b', 'b': 'c', 'c': 'a'}, '1': {'a': 'c', 'c': 'd', 'd': 'e', 'e': 'a'}}
+    assert face_cycles(faces) == {'0': ['a', 'b', 'c'], '1': ['a', 'c', 'd', 'e']}
+
+
+@pytest.mark.parametrize('face', [
+    {'a': 'b', 'b': 'a', 'c': 'd', 'd': 'c'},
+    {'a': 'b', 'b': 'c', 'c': 'b'},
+    {'a': 'b', 'b': 'c'},
+    {},
+])
+def test_face_cycles_invalid(face):
+    with pytest.raises(ValueError):
+        face_cycles({'0': {'x': 'y', 'y': 'z', 'z': 'x'}, '1': face})
+
+
+@pytest.fixture
+def source(tmpdir):
+    corners = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0), (0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)]
+    faces = [[0, 3, 2, 1], [4, 5, 6, 7], [0, 1, 5, 4], [1, 2, 6, 5], [2, 3, 7, 6], [3, 0, 4, 7]]
+    block = {
+        'attributes': {'name': 'block'},
+        'vertex': {str(i): {'x': x, 'y': y, 'z': z} for i, (x, y, z) in enumerate(corners)},
+        'face': {str(i): {str(u): str(v) for u, v in zip(face, face[1:] + face[:1])} for i, face in enumerate(faces)},
+    }
+    directory = tmpdir.mkdir('legacy')
+    directory.join('box.json').write(json.dumps([block]))
+    return str(directory)
+
+
+def test_convert_legacy_directory(source, tmpdir):
+    destination = str(tmpdir.join('converted'))
+
+    manifest = convert_legacy_directory(source, destination, processes=1, verbose=False)
+    assert list(manifest) == ['box.json']
+
+    # a different format is a different target
+
+    manifest = convert_legacy_directory(source, destination, binary=True, processes=1, verbose=False)
+    assert sorted(manifest) == ['box.json', 'box.rbe']
+
+    # a deleted target is converted again
+
+    os.remove(os.path.join(destination, 'box.json'))
+    convert_legacy_directory(source, destination, processes=1, verbose=False)
+    assert os.path.exists(os.path.join(destination, 'box.json'))
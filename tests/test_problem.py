@@ -0,0 +1,84 @@
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('compas_assembly')
+
+from numpy import allclose
+
+from compas_rbe.equilibrium import EquilibriumProblem
+from compas_rbe.equilibrium import equilibrate
+from compas_rbe.generators import wall_assembly
+
+
+@pytest.fixture
+def problem():
+    problem = EquilibriumProblem(wall_assembly(3, 3))
+    problem.equilibrated
+    return problem
+
+
+def test_cached(problem):
+    A = problem.A
+    assert problem.A is A
+    assert problem.update(mu=0.6) == []
+    assert problem.A is A
+
+
+def test_invalidate_supports(problem):
+    G = problem.G
+    p = problem.p
+
+    discarded = problem.invalidate('supports')
+
+    assert set(discarded) == {'free', 'A', 'b', 'ruiz', 'equilibrated'}
+    assert problem.G is G
+    assert problem.p is p
+
+
+def test_invalidate_blocks(problem):
+    A = problem.A
+    G = problem.G
+
+    discarded = problem.invalidate('blocks')
+
+    assert set(discarded) == {'Aeq', 'loads', 'A', 'b', 'ruiz', 'equilibrated'}
+    assert problem.A is not A
+    assert problem.G is G
+
+
+def test_invalidate_all(problem):
+    problem.invalidate()
+    assert problem.data == {}
+
+
+def test_update_mu(problem):
+    A = problem.A
+
+    assert problem.update(mu=0.5) == ['mu']
+    assert 'Aiq' not in problem.data
+    assert 'ruiz' not in problem.data
+    assert problem.A is A
+
+
+def test_update_weights(problem):
+    ruiz = problem.data['ruiz']
+    A = problem.A
+
+    assert problem.update(weights=(1.0, 1e+5, 1.0)) == ['weights']
+    assert set(problem.data).isdisjoint(('p', 'P', 'q', 'equilibrated'))
+
+    equilibrated = problem.equilibrated
+
+    assert problem.data['ruiz'] is ruiz
+    assert problem.A is A
+
+    A, b, G, p, scaling = equilibrate(problem.A, problem.b, problem.G, problem.p)
+
+    assert allclose(equilibrated['p'], p)
+    assert allclose(equilibrated['b'], b)
+    assert scaling['cost'] == pytest.approx(equilibrated['scaling']['cost'])
+
+
+def test_unknown_parameter(problem):
+    with pytest.raises(TypeError):
+        problem.update(unknown=1)
@@ -0,0 +1,28 @@
+import glob
+import os
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('cvxpy')
+pytest.importorskip('compas_assembly')
+
+import compas_rbe
+
+from compas_rbe.benchmark import CONFIGURATIONS
+from compas_rbe.regression import TOLERANCES
+from compas_rbe.regression import check_file
+
+
+PATHS = sorted(glob.glob(os.path.join(compas_rbe.DATA, 'simple_stack', '*_result.json')))
+
+
+@pytest.mark.parametrize('configuration', CONFIGURATIONS, ids=[configuration['name'] for configuration in CONFIGURATIONS])
+@pytest.mark.parametrize('path', PATHS, ids=[os.path.basename(path)[:-len('_result.json')] for path in PATHS])
+def test_reference_results(path, configuration):
+    backend = configuration['backend']
+    result = check_file(path, backend, **configuration['kwargs'])
+
+    assert result['status'] in ('optimal', 'optimal_inaccurate', 'converged'), result['error']
+    assert result['forces'] <= TOLERANCES[backend]['forces']
+    assert result['resultants'] <= TOLERANCES[backend]['resultants']
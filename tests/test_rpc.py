@@ -0,0 +1,109 @@
+from copy import deepcopy
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('cvxpy')
+pytest.importorskip('compas_assembly')
+
+from compas_rbe import rpc
+from compas_rbe.generators import wall_assembly
+
+
+@pytest.fixture
+def data():
+    assembly = wall_assembly(3, 3)
+    return {
+        'assembly': assembly.to_data(),
+        'blocks': {str(key): assembly.blocks[key].to_data() for key in assembly.blocks},
+    }
+
+
+@pytest.fixture
+def session(data):
+    session = rpc.open_session(data)
+    yield session
+    rpc.close_session(session)
+
+
+def test_session_edges(data, session):
+    count = sum(len(nbrs) for nbrs in data['assembly']['edge'].values())
+
+    result = rpc.compute_interface_forces_session(session, solver='ECOS')
+    assert result['info']['status'] == 'optimal'
+    assert len(result['edges']) == count
+
+    result = rpc.compute_interface_forces_session(session, {}, solver='ECOS')
+    assert result['edges'] == []
+
+    result = rpc.compute_interface_forces_session(session, None, solver='ECOS')
+    assert len(result['edges']) == count
+
+
+def test_session_failed_solve(session):
+    rpc.compute_interface_forces_session(session, solver='ECOS')
+
+    result = rpc.compute_interface_forces_session(session, {}, backend='newton', maxiters=1)
+    assert result['info']['status'] == 'maxiters'
+    assert result['edges']
+    assert all(forces is None for u, v, forces in result['edges'])
+
+
+def test_session_error(session):
+    with pytest.raises(rpc.SessionError):
+        rpc.compute_interface_forces_session('unknown')
+
+    with pytest.raises(rpc.SessionError):
+        rpc.compute_interface_forces_session(session, {'vertex': {'999': {}}})
+
+    with pytest.raises(rpc.SessionError):
+        rpc.compute_interface_forces_session(session)
+
+
+def test_cached_result(data):
+    rpc.clear_cache()
+
+    result = rpc.compute_interface_forces_rpc(data, solver='ECOS')
+    assert not result['info']['cached']
+
+    result['assembly'] = None
+
+    cached = rpc.compute_interface_forces_rpc(data, solver='ECOS')
+    assert cached['info']['cached']
+    assert cached['assembly'] is not None
+
+    cached['info']['status'] = None
+
+    assert rpc.compute_interface_forces_rpc(data, solver='ECOS')['info']['status'] == 'optimal'
+
+
+def test_failed_result_not_cached(data):
+    rpc.clear_cache()
+
+    rpc.compute_interface_forces_rpc(data, backend='newton', maxiters=1)
+    assert rpc.cache_info()['size'] == 0
+
+
+def test_session_problem(data, session):
+    rpc.compute_interface_forces_session(session, solver='ECOS')
+
+    problem = rpc.SESSIONS.get(session)['problem']
+    A = problem.A
+    G = problem.G
+
+    # a delta without changes of the supports, blocks or interfaces keeps the matrices
+
+    rpc.compute_interface_forces_session(session, {'vertex': {}, 'edge': {}, 'blocks': {}}, solver='ECOS')
+    assert problem.A is A
+
+    new = deepcopy(data)
+    key = sorted(new['assembly']['vertex'])[-1]
+    new['assembly']['vertex'][key]['is_support'] = True
+
+    result = rpc.compute_interface_forces_session(session, rpc.make_delta(data, new), solver='ECOS')
+    assert result['info']['status'] == 'optimal'
+    assert problem.A is not A
+    assert problem.G is G
+
+    expected = rpc.compute_interface_forces_rpc(new, solver='ECOS', cache=False)
+    assert result['info']['objective'] == pytest.approx(expected['info']['objective'], rel=1e-6)
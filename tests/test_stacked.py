@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('cvxpy')
+pytest.importorskip('compas_assembly')
+
+from numpy import array
+from numpy import absolute
+
+from compas_rbe.equilibrium import compute_interface_forces_cvx
+from compas_rbe.equilibrium import compute_interface_forces_cvxopt
+from compas_rbe.equilibrium import compute_interface_forces_stacked
+from compas_rbe.generators import pile_assembly
+from compas_rbe.generators import wall_assembly
+
+
+BACKENDS = {
+    'cvx': (compute_interface_forces_cvx, 'cvxpy', {'solver': 'ECOS'}),
+    'cvxopt': (compute_interface_forces_cvxopt, 'cvxopt', {}),
+}
+
+
+def assemblies():
+    return [wall_assembly(2, 2), pile_assembly(3), wall_assembly(3, 3)]
+
+
+def forces(assembly):
+    return array([[force['c_np'], force['c_nn'], force['c_u'], force['c_v']]
+                  for u, v, attr in assembly.edges(True) for force in attr['interface_forces']])
+
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+def test_stacked_equals_individual(backend):
+    solve, module, kwargs = BACKENDS[backend]
+    pytest.importorskip(module)
+
+    stacked = assemblies()
+    info = compute_interface_forces_stacked(stacked, backend=backend, **kwargs)
+
+    assert info['status'] in ('optimal', 'optimal_inaccurate')
+    assert not info['fallback']
+
+    for a, b, result in zip(stacked, assemblies(), info['assemblies']):
+        individual = solve(b, **kwargs)
+
+        assert result['objective'] == pytest.approx(individual['objective'], rel=1e-3)
+
+        x, y = forces(a), forces(b)
+        assert absolute(x - y).max() <= 1e-3 * absolute(y).max()
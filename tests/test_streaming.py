@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from compas_rbe.files import iter_json_members
+
+
+DATA = {
+    'assembly': {'a': [1, 2.5e-3, -3], 'b': 'x{y}[z]', 'c': None, 'd': True},
+    'blocks': {
+        '0': {'name': 'a \\"quoted\\" \\\\ name', 'vertex': {'0': {'x': 0.0}}, 'face': []},
+        '1': {'name': '\\u00e9\\n{', 'vertex': {}, 'face': [[0, 1, 2], []]},
+    },
+    'n': 12345678,
+    's': 'last',
+}
+
+
+@pytest.fixture
+def path(tmpdir):
+    path = str(tmpdir.join('data.json'))
+    with open(path, 'w') as f:
+        json.dump(DATA, f, indent=2)
+    return path
+
+
+@pytest.mark.parametrize('chunksize', [1, 2, 3, 7, 64, 2 ** 20])
+def test_iter_json_members(path, chunksize):
+    with open(path, 'r') as f:
+        data = json.load(f)
+
+    members = list(iter_json_members(path, chunksize=chunksize))
+
+    assert [(parent, key) for parent, key, value in members] == [
+        (None, 'assembly'), ('blocks', '0'), ('blocks', '1'), (None, 'n'), (None, 's')]
+
+    for parent, key, value in members:
+        assert value == (data[parent][key] if parent else data[key])
+
+
+def test_incomplete(tmpdir):
+    path = str(tmpdir.join('data.json'))
+    with open(path, 'w') as f:
+        f.write('{"blocks": {"0": {"face": [[0, 1')
+
+    with pytest.raises(ValueError):
+        list(iter_json_members(path, chunksize=4))
@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('compas_assembly')
+
+from compas_rbe.generators import _Builder
+
+
+@pytest.fixture
+def assembly():
+    # a block hanging from a support can only be in equilibrium with tension
+    builder = _Builder('hanging')
+    support = builder.box([0.0, 0.0, 0.0], [1.0, 1.0, 1.0], is_support=True)
+    block = builder.box([0.0, 0.0, -1.0], [1.0, 1.0, 0.0])
+    builder.interface(support, block, [[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [1.0, 1.0, 0.0], [0.0, 1.0, 0.0]])
+    return builder.assembly
+
+
+def test_cvxopt_auto_tension(assembly):
+    pytest.importorskip('cvxopt')
+    from compas_rbe.equilibrium import compute_interface_forces_cvxopt
+
+    info = compute_interface_forces_cvxopt(assembly, tension='auto')
+
+    assert info['status'] == 'optimal'
+    assert info['tension'] is True
+    assert any(force['c_nn'] > 0 for u, v, attr in assembly.edges(True) for force in attr['interface_forces'])
+
+
+def test_cvx_auto_tension(assembly):
+    pytest.importorskip('cvxpy')
+    from compas_rbe.equilibrium import compute_interface_forces_cvx
+
+    info = compute_interface_forces_cvx(assembly, tension='auto', solver='ECOS')
+
+    assert info['status'] == 'optimal'
+    assert info['tension'] is True
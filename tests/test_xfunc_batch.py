@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('cvxpy')
+pytest.importorskip('compas_assembly')
+
+from compas_rbe.equilibrium import compute_interface_forces_xfunc_batch
+from compas_rbe.generators import wall_assembly
+
+
+@pytest.fixture
+def job():
+    assembly = wall_assembly(3, 3)
+    return {
+        'assembly': assembly.to_data(),
+        'blocks': {str(key): assembly.blocks[key].to_data() for key in assembly.blocks},
+    }
+
+
+def test_status(job):
+    jobs = [dict(job, kwargs={'solver': 'ECOS'}), dict(job, backend='newton', kwargs={'maxiters': 1}), dict(job, backend='unknown')]
+    results = compute_interface_forces_xfunc_batch(jobs)
+
+    assert [result['status'] for result in results] == ['optimal', 'maxiters', 'error']
+
+
+def test_unsolved_not_cached(job):
+    jobs = [dict(job, backend='newton', kwargs={'maxiters': 1})] * 2
+    results = compute_interface_forces_xfunc_batch(jobs)
+
+    assert not any(result['info']['cached'] for result in results)
+
+    jobs = [dict(job, kwargs={'solver': 'ECOS', 'mu': 0.5})] * 2
+    results = compute_interface_forces_xfunc_batch(jobs)
+
+    assert [result['info']['cached'] for result in results] == [False, True]
@@ -8,9 +8,17 @@ import compas
 import compas_rhino
 import compas_rbe
 
-from compas.utilities import XFunc
+from compas.rpc import Proxy
+from compas.rpc import RPCServerError
 
 from compas_rbe.rhino import AssemblyArtist
+from compas_rbe.rpc import make_delta
+from compas_rbe.rpc import set_session_forces
+from compas_rbe.rpc import write_transport_file
+from compas_rbe.rpc import set_file_forces
+from compas_rbe.tracing import start_trace
+from compas_rbe.tracing import stop_trace
+from compas_rbe.tracing import trace
 
 HERE = os.path.abspath(os.path.dirname(__file__))
 
@@ -19,7 +27,15 @@ try:
 except ImportError:
     pass
 
-compute_interface_forces = XFunc('compas_rbe.equilibrium.compute_interface_forces_xfunc', tmpdir=compas_rbe.TEMP)
+# the proxy starts (or connects to) a persistent solver server
+# that keeps the numerical packages imported between calls
+
+rbe = Proxy('compas_rbe.rpc')
+
+# the statuses of successful solves
+# as compas_rbe.equilibrium.telemetry.SOLVED, which can't be imported in Rhino
+
+SOLVED = ('optimal', 'optimal_inaccurate', 'converged')
 
 
 __all__ = ['EquilibriumActions']
@@ -28,6 +44,20 @@ __all__ = ['EquilibriumActions']
 class EquilibriumActions(object):
 
     def compute_interface_forces(self):
+        # with tracing on, every computation is recorded in a new trace file in the temp folder
+        # including the spans of the solver server
+
+        path = start_trace(name='rhino') if self.settings.get('trace') else None
+
+        try:
+            with trace('compute_interface_forces', category='rhino'):
+                self._compute_interface_forces(path)
+        finally:
+            if path:
+                stop_trace()
+                print('trace: {}'.format(path))
+
+    def _compute_interface_forces(self, path=None):
         assembly = self.assembly
 
         data = {
@@ -35,17 +65,74 @@ class EquilibriumActions(object):
             'blocks'  : {str(key): assembly.blocks[key].to_data() for key in assembly.blocks},
         }
 
-        result = compute_interface_forces(data, solver='ECOS')
+        # for large assemblies, the geometry and the forces are exchanged
+        # through a memory-mapped file in the temp folder
+
+        if self.settings.get('transport') == 'file':
+            filepath = write_transport_file(data)
+            try:
+                with trace('server', category='rhino'):
+                    info = rbe.compute_interface_forces_file(filepath, solver='ECOS', trace=path)
+                set_file_forces(assembly, filepath, remove=False)
+            finally:
+                os.remove(filepath)
+
+            if info['status'] not in SOLVED:
+                print('No equilibrium found: {}'.format(info['status']))
+
+            with trace('draw', category='rhino'):
+                assembly.draw(self.settings['layer'])
+
+                artist = AssemblyArtist(assembly, layer=self.settings['layer'])
+                artist.draw_forces()
+            return
+
+        # after the first call, only the changes are sent to the server
+        # and only the changed interface forces are sent back
+
+        session = getattr(self, 'rbe_session', None)
+        snapshot = getattr(self, 'rbe_snapshot', None)
+
+        delta = None
+
+        if session and snapshot:
+            try:
+                delta = make_delta(snapshot, data)
+            except KeyError:
+                session = None
+
+        if not session:
+            session = rbe.open_session(data)
+
+        # the server raises a SessionError if the session was closed
+        # or doesn't match the assembly
+        # other errors are not solved by a new session
+
+        try:
+            with trace('server', category='rhino'):
+                result = rbe.compute_interface_forces_session(session, delta, solver='ECOS', trace=path)
+        except RPCServerError as e:
+            if 'SessionError' not in str(e):
+                raise
+            session = rbe.open_session(data)
+            with trace('server', category='rhino'):
+                result = rbe.compute_interface_forces_session(session, None, solver='ECOS', trace=path)
+
+        set_session_forces(assembly, result['edges'])
+
+        self.rbe_session = session
+        self.rbe_snapshot = data
 
-        assembly.data = result['assembly']
+        status = result['info'].get('status')
 
-        for key in assembly.blocks:
-            assembly.blocks[key].data = result['blocks'][str(key)]
+        if status not in SOLVED:
+            print('No equilibrium found: {}'.format(status))
 
-        assembly.draw(self.settings['layer'])
+        with trace('draw', category='rhino'):
+            assembly.draw(self.settings['layer'])
 
-        artist = AssemblyArtist(assembly, layer=self.settings['layer'])
-        artist.draw_forces()
+            artist = AssemblyArtist(assembly, layer=self.settings['layer'])
+            artist.draw_forces()
 
 
 # ==============================================================================
@@ -10,6 +10,10 @@ import compas_rbe
 
 from compas.utilities import XFunc
 
+from compas_rbe.tracing import start_trace
+from compas_rbe.tracing import stop_trace
+from compas_rbe.tracing import trace
+
 HERE = os.path.abspath(os.path.dirname(__file__))
 
 try:
@@ -34,16 +38,26 @@ class InterfaceActions(object):
             'blocks'  : {str(key): assembly.blocks[key].to_data() for key in assembly.blocks},
         }
 
-        result = assembly_interfaces(
-            data,
-            nmax=10,
-            tmax=0.05,
-            amin=0.01,
-            lmin=0.01,
-            face_face=True,
-            face_edge=False,
-            face_vertex=False
-        )
+        # the span includes the startup of the process and the JSON round-trip
+
+        path = start_trace(name='rhino') if self.settings.get('trace') else None
+
+        try:
+            with trace('assembly_interfaces_xfunc', category='rhino'):
+                result = assembly_interfaces(
+                    data,
+                    nmax=10,
+                    tmax=0.05,
+                    amin=0.01,
+                    lmin=0.01,
+                    face_face=True,
+                    face_edge=False,
+                    face_vertex=False
+                )
+        finally:
+            if path:
+                stop_trace()
+                print('trace: {}'.format(path))
 
         assembly.data = result['assembly']
 
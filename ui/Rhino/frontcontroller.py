@@ -43,6 +43,8 @@ class RBEFrontController(EquilibriumActions,
         self.settings = {
             'current_working_directory' : None,
             'layer' : 'RBE',
+            'trace' : False,
+            'transport' : 'session',
         }
 
     @property